@@ -1,22 +1,47 @@
-from .core.canvas import Canvas
 from .core.color import ColorPalette
-from .core.generator import PatternGenerator, OrganicGenerator, GeometricGenerator, OilPaintingGenerator
+from .core.lazy import lazy_attributes
 from .presets.presets import get_preset
 
 __version__ = "0.1.0"
-__all__ = ["Canvas", "ColorPalette", "PatternGenerator", "OrganicGenerator", "GeometricGenerator", "OilPaintingGenerator", "get_preset", "generate"]
+__all__ = ["Canvas", "ColorPalette", "PatternGenerator", "OrganicGenerator", "GeometricGenerator", "OilPaintingGenerator", "get_preset", "generate", "profile", "ProfileStats", "RenderCache"]
+
+# Canvas and the generators import numpy and PIL; load them on first access
+# so that tools which only need presets or palettes start quickly.
+_LAZY_ATTRIBUTES = {
+    "Canvas": ".core.canvas",
+    "PatternGenerator": ".core.generator",
+    "OrganicGenerator": ".core.generator",
+    "GeometricGenerator": ".core.generator",
+    "OilPaintingGenerator": ".core.generator",
+    "profile": ".core.profiling",
+    "ProfileStats": ".core.profiling",
+    "RenderCache": ".core.cache",
+}
+
+__getattr__, __dir__ = lazy_attributes(globals(), _LAZY_ATTRIBUTES)
 
 def generate(width=800, height=600, preset="organic", seed=None, output=None, **kwargs):
     """Generate an abstract image with the given parameters."""
+    from .core.canvas import Canvas
+    from .core.generator import PatternGenerator, OrganicGenerator, GeometricGenerator, OilPaintingGenerator
+    
     preset_config = get_preset(preset)
     preset_config.update(kwargs)
     
-    canvas = Canvas(width, height, seed=seed)
+    # SVG and framebuffer output never need a PIL raster, so only record the display list
+    deferred = (preset_config.get('deferred', False)
+                or str(output or '').lower().endswith(('.svg', '.svgz', '.npy', '.rgba')))
+    canvas = Canvas(width, height, seed=seed, compositing=preset_config.get('compositing', False),
+                    deferred=deferred, antialias=preset_config.get('antialias', False),
+                    framebuffer=preset_config.get('framebuffer'), indexed=preset_config.get('indexed', False))
     
     if preset_config.get('palette'):
         canvas.set_palette(preset_config['palette'])
     
     generator_type = preset_config.get('generator_type', 'pattern')
+    if preset_config.get('symmetry') and generator_type != 'geometric':
+        # The geometric generator places its own motif for a symmetry
+        canvas.set_symmetry(preset_config['symmetry'])
     
     if generator_type == 'organic':
         generator = OrganicGenerator(**preset_config)
@@ -1,14 +1,20 @@
 import click
+import json
+import os
 import random
+import sys
+import threading
+import time
+from contextlib import nullcontext
 from pathlib import Path
 
-from .core.canvas import Canvas
+# Canvas and the generators pull in numpy and PIL, so they are imported where
+# an image is actually rendered; listing presets or palettes stays fast.
 from .core.color import ColorPalette
-from .core.generator import PatternGenerator, OrganicGenerator, GeometricGenerator, OilPaintingGenerator
 from .presets.presets import get_preset, list_presets as get_preset_list, get_preset_description
 
 @click.command()
-@click.option('--output', '-o', help='Output file path (supports .png, .jpg, .svg)')
+@click.option('--output', '-o', help='Output file path (supports .png, .jpg, .svg, .svgz, and .npy or .rgba raw RGBA)')
 @click.option('--width', '-w', default=800, help='Canvas width in pixels', type=int)
 @click.option('--height', '-h', default=600, help='Canvas height in pixels', type=int)
 @click.option('--seed', '-s', help='Random seed for reproducible results', type=int)
@@ -16,13 +22,38 @@ from .presets.presets import get_preset, list_presets as get_preset_list, get_pr
 @click.option('--complexity', '-c', help='Number of elements to generate', type=int)
 @click.option('--palette', help='Color palette name')
 @click.option('--shape-type', help='Type of shapes to generate', 
-              type=click.Choice(['circle', 'polygon', 'line', 'bezier', 'noise', 'mixed']))
+              type=click.Choice(['circle', 'polygon', 'line', 'bezier', 'noise', 'field', 'mixed']))
 @click.option('--list-presets', is_flag=True, help='List all available presets and exit')
 @click.option('--list-palettes', is_flag=True, help='List all available color palettes and exit')
 @click.option('--background', help='Background color as hex (e.g., #ffffff) or rgb (255,255,255)')
+@click.option('--scale', type=float, help='Rasterize the output at this multiple of the canvas size')
+@click.option('--dpi', type=int, help='Output DPI; also scales the raster when --scale is not given')
+@click.option('--tile-size', type=click.IntRange(min=16),
+              help='Render PNG output in bands of this many rows, keeping memory bounded for huge images')
+@click.option('--workers', '-j', type=click.IntRange(min=0),
+              help='Rasterize the image in bands on this many processes (0 = one per CPU core)')
+@click.option('--layer-workers', type=click.IntRange(min=0),
+              help='Paint the layers of oil-painting presets on this many processes (0 = one per CPU core)')
+@click.option('--precision', default=2, type=click.IntRange(min=0), help='Decimal places for SVG coordinates')
+@click.option('--compositing', is_flag=True, help='Alpha-blend translucent shapes instead of drawing them opaque')
+@click.option('--blend-mode', help='Blend mode for composited shapes, e.g. multiply or screen (implies --compositing)')
+@click.option('--antialias', is_flag=True, help='Anti-alias the edges of batch-drawn circles')
+@click.option('--symmetry', help='Render mirrored or rotated copies: bilateral, quadrant or rotational:N')
+@click.option('--indexed', is_flag=True, help='Render palette indices; PNG output is written as an 8-bit palette PNG')
+@click.option('--legacy-noise', is_flag=True,
+              help='Use the per-pixel noise path that reproduces images from earlier releases')
+@click.option('--legacy-shapes', is_flag=True,
+              help=('Sample shapes one at a time with the random draws of earlier releases; curves are '
+                    'flattened by the current sampler, so images with them differ slightly'))
+@click.option('--profile', is_flag=True, help='Print call counts and time spent per drawing primitive, generator and save')
+@click.option('--cache', 'use_cache', is_flag=True,
+              help='Reuse an identical earlier render (same preset, options, seed, size and format)')
+@click.option('--cache-dir', type=click.Path(file_okay=False), help='Render cache directory (implies --cache)')
 @click.option('--verbose', '-v', is_flag=True, help='Verbose output')
 def main(output, width, height, seed, preset, complexity, palette, shape_type, 
-         list_presets, list_palettes, background, verbose):
+         list_presets, list_palettes, background, scale, dpi, tile_size, workers, layer_workers, precision,
+         compositing, blend_mode, antialias, symmetry, indexed, legacy_noise, legacy_shapes, profile, use_cache,
+         cache_dir, verbose):
     """Generate abstract procedural art with various styles and patterns.
     
     Examples:
@@ -61,6 +92,15 @@ def main(output, width, height, seed, preset, complexity, palette, shape_type,
             click.echo(f"Random seed: {seed}")
     
     try:
+        from .core.canvas import Canvas
+        from .core.generator import PatternGenerator, OrganicGenerator, GeometricGenerator, OilPaintingGenerator
+        
+        stats = None
+        profiler = nullcontext()
+        if profile:
+            from .core.profiling import profile as profiler
+            profiler = profiler()
+        
         preset_config = get_preset(preset)
         
         if complexity is not None:
@@ -69,17 +109,36 @@ def main(output, width, height, seed, preset, complexity, palette, shape_type,
             preset_config['palette'] = palette
         if shape_type is not None:
             preset_config['shape_type'] = shape_type
+        if blend_mode is not None:
+            preset_config['blend_mode'] = blend_mode
+        if symmetry is not None:
+            preset_config['symmetry'] = symmetry
+        if layer_workers is not None:
+            preset_config['layer_workers'] = layer_workers
+        if legacy_noise:
+            preset_config['legacy_noise'] = True
+        if legacy_shapes:
+            preset_config['legacy_shapes'] = True
         
         background_color = None
         if background:
             background_color = parse_color(background)
         
-        canvas = Canvas(width, height, seed=seed, background_color=background_color)
+        # Scaled, tiled, parallel and SVG output rasterize from the display list, so skip the 1x raster
+        deferred = (scale is not None or dpi is not None or tile_size is not None or workers is not None
+                    or output.lower().endswith(('.svg', '.svgz', '.npy', '.rgba')))
+        canvas = Canvas(width, height, seed=seed, background_color=background_color,
+                        compositing=compositing or preset_config.get('compositing', False),
+                        deferred=deferred, antialias=antialias or preset_config.get('antialias', False),
+                        indexed=indexed or preset_config.get('indexed', False))
         
         if preset_config.get('palette'):
             canvas.set_palette(preset_config['palette'])
         
         generator_type = preset_config.get('generator_type', 'pattern')
+        if preset_config.get('symmetry') and generator_type != 'geometric':
+            # The geometric generator places its own motif for a symmetry
+            canvas.set_symmetry(preset_config['symmetry'])
         
         if generator_type == 'organic':
             generator = OrganicGenerator(**preset_config)
@@ -93,18 +152,40 @@ def main(output, width, height, seed, preset, complexity, palette, shape_type,
         if verbose:
             click.echo(f"Applying {generator_type} generator with {preset_config.get('complexity', 50)} elements...")
         
-        generator.apply(canvas)
-        
         output_path = Path(output)
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
-        canvas.save(str(output_path))
+        def render(path):
+            generator.apply(canvas)
+            canvas.save(path, scale=scale, dpi=dpi, precision=precision, tile_size=tile_size, workers=workers)
+        
+        cached = False
+        with profiler as stats:
+            # Unseeded renders differ every time, and a profile should measure a real render
+            if (use_cache or cache_dir) and seed is not None and not profile:
+                from .core.cache import RenderCache, output_format, render_key
+                
+                format = output_format(output)
+                # Layers painted on several processes come out the same, so their count is left out of the
+                # key; tiled and parallel saves can encode the same pixels differently, so theirs are not
+                config = {name: value for name, value in preset_config.items() if name != 'layer_workers'}
+                key = render_key(config, seed, width, height, format, background=background_color,
+                                 compositing=canvas.compositing, antialias=canvas.antialias, indexed=canvas.indexed,
+                                 scale=scale, dpi=dpi, precision=precision, tile_size=tile_size, workers=workers)
+                cached = RenderCache(cache_dir).render_to(key, format, output_path, render)
+            else:
+                render(str(output_path))
         
         if verbose:
-            click.echo(f"✓ Abstract art saved to: {output_path.absolute()}")
+            source = " (from cache)" if cached else ""
+            click.echo(f"✓ Abstract art saved to: {output_path.absolute()}{source}")
         else:
             click.echo(f"Generated: {output}")
         
+        if stats is not None:
+            click.echo()
+            click.echo(stats.format_table())
+    
     except ValueError as e:
         click.echo(f"Error: {e}", err=True)
         exit(1)
@@ -146,64 +227,276 @@ def parse_color(color_str):
     else:
         raise ValueError(f"Invalid color format: {color_str}. Use hex (#ffffff) or RGB (255,255,255)")
 
+# Render caches of this process by directory, so the memory tier lasts across jobs
+_caches = {}
+
+def _render_cache(directory):
+    from .core.cache import RenderCache
+    
+    if directory not in _caches:
+        _caches[directory] = RenderCache(directory)
+    return _caches[directory]
+
+def _render_batch_job(job):
+    """Render one planned batch image; runs in the parent or in a pool worker."""
+    filename, filepath, preset, seed, width, height, cache_dir = job
+    try:
+        from .core.canvas import Canvas
+        from .core.generator import PatternGenerator, OrganicGenerator, GeometricGenerator, OilPaintingGenerator
+        
+        preset_config = get_preset(preset)
+        canvas = Canvas(width, height, seed=seed, deferred=filepath.endswith(('.svg', '.svgz', '.npy')))
+        canvas.set_palette(preset_config['palette'])
+        
+        generator_type = preset_config.get('generator_type', 'pattern')
+        if generator_type == 'organic':
+            generator = OrganicGenerator(**preset_config)
+        elif generator_type == 'geometric':
+            generator = GeometricGenerator(**preset_config)
+        elif generator_type == 'oil_painting':
+            generator = OilPaintingGenerator(**preset_config)
+        else:
+            generator = PatternGenerator(**preset_config)
+        
+        def render(path):
+            generator.apply(canvas)
+            canvas.save(path)
+        
+        if cache_dir is not None:
+            from .core.cache import output_format, render_key
+            
+            format = output_format(filepath)
+            # Batch canvases ignore the presets' compositing flags; key them apart from generate()
+            key = render_key(preset_config, seed, width, height, format, compositing=False, antialias=False)
+            _render_cache(cache_dir).render_to(key, format, filepath, render)
+        else:
+            render(filepath)
+    except Exception as e:
+        return filename, str(e)
+    return filename, None
+
+def _run_alone(function, job):
+    # `function(job)` on a process of its own, or None if that process dies
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+    
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        try:
+            return executor.submit(function, job).result()
+        except BrokenProcessPool:
+            return None
+
+def _pooled(function, jobs, workers, failed):
+    """`function(job)` for every job on `workers` processes, yielded in job order.
+    
+    Jobs are submitted one at a time, a few per worker ahead of the one
+    being yielded. A worker process that dies (killed, out of memory)
+    takes every job left in the pool down with it: those are rerun one by
+    one on a process of their own, and `failed(job)` stands in for the
+    result of each job that kills its process again. The batch then
+    carries on with a new pool.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+    
+    executor = ProcessPoolExecutor(max_workers=workers)
+    futures, finished, submitted = {}, {}, 0
+    try:
+        for i in range(len(jobs)):
+            while submitted < min(len(jobs), i + workers * 4):
+                futures[submitted] = executor.submit(function, jobs[submitted])
+                submitted += 1
+            if i in finished:
+                yield finished.pop(i)
+                continue
+            try:
+                yield futures.pop(i).result()
+                continue
+            except BrokenProcessPool:
+                pass
+            
+            lost = [i] + [index for index, future in futures.items()
+                          if future.cancelled() or future.exception() is not None]
+            executor.shutdown()
+            for index in lost:
+                futures.pop(index, None)
+                result = _run_alone(function, jobs[index])
+                finished[index] = failed(jobs[index]) if result is None else result
+            executor = ProcessPoolExecutor(max_workers=workers)
+            yield finished.pop(i)
+    finally:
+        executor.shutdown(cancel_futures=True)
+
 @click.command()
 @click.option('--count', '-n', default=1, help='Number of images to generate', type=int)
 @click.option('--output-dir', '-d', default='generated', help='Output directory')
 @click.option('--prefix', default='abstro', help='Filename prefix')
-@click.option('--format', '-f', default='png', type=click.Choice(['png', 'jpg', 'svg']), 
+@click.option('--format', '-f', default='png', type=click.Choice(['png', 'jpg', 'svg', 'svgz', 'npy']), 
               help='Output format')
 @click.option('--width', '-w', default=800, type=int)
 @click.option('--height', '-h', default=600, type=int)
 @click.option('--random-presets', is_flag=True, help='Use random presets for each image')
+@click.option('--seed', '-s', type=int, help='Seed for picking presets and image seeds, making the batch repeatable')
+@click.option('--workers', '-j', default=1, type=click.IntRange(min=0),
+              help='Worker processes to render with (0 = one per CPU core)')
+@click.option('--cache', 'use_cache', is_flag=True, help='Reuse identical earlier renders')
+@click.option('--cache-dir', type=click.Path(file_okay=False), help='Render cache directory (implies --cache)')
 @click.option('--verbose', '-v', is_flag=True, help='Verbose output')
-def batch(count, output_dir, prefix, format, width, height, random_presets, verbose):
+def batch(count, output_dir, prefix, format, width, height, random_presets, seed, workers, use_cache, cache_dir,
+          verbose):
     """Generate multiple abstract art pieces in batch mode."""
     
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
     
     presets = get_preset_list() if random_presets else ['organic']
+    workers = workers or os.cpu_count() or 1
     
     if verbose:
         click.echo(f"Generating {count} images in batch mode...")
         click.echo(f"Output directory: {output_path.absolute()}")
+        if workers > 1:
+            click.echo(f"Using {workers} worker processes")
+    
+    if use_cache and cache_dir is None:
+        from .core.cache import default_cache_dir
+        cache_dir = str(default_cache_dir())
     
+    # Presets, seeds and filenames are decided here so the output does not
+    # depend on how many workers render the jobs.
+    planner = random.Random(seed)
+    jobs = []
     for i in range(count):
-        preset = random.choice(presets) if random_presets else presets[0]
-        seed = random.randint(0, 999999)
-        
-        filename = f"{prefix}_{i+1:04d}_{preset}_{seed}.{format}"
-        filepath = output_path / filename
+        preset = planner.choice(presets) if random_presets else presets[0]
+        image_seed = planner.randint(0, 999999)
         
-        if verbose:
-            click.echo(f"  [{i+1}/{count}] Generating {filename} with preset '{preset}' (seed: {seed})...")
+        filename = f"{prefix}_{i+1:04d}_{preset}_{image_seed}.{format}"
+        jobs.append((filename, str(output_path / filename), preset, image_seed, width, height, cache_dir))
+    
+    if workers > 1 and count > 1:
+        results = _pooled(_render_batch_job, jobs, min(workers, count),
+                          lambda job: (job[0], "the worker process rendering it died"))
+    else:
+        results = map(_render_batch_job, jobs)
+    
+    failed = 0
+    for i, (filename, error) in enumerate(results):
+        if error is not None:
+            failed += 1
+            click.echo(f"Error generating {filename}: {error}", err=True)
+        elif verbose:
+            click.echo(f"  [{i+1}/{count}] Generated {filename} with preset '{jobs[i][2]}' (seed: {jobs[i][3]})")
+        else:
+            click.echo(f"Generated: {filename}")
+    
+    if verbose:
+        click.echo(f"✓ Batch generation complete! {count - failed} images saved to {output_path.absolute()}")
+
+# Render cache of a serve worker, set by `_warm_serve_worker`
+_serve_cache = None
+
+def _warm_serve_worker(cache_dir=None):
+    """Pool initializer: import the renderer and touch every preset once."""
+    global _serve_cache
+    from . import generate
+    
+    if cache_dir is not None:
+        _serve_cache = _render_cache(cache_dir)
+    for preset in get_preset_list():
+        # Generators keep margins of up to ~100px, so this is the smallest safe size
+        generate(256, 256, preset=preset, seed=0)
+
+def _render_serve_job(spec):
+    """Render one JSON job spec in a pool worker and return its result record."""
+    from . import generate
+    
+    start = time.perf_counter()
+    try:
+        output = spec['output']
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+        width, height = spec.get('width', 800), spec.get('height', 600)
+        preset, seed, overrides = spec.get('preset', 'organic'), spec.get('seed'), spec.get('overrides', {})
+        render = lambda path: generate(width=width, height=height, preset=preset, seed=seed, output=path, **overrides)
         
-        try:
-            preset_config = get_preset(preset)
-            canvas = Canvas(width, height, seed=seed)
-            canvas.set_palette(preset_config['palette'])
-            
-            generator_type = preset_config.get('generator_type', 'pattern')
-            if generator_type == 'organic':
-                generator = OrganicGenerator(**preset_config)
-            elif generator_type == 'geometric':
-                generator = GeometricGenerator(**preset_config)
-            elif generator_type == 'oil_painting':
-                generator = OilPaintingGenerator(**preset_config)
-            else:
-                generator = PatternGenerator(**preset_config)
-            
-            generator.apply(canvas)
-            canvas.save(str(filepath))
+        cached = False
+        if _serve_cache is not None and seed is not None:
+            from .core.cache import generate_key, output_format
             
-            if not verbose:
-                click.echo(f"Generated: {filename}")
-        
+            format = output_format(output)
+            key = generate_key(width, height, preset, seed, format, **overrides)
+            cached = _serve_cache.render_to(key, format, output, render)
+        else:
+            render(output)
+    except Exception as e:
+        return {'id': spec.get('id'), 'ok': False, 'error': str(e) or type(e).__name__}
+    return {'id': spec.get('id'), 'ok': True, 'output': output, 'cached': cached,
+            'seconds': round(time.perf_counter() - start, 4)}
+
+@click.command()
+@click.option('--stdio', is_flag=True, help='Read JSON-lines jobs from stdin and write results to stdout')
+@click.option('--workers', '-j', default=0, type=click.IntRange(min=0),
+              help='Worker processes to keep warm (0 = one per CPU core)')
+@click.option('--cache', 'use_cache', is_flag=True, help='Serve repeated seeded jobs from the render cache')
+@click.option('--cache-dir', type=click.Path(file_okay=False), help='Render cache directory (implies --cache)')
+def serve(stdio, workers, use_cache, cache_dir):
+    """Run a persistent render worker.
+    
+    Each stdin line is a JSON job such as
+    {"id": 1, "preset": "oil_painting", "seed": 42, "width": 800, "height": 600,
+    "overrides": {"complexity": 80}, "output": "out/42.png"}. One JSON result
+    line is written per job as soon as it finishes, carrying the job's "id"
+    (the input line number when no id is given).
+    """
+    if not stdio:
+        raise click.UsageError("Only the --stdio transport is supported: abstro serve --stdio")
+    
+    from concurrent.futures import ProcessPoolExecutor
+    
+    workers = workers or os.cpu_count() or 1
+    output_lock = threading.Lock()
+    # Bound the number of queued jobs so a large stdin is not read up front
+    slots = threading.BoundedSemaphore(workers * 2)
+    
+    def respond(result):
+        with output_lock:
+            sys.stdout.write(json.dumps(result) + '\n')
+            sys.stdout.flush()
+    
+    def on_done(future, spec):
+        slots.release()
+        try:
+            respond(future.result())
         except Exception as e:
-            click.echo(f"Error generating {filename}: {e}", err=True)
+            # The worker process died (e.g. killed or out of memory)
+            respond({'id': spec['id'], 'ok': False, 'error': str(e) or type(e).__name__})
     
-    if verbose:
-        click.echo(f"✓ Batch generation complete! {count} images saved to {output_path.absolute()}")
+    if use_cache and cache_dir is None:
+        from .core.cache import default_cache_dir
+        cache_dir = str(default_cache_dir())
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_warm_serve_worker,
+                             initargs=(cache_dir,)) as executor:
+        for line_number, line in enumerate(sys.stdin, 1):
+            if not line.strip():
+                continue
+            try:
+                spec = json.loads(line)
+                if not isinstance(spec, dict) or 'output' not in spec:
+                    raise ValueError("job must be a JSON object with an 'output' path")
+            except ValueError as e:
+                respond({'id': line_number, 'ok': False, 'error': f"Invalid job: {e}"})
+                continue
+            
+            spec.setdefault('id', line_number)
+            slots.acquire()
+            future = executor.submit(_render_serve_job, spec)
+            future.add_done_callback(lambda future, spec=spec: on_done(future, spec))
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    # `abstro batch ...` and `abstro serve ...` select the other commands
+    commands = {'batch': batch, 'serve': serve}
+    if len(sys.argv) > 1 and sys.argv[1] in commands:
+        command = commands[sys.argv.pop(1)]
+        command()
+    else:
+        main() 
\ No newline at end of file
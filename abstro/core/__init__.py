@@ -1,5 +1,12 @@
-from .canvas import Canvas
 from .color import ColorPalette
-from .generator import PatternGenerator
+from .lazy import lazy_attributes
 
-__all__ = ["Canvas", "ColorPalette", "PatternGenerator"] 
\ No newline at end of file
+__all__ = ["Canvas", "ColorPalette", "PatternGenerator"]
+
+# Loaded on first access; both modules import numpy and PIL
+_LAZY_ATTRIBUTES = {
+    "Canvas": ".canvas",
+    "PatternGenerator": ".generator",
+}
+
+__getattr__, __dir__ = lazy_attributes(globals(), _LAZY_ATTRIBUTES)
\ No newline at end of file
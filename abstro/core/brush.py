@@ -0,0 +1,164 @@
+import math
+
+import numpy as np
+
+# Bristle textures are sampled TEXTURE_ALONG times along a stroke and TEXTURE_ACROSS times across it
+TEXTURE_ALONG = 128
+TEXTURE_ACROSS = 64
+
+# Distinct bristle textures; strokes pick one by number
+BRISTLE_VARIANTS = 8
+
+# Bristles per brush (even, see `bristle_textures`) and their half-width range in brush radii
+BRISTLES = 24
+BRISTLE_SIZE = (0.03, 0.08)
+
+# Paint density between bristles, over how much of the radius the brush
+# edge fades, and over how much of the stroke a bristle runs dry
+BRISTLE_GROUND = 0.45
+BRISTLE_EDGE = 0.3
+BRISTLE_DRYING = 0.3
+
+# The brush's cross-section is stamped every STAMP_SPACING pixels along a
+# stroke, sampled every LATERAL_SPACING pixels across it; samples less than
+# a pixel's diagonal apart leave no pixel of a straight stroke unsampled
+STAMP_SPACING = 0.7
+LATERAL_SPACING = 0.7
+
+# Chords per cubic segment of the table stamps are spaced along
+PATH_SAMPLES = 32
+
+# Pixels of stroke windows accumulated in one scatter-add; bounds the memory of one pass
+BRUSH_CHUNK_PIXELS = 1 << 22
+
+_textures = None
+
+def bristle_textures():
+    """(BRISTLE_VARIANTS, TEXTURE_ALONG, TEXTURE_ACROSS) float32 paint density of a brush stroke.
+    
+    Rows run from the start of a stroke to its end and columns across the
+    brush, edge to edge. Every bristle leaves a streak over a thinner ground
+    of paint; bristles run dry from a point of their own near the end, and
+    the paint fades toward the brush's edges. Bristles are mirrored across
+    the middle of the brush, so a stroke's mirror image (see `Symmetry`)
+    paints alike.
+    """
+    global _textures
+    if _textures is not None:
+        return _textures
+    across = np.linspace(-1, 1, TEXTURE_ACROSS)
+    along = np.linspace(0, 1, TEXTURE_ALONG)[:, None]
+    edge = np.clip((1 - np.abs(across)) / BRISTLE_EDGE, 0, 1)
+    
+    textures = np.empty((BRISTLE_VARIANTS, TEXTURE_ALONG, TEXTURE_ACROSS), dtype=np.float32)
+    for variant in range(BRISTLE_VARIANTS):
+        rng = np.random.default_rng(variant)
+        half = BRISTLES // 2
+        centers = rng.uniform(0, 1, half)
+        sizes = np.tile(rng.uniform(*BRISTLE_SIZE, half), 2)
+        loads = np.tile(rng.uniform(0.5, 1, half), 2)
+        dry = np.tile(rng.uniform(0.55, 1, half), 2)
+        streaks = loads[:, None] * np.exp(-0.5 * ((across - np.concatenate((centers, -centers))[:, None])
+                                                  / sizes[:, None]) ** 2)
+        paint = np.clip((dry + BRISTLE_DRYING - along) / BRISTLE_DRYING, 0, 1)
+        bristles = (paint[:, :, None] * streaks[None]).max(axis=1)
+        textures[variant] = (BRISTLE_GROUND + (1 - BRISTLE_GROUND) * bristles) * edge
+    _textures = textures
+    return textures
+
+def _stroke_paint(segments, slots, widths, pressures, variants, corners, offsets, columns):
+    # Paint samples of strokes 0..n-1 (`slots` numbers the stroke of each segment)
+    # as flat indices into their windows, with top-left pixels `corners`, laid
+    # out row by row from `offsets`
+    count = len(widths)
+    t = np.linspace(0.0, 1.0, PATH_SAMPLES + 1)[:, None]
+    mt = 1.0 - t
+    p = segments[:, None]
+    curves = (mt**3 * p[:, :, 0] + 3 * mt**2 * t * p[:, :, 1]
+              + 3 * mt * t**2 * p[:, :, 2] + t**3 * p[:, :, 3])
+    starts = curves[:, :-1].reshape(-1, 2)
+    chords = np.diff(curves, axis=1).reshape(-1, 2)
+    chord_lengths = np.hypot(chords[:, 0], chords[:, 1])
+    arc = np.concatenate(([0.0], np.cumsum(chord_lengths)))
+    
+    # Stamps every STAMP_SPACING pixels of each stroke's arc length
+    chord_slots = np.repeat(slots, PATH_SAMPLES)
+    first = np.searchsorted(chord_slots, np.arange(count))
+    last = np.searchsorted(chord_slots, np.arange(count), side='right')
+    lengths = arc[last] - arc[first]
+    counts = np.maximum(2, (lengths / STAMP_SPACING).astype(np.int64) + 1)
+    stroke = np.repeat(np.arange(count), counts)
+    fraction = (np.arange(len(stroke)) - np.repeat(np.cumsum(counts) - counts, counts)) / (counts - 1)[stroke]
+    position = arc[first][stroke] + fraction * lengths[stroke]
+    chord = np.clip(np.searchsorted(arc, position, side='right') - 1, first[stroke], last[stroke] - 1)
+    along = np.clip((position - arc[chord]) / np.maximum(chord_lengths[chord], 1e-12), 0, 1)
+    # Stamp centers relative to their windows, where float32 is exact enough
+    xs, ys = (starts[chord] + chords[chord] * along[:, None] - corners[stroke]).astype(np.float32).T
+    profile = pressures[stroke] + (1 - pressures[stroke]) * np.sin(math.pi * fraction)
+    # The brush's half-width vector, across the stroke
+    reach = np.maximum(0.5, widths[stroke] / 2 * profile) / np.maximum(chord_lengths[chord], 1e-12)
+    reach_x, reach_y = (-chords[chord, 1] * reach).astype(np.float32), (chords[chord, 0] * reach).astype(np.float32)
+    rows = (variants[stroke] % BRISTLE_VARIANTS, np.rint(fraction * (TEXTURE_ALONG - 1)).astype(np.intp))
+    
+    # Samples across every stamp, as many as the stroke's full width needs
+    textures = bristle_textures()
+    across = np.maximum(2, np.ceil(widths / LATERAL_SPACING).astype(np.int64) + 1)
+    indices, paint = [], []
+    for size in np.unique(across):
+        group = np.flatnonzero(across[stroke] == size)
+        lateral = np.linspace(-1, 1, size, dtype=np.float32)
+        sample_x = np.rint(xs[group, None] + lateral * reach_x[group, None]).astype(np.int32)
+        sample_y = np.rint(ys[group, None] + lateral * reach_y[group, None]).astype(np.int32)
+        owner = stroke[group]
+        indices.append((offsets[owner, None] + sample_y * columns[owner, None] + sample_x).ravel())
+        density = textures[:, :, np.rint((lateral + 1) / 2 * (TEXTURE_ACROSS - 1)).astype(np.intp)]
+        paint.append((density[rows[0][group], rows[1][group]] * profile[group, None].astype(np.float32)).ravel())
+    return np.concatenate(indices), np.concatenate(paint)
+
+def stroke_coverage(segments, owners, widths, pressures, variants):
+    """Coverage windows of brush strokes, each a chain of cubic bezier `segments`.
+    
+    `segments` is (n, 4, 2) in output pixels, with `owners[i]` the
+    (ascending) stroke of segment i. Pressure rises from `pressures` at the
+    ends of a stroke to 1 halfway along and scales both the brush's width
+    and the paint it leaves. The brush's cross-section is stamped along
+    the stroke with its bristle texture, and a pixel is covered by the
+    average paint of the samples landing in it: a chunk of strokes is
+    accumulated with one scatter-add, and a stroke never darkens where
+    it overlaps itself. Yields, chunk by chunk in stroke order, the
+    chunk's strokes, their windows' top-left pixels and column counts,
+    the windows' offsets when laid end to end (each row by row), and the
+    ascending indices of the painted pixels in that layout with their
+    float32 coverage.
+    """
+    segments = np.asarray(segments, dtype=np.float64)
+    drawn, firsts = np.unique(owners, return_index=True)
+    # A stroke lies within its control points' hull
+    low = np.minimum.reduceat(segments.min(axis=1), firsts)
+    high = np.maximum.reduceat(segments.max(axis=1), firsts)
+    reach = np.ceil(widths[drawn] / 2).astype(np.int64) + 1
+    lefts = np.floor(low[:, 0]).astype(np.int64) - reach
+    tops = np.floor(low[:, 1]).astype(np.int64) - reach
+    columns = np.ceil(high[:, 0]).astype(np.int64) + reach + 1 - lefts
+    rows = np.ceil(high[:, 1]).astype(np.int64) + reach + 1 - tops
+    firsts = np.append(firsts, len(segments))
+    
+    start = 0
+    while start < len(drawn):
+        total = np.cumsum(columns[start:] * rows[start:])
+        end = start + max(1, int(np.searchsorted(total, BRUSH_CHUNK_PIXELS, side='right')))
+        window_offsets = np.concatenate(([0], total[:end - start]))
+        
+        chunk = slice(firsts[start], firsts[end])
+        strokes = drawn[start:end]
+        window = slice(start, end)
+        index, paint = _stroke_paint(segments[chunk], np.searchsorted(strokes, owners[chunk]), widths[strokes],
+                                     pressures[strokes], variants[strokes],
+                                     np.column_stack((lefts[window], tops[window])),
+                                     window_offsets[:-1].astype(np.int32), columns[window].astype(np.int32))
+        coverage = np.bincount(index, paint, minlength=window_offsets[-1])
+        covered = np.flatnonzero(coverage)
+        coverage = (coverage[covered] / np.bincount(index, minlength=window_offsets[-1])[covered]).astype(np.float32)
+        
+        yield strokes, lefts[window], tops[window], columns[window], window_offsets, covered, coverage
+        start = end
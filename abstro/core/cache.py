@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+DEFAULT_MAX_BYTES = 1 << 30
+DEFAULT_MEMORY_BYTES = 64 << 20
+
+# Version of the rendered output, part of every key: bump it with any change
+# that alters the pixels or encoding of an image rendered from the same inputs
+RENDER_FORMAT = 2
+
+def default_cache_dir():
+    """`$ABSTRO_CACHE_DIR`, or `abstro` under the user cache directory."""
+    if os.environ.get('ABSTRO_CACHE_DIR'):
+        return Path(os.environ['ABSTRO_CACHE_DIR'])
+    base = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(base) / 'abstro'
+
+def output_format(filename):
+    """Cache format name for an output file, from its extension."""
+    extension = Path(filename).suffix.lower().lstrip('.') or 'png'
+    return 'jpg' if extension == 'jpeg' else extension
+
+def render_key(config, seed, width, height, format, **options):
+    """Content address of one render.
+    
+    `config` is the fully resolved preset (with overrides applied) and
+    `options` anything else that changes the pixels, such as canvas flags
+    or the output scale. The library version and `RENDER_FORMAT` are part
+    of the key, so a new release or a change to the rendered output never
+    serves images rendered by older code.
+    """
+    from .. import __version__
+    
+    payload = {'version': __version__, 'render_format': RENDER_FORMAT, 'config': config, 'seed': seed,
+               'size': [width, height], 'format': format, 'options': options}
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=repr)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+def generate_key(width, height, preset, seed, format, **kwargs):
+    """`render_key` of `abstro.generate(width, height, preset, seed, **kwargs)`."""
+    from ..presets.presets import get_preset
+    
+    config = get_preset(preset)
+    config.update(kwargs)
+    # Layers painted on several processes come out the same
+    config.pop('layer_workers', None)
+    return render_key(config, seed, width, height, format)
+
+class RenderCache:
+    """Rendered images stored by `render_key`, on disk and in memory.
+    
+    The disk tier holds up to `max_bytes` of encoded files under
+    `directory` and evicts the least recently used ones (hits refresh a
+    file's modification time, so processes sharing the directory agree on
+    recency). The memory tier keeps the hottest entries' bytes, up to
+    `memory_bytes`, to skip the disk entirely.
+        
+        cache = RenderCache()
+        png = cache.generate(256, 256, preset='chaos', seed=42, output='thumb.png')
+    """
+    
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES, memory_bytes=DEFAULT_MEMORY_BYTES):
+        self.directory = Path(directory) if directory is not None else default_cache_dir()
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._disk_size = None
+        self._lock = threading.Lock()
+    
+    def _path(self, key, format):
+        return self.directory / key[:2] / f'{key}.{format}'
+    
+    def _remember(self, name, data):
+        # Entries larger than a quarter of the memory tier are left on disk
+        if len(data) > self.memory_bytes // 4:
+            return
+        with self._lock:
+            if name in self._memory:
+                self._memory.move_to_end(name)
+                return
+            self._memory[name] = data
+            self._memory_size += len(data)
+            while self._memory_size > self.memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_size -= len(evicted)
+    
+    def get(self, key, format):
+        """Cached bytes for `key` in `format`, or None."""
+        name = f'{key}.{format}'
+        with self._lock:
+            data = self._memory.get(name)
+            if data is not None:
+                self._memory.move_to_end(name)
+                self.hits += 1
+        if data is not None:
+            # Keep the disk entry as recent as the memory one
+            try:
+                os.utime(self._path(key, format))
+            except FileNotFoundError:
+                pass
+            return data
+        
+        path = self._path(key, format)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            # Also covers a file evicted by another process between the two calls
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._remember(name, data)
+        return data
+    
+    def put_file(self, key, format, filename):
+        """Store a copy of the rendered file `filename` under `key`."""
+        path = self._path(key, format)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Copy under a temporary name first so readers never see a partial file
+        descriptor, temporary = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        os.close(descriptor)
+        try:
+            shutil.copyfile(filename, temporary)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        
+        size = path.stat().st_size
+        if size <= self.memory_bytes // 4:
+            self._remember(f'{key}.{format}', path.read_bytes())
+        with self._lock:
+            if self._disk_size is not None:
+                self._disk_size += size
+        if self._disk_size is None or self._disk_size > self.max_bytes:
+            self.evict()
+    
+    def evict(self):
+        """Delete least recently used files until the disk tier fits `max_bytes`."""
+        entries = []
+        for path in self.directory.glob('*/*.*'):
+            if path.suffix == '.tmp':
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+        with self._lock:
+            self._disk_size = total
+    
+    def clear(self):
+        """Empty both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+            self._disk_size = 0
+        shutil.rmtree(self.directory, ignore_errors=True)
+    
+    def render_to(self, key, format, output, render):
+        """Write the image for `key` to `output`, calling `render(output)` on a miss.
+        
+        Returns True when the image came from the cache.
+        """
+        data = self.get(key, format)
+        if data is not None:
+            Path(output).write_bytes(data)
+            return True
+        render(str(output))
+        self.put_file(key, format, output)
+        return False
+    
+    def generate(self, width=800, height=600, preset='organic', seed=None, output=None, format=None, **kwargs):
+        """Cached `abstro.generate`; returns the encoded image as bytes.
+        
+        The image is written to `output` when given; otherwise `format`
+        (default PNG) picks the encoding. Without a seed every render is
+        different, so nothing is cached.
+        """
+        from .. import generate
+        
+        format = output_format(output) if output is not None else (format or 'png')
+        key = generate_key(width, height, preset, seed, format, **kwargs)
+        
+        with tempfile.TemporaryDirectory() as directory:
+            target = output if output is not None else os.path.join(directory, f'render.{format}')
+            if seed is None:
+                generate(width, height, preset=preset, seed=seed, output=target, **kwargs)
+            else:
+                self.render_to(key, format, target,
+                               lambda path: generate(width, height, preset=preset, seed=seed, output=path, **kwargs))
+            return Path(target).read_bytes()
@@ -1,32 +1,228 @@
 import random
 import numpy as np
-from PIL import Image, ImageDraw
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from io import StringIO
-import xml.etree.ElementTree as ET
+from PIL import Image
 
 from .color import ColorPalette
+from .compositor import validate_blend_mode
+from .indexed import palette_image, recolor, render_indices
+from .raster import Rasterizer
+from .noise import FIELD_SEEDS, field_geometry
+from .brush import BRISTLE_VARIANTS
+from .scene import Scene, CIRCLE, POLYGON, LINE, BEZIER, BLEND, DISC, STAMP, PATH, FIELD, BRUSH
+from .svg import save_svg
+from .symmetry import Symmetry
+from .tiles import (FRAMEBUFFER_EXTENSIONS, open_framebuffer, paint_layers, render_into, render_parallel,
+                    save_framebuffer, save_parallel, save_tiled)
 
 class Canvas:
-    def __init__(self, width=800, height=600, seed=None, background_color=None):
+    # Canvas units are treated as CSS pixels when saving at a given DPI
+    BASE_DPI = 96
+    
+    def __init__(self, width=800, height=600, seed=None, background_color=None,
+                 compositing=False, blend_mode='normal', deferred=False, antialias=False, framebuffer=None,
+                 indexed=False):
         self.width = width
         self.height = height
         self.seed = seed
+        self.background_color = background_color or (255, 255, 255)
+        self.compositing = compositing
+        self.antialias = antialias
+        self.blend_mode = 'normal'
         
-        if seed is not None:
-            random.seed(seed)
-            np.random.seed(seed)
+        # Each canvas owns its random streams so concurrent renders stay deterministic
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed)
         
-        self.image = Image.new('RGB', (width, height), background_color or (255, 255, 255))
-        self.draw = ImageDraw.Draw(self.image)
         self.palette = ColorPalette()
-        self.elements = []
         
-        # For SVG export
-        self.svg_elements = []
+        # Display list shared by the raster and SVG exporters; replayed by render() at any scale
+        self.scene = Scene()
+        
+        # Symmetric canvases store the motif once and unfold it when rendered,
+        # from a raster cached as (scene length, rasterizer)
+        self.symmetry = None
+        self._unfolded = None
+        
+        # A framebuffer canvas rasterizes into an RGBA array instead of a PIL
+        # image: a memmapped `.npy` or raw `.rgba` file, or memory for `True`
+        self.framebuffer = None
+        self._framebuffer_rows = None
+        if framebuffer is True:
+            self.framebuffer = np.empty((height, width, 4), dtype=np.uint8)
+        elif framebuffer is not None:
+            self.framebuffer = open_framebuffer(str(framebuffer), width, height)
+        
+        # An indexed canvas rasterizes palette indices plus a color table, so
+        # set_palette recolors it with one lookup instead of a re-render
+        self.indexed = indexed
+        self._indices = None
+        self._index_rows = None
+        self._color_table = None
+        self._base_palette = None
+        if indexed and (compositing or antialias or self.framebuffer is not None):
+            raise ValueError("Indexed canvases draw opaque shapes; compositing, antialias and "
+                             "framebuffers are not supported")
+        
+        # Deferred canvases only record the scene and rasterize on first use
+        self._raster = None
+        if not deferred and self.framebuffer is None and not indexed:
+            self._raster = self._new_raster(1.0)
+        self.set_blend_mode(blend_mode)
+    
+    def _new_raster(self, scale):
+        size = (max(1, round(self.width * scale)), max(1, round(self.height * scale)))
+        image = Image.new('RGB', size, self.background_color)
+        return Rasterizer(image, scale, compositing=self.compositing, antialias=self.antialias)
+    
+    def _render_raster(self, scale):
+        """A new rasterizer with the whole scene drawn at `scale`."""
+        if self.symmetry is not None:
+            return self.symmetry.render(self.scene, self._new_raster(scale))
+        raster = self._new_raster(scale)
+        raster.render(self.scene)
+        return raster
+    
+    def _materialize(self):
+        if self.framebuffer is not None:
+            raise ValueError("A framebuffer canvas has no PIL raster; draw with the add_* methods")
+        if self.indexed:
+            raise ValueError("An indexed canvas has no RGB raster; draw with the add_* methods")
+        if self.symmetry is not None:
+            if self._unfolded is None or self._unfolded[0] != len(self.scene):
+                self._unfolded = (len(self.scene), self._render_raster(1.0))
+            return self._unfolded[1]
+        if self._raster is None:
+            self._raster = self._render_raster(1.0)
+        return self._raster
+    
+    @property
+    def image(self):
+        if self.framebuffer is not None:
+            # A read-only RGBA view of the framebuffer
+            return Image.frombuffer('RGBA', (self.width, self.height), self.to_array(), 'raw', 'RGBA', 0, 1)
+        if self.indexed:
+            return Image.fromarray(self.to_array())
+        raster = self._materialize()
+        raster.flush()
+        return raster.image
+    
+    @image.setter
+    def image(self, image):
+        self._raster = Rasterizer(image, compositing=self.compositing, blend_mode=self.blend_mode,
+                                  antialias=self.antialias)
+    
+    @property
+    def draw(self):
+        return self._materialize().draw
+    
+    def flush(self):
+        if self._raster is not None:
+            self._raster.flush()
+    
+    def set_symmetry(self, symmetry):
+        """Render the whole canvas with a symmetry: a `Symmetry`, 'bilateral', 'quadrant',
+        'rotational:N', or None to turn it off.
+        
+        Shapes are stored once, so from here on the canvas is rendered from
+        its scene when read instead of being drawn as shapes are added.
+        """
+        self.symmetry = Symmetry.parse(symmetry)
+        if self.symmetry is not None and self._raster is not None:
+            self._raster = None
+        self._unfolded = None
+        self._framebuffer_rows = None
+        self._index_rows = None
+    
+    def to_array(self):
+        """The canvas pixels as a NumPy array.
+        
+        For a framebuffer canvas this is the (height, width, 4) RGBA
+        framebuffer itself, brought up to date with the scene, so no pixels
+        are copied. A PIL-backed canvas returns a (height, width, 3) copy,
+        and an indexed canvas its index buffer looked up in `color_table()`.
+        """
+        if self.indexed:
+            indices, table = self.to_indexed()
+            return np.take(table, indices, axis=0)
+        if self.framebuffer is None:
+            return np.asarray(self.image)
+        if self._framebuffer_rows != len(self.scene):
+            render_into(self.framebuffer, self)
+            self._framebuffer_rows = len(self.scene)
+            if isinstance(self.framebuffer, np.memmap):
+                self.framebuffer.flush()
+        return self.framebuffer
+    
+    def to_indexed(self):
+        """The (height, width) uint8 palette-index buffer and the (n, 3) color table.
+        
+        Only the first call after drawing rasterizes; a new palette only
+        changes the table.
+        """
+        if not self.indexed:
+            raise ValueError("Only canvases created with indexed=True have palette indices")
+        if self._index_rows != len(self.scene):
+            self._indices, self._color_table = render_indices(self.scene, self.width, self.height,
+                                                              self.background_color, symmetry=self.symmetry)
+            self._index_rows = len(self.scene)
+        return self._indices, self._recolor_table(self._color_table)
+    
+    def color_table(self):
+        """The color table of an indexed canvas, recolored to the current palette."""
+        return self.to_indexed()[1]
+    
+    def _recolor_table(self, table):
+        if self._base_palette is None or self._base_palette is self.palette:
+            return table
+        # Row 0 is the background, which keeps its color
+        return np.concatenate((table[:1], recolor(table[1:], self._base_palette, self.palette)))
+    
+    def palette_image(self, scale=1.0):
+        """An 8-bit palette ('P' mode) image of an indexed canvas."""
+        if scale == 1:
+            return palette_image(*self.to_indexed())
+        indices, table = render_indices(self.scene, self.width, self.height, self.background_color, scale,
+                                        self.symmetry)
+        return palette_image(indices, self._recolor_table(table))
+    
+    def render(self, scale=1.0, workers=None):
+        if self.indexed:
+            if workers is not None:
+                raise ValueError("Indexed canvases are rendered whole; workers are not supported")
+            return self.palette_image(scale).convert('RGB')
+        if workers is not None:
+            # Rasterized in bands on `workers` processes (0 for all cores)
+            with render_parallel(self, scale, workers) as frame:
+                image = Image.fromarray(frame)
+                del frame
+            return image
+        if scale == 1:
+            if self.framebuffer is not None:
+                return Image.fromarray(self.to_array()[..., :3])
+            return self.image
+        return self._render_raster(scale).image
+    
+    def _record(self, kind, geometry, fill, outline=None, width=0):
+        index = self.scene.add(kind, geometry, fill, outline, width)
+        if self._raster is not None:
+            # Draw the stored (float32) row, so deferred and tiled renders match
+            self._raster.shape(*self.scene.shape(index))
+    
+    def set_blend_mode(self, blend_mode):
+        validate_blend_mode(blend_mode)
+        if blend_mode != 'normal' and self.indexed:
+            raise ValueError("Indexed canvases draw opaque shapes; blend modes are not supported")
+        if blend_mode != self.blend_mode:
+            self.blend_mode = blend_mode
+            self.scene.add_blend_mode(blend_mode)
+            if self._raster is not None:
+                self._raster.set_blend_mode(blend_mode)
     
     def set_palette(self, palette):
+        # On an indexed canvas with shapes this recolors them: their colors
+        # are mapped from the palette they were drawn with to the new one
+        if self.indexed and len(self.scene) and self._base_palette is None:
+            self._base_palette = self.palette
         if isinstance(palette, list):
             self.palette = ColorPalette(palette)
         elif isinstance(palette, ColorPalette):
@@ -35,94 +231,234 @@ class Canvas:
             self.palette = ColorPalette.from_name(palette)
     
     def get_random_color(self, alpha=255):
-        color = self.palette.get_random_color()
+        color = self.palette.get_random_color(self.rng)
         if alpha < 255:
             return (*color, alpha)
         return color
     
     def clear(self, color=(255, 255, 255)):
-        self.image = Image.new('RGB', (self.width, self.height), color)
-        self.draw = ImageDraw.Draw(self.image)
-        self.elements = []
-        self.svg_elements = []
+        self.background_color = color
+        self.scene = Scene()
+        self._framebuffer_rows = None
+        self._index_rows = None
+        self._base_palette = None
+        self._unfolded = None
+        if self.blend_mode != 'normal':
+            self.scene.add_blend_mode(self.blend_mode)
+        if self._raster is not None:
+            self._raster = self._new_raster(1.0)
+            self._raster.set_blend_mode(self.blend_mode)
     
     def add_circle(self, x, y, radius, fill=None, outline=None, width=1):
         fill = fill or self.get_random_color()
-        bbox = (x - radius, y - radius, x + radius, y + radius)
-        self.draw.ellipse(bbox, fill=fill, outline=outline, width=width)
-        
-        self.svg_elements.append({
-            'type': 'circle',
-            'cx': x, 'cy': y, 'r': radius,
-            'fill': f'rgb{fill[:3]}',
-            'stroke': f'rgb{outline[:3]}' if outline else 'none',
-            'stroke-width': width
-        })
-        
-        self.elements.append(('circle', x, y, radius, fill, outline, width))
+        self._record(CIRCLE, (x, y, radius), fill, outline, width)
     
     def add_polygon(self, points, fill=None, outline=None, width=1):
         fill = fill or self.get_random_color()
-        self.draw.polygon(points, fill=fill, outline=outline, width=width)
-        
-        points_str = ' '.join([f'{x},{y}' for x, y in points])
-        self.svg_elements.append({
-            'type': 'polygon',
-            'points': points_str,
-            'fill': f'rgb{fill[:3]}',
-            'stroke': f'rgb{outline[:3]}' if outline else 'none',
-            'stroke-width': width
-        })
-        
-        self.elements.append(('polygon', points, fill, outline, width))
+        self._record(POLYGON, [v for point in points for v in point], fill, outline, width)
     
     def add_line(self, x1, y1, x2, y2, fill=None, width=2):
         fill = fill or self.get_random_color()
-        self.draw.line([(x1, y1), (x2, y2)], fill=fill, width=width)
-        
-        self.svg_elements.append({
-            'type': 'line',
-            'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2,
-            'stroke': f'rgb{fill[:3]}',
-            'stroke-width': width
-        })
-        
-        self.elements.append(('line', x1, y1, x2, y2, fill, width))
+        self._record(LINE, (x1, y1, x2, y2), fill, None, width)
     
     def add_bezier(self, points, fill=None, width=2):
         fill = fill or self.get_random_color()
         if len(points) >= 4:
-            for i in range(0, len(points) - 3, 3):
-                p1, p2, p3, p4 = points[i:i+4]
-                self._draw_bezier_curve(p1, p2, p3, p4, fill, width)
+            self._record(BEZIER, [v for point in points for v in point], fill, None, width)
+    
+    def add_brush_stroke(self, points, fill=None, width=8, pressure=0.5, bristles=None):
+        """Add a bezier stroke (1 + 3k control points) painted with a bristle brush.
+        
+        The brush presses down from `pressure` at the ends to full pressure
+        halfway, which widens the stroke to `width` and lays on more paint.
+        `bristles` picks one of BRISTLE_VARIANTS bristle patterns (random by
+        default). The paint a stroke leaves is blended as its alpha, while
+        the fill's own alpha still only counts when compositing.
+        """
+        fill = fill or self.get_random_color()
+        if bristles is None:
+            bristles = int(self.np_rng.integers(BRISTLE_VARIANTS))
+        if len(points) >= 4:
+            self._record(BRUSH, [bristles, pressure, *(v for point in points for v in point)], fill, None, width)
+    
+    def add_brush_strokes(self, points, sizes, colors, widths=8, pressures=0.5, bristles=None):
+        """Add many brush strokes at once from their (sum(sizes), 2) control points, stroke by stroke.
+        
+        `widths`, `pressures` and `bristles` are per stroke or shared; see
+        `add_brush_stroke`. The strokes are stamped together, which is far
+        cheaper per stroke than adding them one at a time.
+        """
+        sizes = np.asarray(sizes, dtype=np.int64)
+        count = len(sizes)
+        if count == 0:
+            return
+        if bristles is None:
+            bristles = self.np_rng.integers(BRISTLE_VARIANTS, size=count)
+        # Each row is the stroke's bristles and pressure, then its control points
+        lengths = 2 + 2 * sizes
+        starts = np.cumsum(lengths) - lengths
+        geometry = np.empty(lengths.sum(), dtype=np.float32)
+        header = np.zeros(len(geometry), dtype=bool)
+        header[starts] = header[starts + 1] = True
+        geometry[header] = np.column_stack((np.broadcast_to(bristles, count),
+                                            np.broadcast_to(pressures, count))).ravel()
+        geometry[~header] = np.asarray(points, dtype=np.float64).ravel()
+        self.scene.add_batch(BRUSH, geometry, lengths, colors, None, widths)
+        if self._raster is not None:
+            self._raster.brushes(np.split(geometry, starts[1:]), colors, widths)
+    
+    def _record_batch(self, kind, geometry, sizes, colors, outlines=None, widths=0):
+        start = self.scene.add_batch(kind, geometry, sizes, colors, outlines, widths)
+        if self._raster is not None:
+            for index in range(start, len(self.scene)):
+                self._raster.shape(*self.scene.shape(index))
     
-    def _draw_bezier_curve(self, p1, p2, p3, p4, color, width):
-        t_values = np.linspace(0, 1, 50)
-        curve_points = []
+    def add_circles(self, xs, ys, radii, colors, outlines=None, width=1):
+        """Add many circles at once; `colors` and `outlines` are (n, 3) or (n, 4) arrays.
         
-        for t in t_values:
-            x = (1-t)**3 * p1[0] + 3*(1-t)**2*t * p2[0] + 3*(1-t)*t**2 * p3[0] + t**3 * p4[0]
-            y = (1-t)**3 * p1[1] + 3*(1-t)**2*t * p2[1] + 3*(1-t)*t**2 * p3[1] + t**3 * p4[1]
-            curve_points.append((int(x), int(y)))
+        They are filled by the vectorized disc rasterizer rather than one
+        `ImageDraw` call each, with anti-aliased edges if the canvas has `antialias`.
+        """
+        geometry = np.column_stack((xs, ys, radii)).astype(np.float32)
+        if len(geometry) == 0:
+            return
+        self.scene.add_batch(DISC, geometry, np.full(len(geometry), 3), colors, outlines, width)
+        if self._raster is not None:
+            self._raster.discs(*geometry.T, colors, outlines, width)
+    
+    def add_stamps(self, xs, ys, radii, sides, colors, angles=0):
+        """Add many filled circles (`sides` 0) and regular polygons, e.g. one per grid cell.
         
-        for i in range(len(curve_points) - 1):
-            self.draw.line([curve_points[i], curve_points[i+1]], fill=color, width=width)
+        Polygons have their first vertex at `angles` (radians). Each distinct
+        shape is rasterized once, anti-aliased if the canvas has `antialias`,
+        and copied to every position that uses it.
+        """
+        count = len(xs)
+        if count == 0:
+            return
+        sides = np.broadcast_to(sides, count)
+        angles = np.broadcast_to(angles, count)
+        geometry = np.column_stack((xs, ys, np.broadcast_to(radii, count), sides, angles)).astype(np.float32)
+        self.scene.add_batch(STAMP, geometry, np.full(count, 5), colors)
+        if self._raster is not None:
+            self._raster.stamps(*geometry.T, colors)
+    
+    def add_polygons(self, points, sides, colors, outlines=None, width=1):
+        """Add many polygons at once from their (sum(sides), 2) vertices, polygon by polygon."""
+        self._record_batch(POLYGON, points, 2 * np.asarray(sides), colors, outlines, width)
+    
+    def add_lines(self, x1, y1, x2, y2, colors, widths=2):
+        geometry = np.column_stack((x1, y1, x2, y2))
+        self._record_batch(LINE, geometry, np.full(len(geometry), 4), colors, None, widths)
+    
+    def add_polylines(self, points, sizes, colors, widths=2):
+        """Add many open polylines at once from their (sum(sizes), 2) points, line by line."""
+        self._record_batch(PATH, points, 2 * np.asarray(sizes), colors, None, widths)
+    
+    def add_field(self, scale=200, octaves=4, lacunarity=2.0, gain=0.5, opacity=1.0, colors=None, seed=None):
+        """Cover the canvas with fractal Perlin noise colored through a gradient.
         
-        self.elements.append(('bezier', [p1, p2, p3, p4], color, width))
+        Features are about `scale` canvas units across, with `octaves - 1`
+        finer layers each `lacunarity` times finer and `gain` times weaker.
+        The noise runs through `colors` (default: the palette) as a gradient
+        and is blended over the canvas with `opacity`: 1 for a background,
+        less for a texture. Only the parameters are recorded, and the field
+        is computed for whatever scale or tile is rendered.
+        """
+        if self.indexed:
+            raise ValueError("Noise fields have too many colors for an indexed canvas")
+        if seed is None:
+            seed = int(self.np_rng.integers(FIELD_SEEDS))
+        colors = self.palette.colors if colors is None else colors
+        self._record(FIELD, field_geometry(seed, scale, octaves, lacunarity, gain, opacity, colors), None)
     
-    def add_noise(self, density=0.1, color_range=None):
+    def new_layer(self, seed=None):
+        """A blank deferred canvas like this one (size, palette and drawing options) to paint a layer on."""
+        layer = Canvas(self.width, self.height, seed=seed, background_color=self.background_color,
+                       compositing=self.compositing, deferred=True, antialias=self.antialias, indexed=self.indexed)
+        layer.palette = self.palette
+        return layer
+    
+    def add_layers(self, layers, workers=None):
+        """Add `layers` (canvases from `new_layer`) one over the next, each composited as a whole.
+        
+        A layer's shapes are blended into a premultiplied layer of their own,
+        which is composited onto the canvas in its blend mode, so layers can
+        be painted apart: with `workers`, an immediate canvas paints them on
+        that many processes (0 for all cores), with the same result. Layers
+        that change their blend mode are drawn shape by shape instead.
+        """
+        start = len(self.scene)
+        grouped = not any((layer.scene.kinds == BLEND).any() for layer in layers)
+        for layer in layers:
+            if grouped and len(layer.scene):
+                self.scene.add_layer(len(layer.scene))
+            self.scene.extend(layer.scene)
+        if self._raster is None:
+            return
+        if workers is None or not grouped:
+            self._raster.render(self.scene, start)
+            return
+        
+        for layer in paint_layers([layer.scene for layer in layers if len(layer.scene)], self._raster.image.size, 1.0,
+                                  self.compositing, self.antialias, workers):
+            self._raster.composite_layer(layer)
+    
+    def sample_colors(self, count, alpha=255):
+        """`count` random palette colors as an (n, 4) uint8 array; `alpha` may be an array."""
+        colors = np.array([c[:3] for c in self.palette.colors], dtype=np.uint8)
+        rgba = np.empty((count, 4), dtype=np.uint8)
+        rgba[:, :3] = colors[self.np_rng.integers(0, len(colors), count)]
+        rgba[:, 3] = alpha
+        return rgba
+    
+    def add_noise(self, density=0.1, color_range=None, legacy=False):
         num_pixels = int(self.width * self.height * density)
-        for _ in range(num_pixels):
-            x = random.randint(0, self.width - 1)
-            y = random.randint(0, self.height - 1)
-            color = self.get_random_color()
-            if color_range:
-                color = tuple(max(0, min(255, c + random.randint(-color_range, color_range))) for c in color)
-            self.draw.point((x, y), fill=color)
-    
-    def save(self, filename, format=None):
-        if filename.lower().endswith('.svg'):
-            self._save_svg(filename)
+        if num_pixels <= 0:
+            return
+        if not legacy:
+            xs, ys, colors = self._sample_noise(num_pixels, color_range)
+        else:
+            # Per-pixel sampling, reproduces the output of earlier releases for a given seed
+            xs, ys, colors = [], [], []
+            for _ in range(num_pixels):
+                xs.append(self.rng.randint(0, self.width - 1))
+                ys.append(self.rng.randint(0, self.height - 1))
+                color = self.get_random_color()
+                if color_range:
+                    color = tuple(max(0, min(255, c + self.rng.randint(-color_range, color_range))) for c in color)
+                colors.append(color[:3])
+            xs, ys, colors = np.array(xs), np.array(ys), np.array(colors, dtype=np.uint8)
+        
+        self.scene.add_points(xs, ys, colors)
+        if self._raster is not None:
+            self._raster.points(xs, ys, colors)
+    
+    def _sample_noise(self, count, color_range=None):
+        xs = self.np_rng.integers(0, self.width, count)
+        ys = self.np_rng.integers(0, self.height, count)
+        
+        colors = np.array([c[:3] for c in self.palette.colors], dtype=np.int16)
+        colors = colors[self.np_rng.integers(0, len(colors), count)]
+        if color_range:
+            colors += self.np_rng.integers(-color_range, color_range + 1, (count, 3), dtype=np.int16)
+            np.clip(colors, 0, 255, out=colors)
+        return xs, ys, colors.astype(np.uint8)
+    
+    def save(self, filename, format=None, scale=None, width=None, dpi=None, precision=2, tile_size=None,
+             workers=None):
+        if self.indexed and (tile_size is not None or workers is not None
+                             or filename.lower().endswith(FRAMEBUFFER_EXTENSIONS)):
+            raise ValueError("Indexed canvases are saved whole, as PNG, JPEG or SVG")
+        if filename.lower().endswith(('.svg', '.svgz')):
+            save_svg(filename, self._recolored_scene(), self.width, self.height, background=self.background_color,
+                     precision=precision, opacity=self.compositing or self.blend_mode != 'normal',
+                     symmetry=self.symmetry)
+        elif filename.lower().endswith(FRAMEBUFFER_EXTENSIONS):
+            # Uncompressed RGBA that can be memory-mapped back without decoding
+            if width is not None:
+                scale = width / self.width
+            save_framebuffer(filename, self, scale or 1.0, tile_size, workers)
         else:
             if format is None:
                 if filename.lower().endswith('.png'):
@@ -132,42 +468,53 @@ class Canvas:
                 else:
                     format = 'PNG'
             
-            self.image.save(filename, format=format)
-    
-    def _save_svg(self, filename):
-        svg_content = f'''<?xml version="1.0" encoding="UTF-8"?>
-<svg width="{self.width}" height="{self.height}" xmlns="http://www.w3.org/2000/svg">'''
-        
-        for element in self.svg_elements:
-            if element['type'] == 'circle':
-                svg_content += f'''
-    <circle cx="{element['cx']}" cy="{element['cy']}" r="{element['r']}" 
-            fill="{element['fill']}" stroke="{element['stroke']}" 
-            stroke-width="{element['stroke-width']}"/>'''
-            elif element['type'] == 'polygon':
-                svg_content += f'''
-    <polygon points="{element['points']}" 
-             fill="{element['fill']}" stroke="{element['stroke']}" 
-             stroke-width="{element['stroke-width']}"/>'''
-            elif element['type'] == 'line':
-                svg_content += f'''
-    <line x1="{element['x1']}" y1="{element['y1']}" 
-          x2="{element['x2']}" y2="{element['y2']}" 
-          stroke="{element['stroke']}" stroke-width="{element['stroke-width']}"/>'''
-        
-        svg_content += '\n</svg>'
-        
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(svg_content)
+            # Rasterize the display list at the requested output resolution
+            if width is not None:
+                scale = width / self.width
+            elif scale is None and dpi is not None:
+                scale = dpi / self.BASE_DPI
+            
+            if workers is not None:
+                # Bands rendered on `workers` processes (0 for all cores), `tile_size` rows each
+                save_parallel(filename, self, scale or 1.0, workers, tile_size, format=format, dpi=dpi)
+                return
+            if tile_size is not None:
+                # Replays the scene band by band; memory stays bounded by the band size
+                if format != 'PNG':
+                    raise ValueError("Tiled rendering writes PNG files only")
+                save_tiled(filename, self, scale or 1.0, tile_size, dpi=dpi)
+                return
+            
+            options = {'dpi': (dpi, dpi)} if dpi is not None else {}
+            if self.indexed and format == 'PNG':
+                # 8-bit palette PNG: a third of the raw data of RGB, and faster to encode
+                self.palette_image(scale or 1.0).save(filename, format=format, **options)
+                return
+            self.render(scale or 1.0).save(filename, format=format, **options)
+    
+    def _recolored_scene(self):
+        if not self.indexed or self._base_palette is None or self._base_palette is self.palette:
+            return self.scene
+        scene = self.scene.copy()
+        for column in (scene._fills, scene._outlines):
+            colors = np.frombuffer(column, dtype=np.uint8).reshape(-1, 4)
+            colors[:, :3] = recolor(colors[:, :3], self._base_palette, self.palette)
+        return scene
     
     def show(self):
         self.image.show()
     
     def copy(self):
-        new_canvas = Canvas(self.width, self.height, seed=None)
-        new_canvas.image = self.image.copy()
-        new_canvas.draw = ImageDraw.Draw(new_canvas.image)
+        new_canvas = Canvas(self.width, self.height, seed=None, background_color=self.background_color,
+                            compositing=self.compositing, deferred=True, antialias=self.antialias,
+                            indexed=self.indexed)
+        new_canvas.blend_mode = self.blend_mode
+        if self._raster is not None:
+            new_canvas.image = self.image.copy()
         new_canvas.palette = self.palette
-        new_canvas.elements = self.elements.copy()
-        new_canvas.svg_elements = self.svg_elements.copy()
-        return new_canvas 
\ No newline at end of file
+        new_canvas._base_palette = self._base_palette
+        new_canvas.symmetry = self.symmetry
+        new_canvas.rng.setstate(self.rng.getstate())
+        new_canvas.np_rng.bit_generator.state = self.np_rng.bit_generator.state
+        new_canvas.scene = self.scene.copy()
+        return new_canvas
\ No newline at end of file
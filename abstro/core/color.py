@@ -29,12 +29,13 @@ class ColorPalette:
         return cls(cls.PREDEFINED_PALETTES.get(name, 'vibrant'))
     
     @classmethod
-    def random_palette(cls, count=5):
+    def random_palette(cls, count=5, rng=None):
+        rng = rng or random
         colors = []
         for _ in range(count):
-            hue = random.random()
-            saturation = random.uniform(0.5, 1.0)
-            value = random.uniform(0.5, 1.0)
+            hue = rng.random()
+            saturation = rng.uniform(0.5, 1.0)
+            value = rng.uniform(0.5, 1.0)
             rgb = colorsys.hsv_to_rgb(hue, saturation, value)
             colors.append(tuple(int(c * 255) for c in rgb))
         return cls(colors)
@@ -62,7 +63,8 @@ class ColorPalette:
         return cls(colors)
     
     @classmethod
-    def analogous_palette(cls, base_color, count=5):
+    def analogous_palette(cls, base_color, count=5, rng=None):
+        rng = rng or random
         if isinstance(base_color, str):
             base_color = cls._hex_to_rgb(base_color)
         
@@ -74,15 +76,15 @@ class ColorPalette:
         
         for i in range(count):
             new_h = (h + (i - count//2) * angle_step / 360) % 1.0
-            new_s = min(1.0, s + random.uniform(-0.2, 0.2))
-            new_v = min(1.0, v + random.uniform(-0.2, 0.2))
+            new_s = min(1.0, s + rng.uniform(-0.2, 0.2))
+            new_v = min(1.0, v + rng.uniform(-0.2, 0.2))
             rgb = colorsys.hsv_to_rgb(new_h, new_s, new_v)
             colors.append(tuple(int(c * 255) for c in rgb))
         
         return cls(colors)
     
-    def get_random_color(self):
-        return random.choice(self.colors)
+    def get_random_color(self, rng=None):
+        return (rng or random).choice(self.colors)
     
     def get_color(self, index):
         return self.colors[index % len(self.colors)]
@@ -1,8 +1,18 @@
-import random
+import itertools
 import math
 import numpy as np
 from abc import ABC, abstractmethod
 
+from .flowfield import FlowField
+from .symmetry import Symmetry
+
+# Canvas units a streamline advances per flow-field step
+FLOW_STEP = 6.0
+
+# Weave size of the oil-painting canvas texture, and its opacity at texture_density 1
+CANVAS_GRAIN = 6
+CANVAS_GRAIN_OPACITY = 0.3
+
 class PatternGenerator:
     def __init__(self, **kwargs):
         self.params = kwargs
@@ -24,8 +34,12 @@ class PatternGenerator:
             self.generators.append(BezierGenerator(**self.params))
         if self.shape_type == 'noise' or self.shape_type == 'mixed':
             self.generators.append(NoiseGenerator(**self.params))
+        if self.shape_type == 'field':
+            self.generators.append(FieldNoiseGenerator(**self.params))
     
     def apply(self, canvas):
+        canvas.set_blend_mode(self.blend_mode)
+        
         if self.shape_type == 'mixed':
             elements_per_generator = self.complexity // len(self.generators)
             remainder = self.complexity % len(self.generators)
@@ -47,52 +61,112 @@ class BaseShapeGenerator(ABC):
 
 class CircleGenerator(BaseShapeGenerator):
     def generate(self, canvas, count):
+        if self.params.get('legacy_shapes', False):
+            return self._generate_legacy(canvas, count)
+        
+        # Every parameter is drawn for all shapes at once
+        rng = canvas.np_rng
+        xs = rng.integers(0, canvas.width + 1, count)
+        ys = rng.integers(0, canvas.height + 1, count)
+        radii = rng.integers(5, min(canvas.width, canvas.height) // 10 + 1, count)
+        
+        fills = canvas.sample_colors(count, alpha=rng.integers(100, 256, count))
+        outlines = canvas.sample_colors(count, alpha=np.where(rng.random(count) < 0.3, 255, 0))
+        
+        canvas.add_circles(xs, ys, radii, fills, outlines)
+    
+    def _generate_legacy(self, canvas, count):
+        # Per-shape sampling, reproduces the output of earlier releases for a given seed
         for _ in range(count):
-            x = random.randint(0, canvas.width)
-            y = random.randint(0, canvas.height)
-            radius = random.randint(5, min(canvas.width, canvas.height) // 10)
+            x = canvas.rng.randint(0, canvas.width)
+            y = canvas.rng.randint(0, canvas.height)
+            radius = canvas.rng.randint(5, min(canvas.width, canvas.height) // 10)
             
-            fill = canvas.get_random_color(alpha=random.randint(100, 255))
-            outline = canvas.get_random_color() if random.random() < 0.3 else None
+            fill = canvas.get_random_color(alpha=canvas.rng.randint(100, 255))
+            outline = canvas.get_random_color() if canvas.rng.random() < 0.3 else None
             
             canvas.add_circle(x, y, radius, fill=fill, outline=outline)
 
 class PolygonGenerator(BaseShapeGenerator):
+    MAX_SIDES = 8
+    
     def generate(self, canvas, count):
+        if self.params.get('legacy_shapes', False):
+            return self._generate_legacy(canvas, count)
+        
+        rng = canvas.np_rng
+        center_x = rng.integers(0, canvas.width + 1, count)
+        center_y = rng.integers(0, canvas.height + 1, count)
+        sides = rng.integers(3, self.MAX_SIDES + 1, count)
+        radius = rng.integers(10, min(canvas.width, canvas.height) // 8 + 1, count)
+        
+        # Vertex angles for a (count, MAX_SIDES) grid in one broadcast; the
+        # columns past each polygon's side count are masked out, and the
+        # row-major mask keeps every polygon's vertices together and in order
+        vertex = np.arange(self.MAX_SIDES)
+        angles = 2 * np.pi * vertex / sides[:, None] + rng.uniform(-0.5, 0.5, (count, self.MAX_SIDES))
+        used = vertex < sides[:, None]
+        xs = center_x[:, None] + radius[:, None] * np.cos(angles)
+        ys = center_y[:, None] + radius[:, None] * np.sin(angles)
+        points = np.column_stack((xs[used], ys[used]))
+        
+        fills = canvas.sample_colors(count, alpha=rng.integers(120, 256, count))
+        outlines = canvas.sample_colors(count, alpha=np.where(rng.random(count) < 0.4, 255, 0))
+        
+        canvas.add_polygons(points, sides, fills, outlines)
+    
+    def _generate_legacy(self, canvas, count):
         for _ in range(count):
-            center_x = random.randint(0, canvas.width)
-            center_y = random.randint(0, canvas.height)
-            sides = random.randint(3, 8)
-            radius = random.randint(10, min(canvas.width, canvas.height) // 8)
+            center_x = canvas.rng.randint(0, canvas.width)
+            center_y = canvas.rng.randint(0, canvas.height)
+            sides = canvas.rng.randint(3, 8)
+            radius = canvas.rng.randint(10, min(canvas.width, canvas.height) // 8)
             
             points = []
             for i in range(sides):
-                angle = (2 * math.pi * i) / sides + random.uniform(-0.5, 0.5)
+                angle = (2 * math.pi * i) / sides + canvas.rng.uniform(-0.5, 0.5)
                 x = center_x + radius * math.cos(angle)
                 y = center_y + radius * math.sin(angle)
                 points.append((x, y))
             
-            fill = canvas.get_random_color(alpha=random.randint(120, 255))
-            outline = canvas.get_random_color() if random.random() < 0.4 else None
+            fill = canvas.get_random_color(alpha=canvas.rng.randint(120, 255))
+            outline = canvas.get_random_color() if canvas.rng.random() < 0.4 else None
             
             canvas.add_polygon(points, fill=fill, outline=outline)
 
 class LineGenerator(BaseShapeGenerator):
     def generate(self, canvas, count):
+        if self.params.get('legacy_shapes', False):
+            return self._generate_legacy(canvas, count)
+        
+        rng = canvas.np_rng
+        # 60% straight lines across the canvas, the rest short strokes
+        straight = rng.random(count) < 0.6
+        x1 = rng.integers(0, canvas.width + 1, count)
+        y1 = rng.integers(0, canvas.height + 1, count)
+        x2 = np.where(straight, rng.integers(0, canvas.width + 1, count), x1 + rng.integers(-100, 101, count))
+        y2 = np.where(straight, rng.integers(0, canvas.height + 1, count), y1 + rng.integers(-100, 101, count))
+        
+        colors = canvas.sample_colors(count)
+        widths = rng.integers(1, 9, count)
+        
+        canvas.add_lines(x1, y1, x2, y2, colors, widths)
+    
+    def _generate_legacy(self, canvas, count):
         for _ in range(count):
-            if random.random() < 0.6:  # Straight lines
-                x1 = random.randint(0, canvas.width)
-                y1 = random.randint(0, canvas.height)
-                x2 = random.randint(0, canvas.width)
-                y2 = random.randint(0, canvas.height)
+            if canvas.rng.random() < 0.6:  # Straight lines
+                x1 = canvas.rng.randint(0, canvas.width)
+                y1 = canvas.rng.randint(0, canvas.height)
+                x2 = canvas.rng.randint(0, canvas.width)
+                y2 = canvas.rng.randint(0, canvas.height)
             else:  # Connected lines (polylines)
-                x1 = random.randint(0, canvas.width)
-                y1 = random.randint(0, canvas.height)
-                x2 = x1 + random.randint(-100, 100)
-                y2 = y1 + random.randint(-100, 100)
+                x1 = canvas.rng.randint(0, canvas.width)
+                y1 = canvas.rng.randint(0, canvas.height)
+                x2 = x1 + canvas.rng.randint(-100, 100)
+                y2 = y1 + canvas.rng.randint(-100, 100)
             
             fill = canvas.get_random_color()
-            width = random.randint(1, 8)
+            width = canvas.rng.randint(1, 8)
             
             canvas.add_line(x1, y1, x2, y2, fill=fill, width=width)
 
@@ -100,19 +174,19 @@ class BezierGenerator(BaseShapeGenerator):
     def generate(self, canvas, count):
         for _ in range(count):
             points = []
-            start_x = random.randint(0, canvas.width)
-            start_y = random.randint(0, canvas.height)
+            start_x = canvas.rng.randint(0, canvas.width)
+            start_y = canvas.rng.randint(0, canvas.height)
             
             for i in range(4):  # Cubic bezier needs 4 points
                 if i == 0:
                     x, y = start_x, start_y
                 else:
-                    x = random.randint(max(0, start_x - 200), min(canvas.width, start_x + 200))
-                    y = random.randint(max(0, start_y - 200), min(canvas.height, start_y + 200))
+                    x = canvas.rng.randint(max(0, start_x - 200), min(canvas.width, start_x + 200))
+                    y = canvas.rng.randint(max(0, start_y - 200), min(canvas.height, start_y + 200))
                 points.append((x, y))
             
             fill = canvas.get_random_color()
-            width = random.randint(2, 10)
+            width = canvas.rng.randint(2, 10)
             
             canvas.add_bezier(points, fill=fill, width=width)
 
@@ -120,54 +194,124 @@ class NoiseGenerator(BaseShapeGenerator):
     def generate(self, canvas, count):
         density = self.params.get('noise_density', 0.001)
         color_range = self.params.get('noise_color_range', 30)
+        legacy = self.params.get('legacy_noise', False)
         
-        canvas.add_noise(density=density, color_range=color_range)
+        canvas.add_noise(density=density, color_range=color_range, legacy=legacy)
+
+class FieldNoiseGenerator(BaseShapeGenerator):
+    # One layer of fractal noise over the whole canvas, however many shapes are asked for;
+    # an opacity of 1 makes it a background, less a texture over what is already drawn
+    def generate(self, canvas, count):
+        canvas.add_field(scale=self.params.get('field_scale', 200),
+                         octaves=self.params.get('field_octaves', 4),
+                         lacunarity=self.params.get('field_lacunarity', 2.0),
+                         gain=self.params.get('field_gain', 0.5),
+                         opacity=self.params.get('field_opacity', 1.0))
 
 class OrganicGenerator(PatternGenerator):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.flow_field_strength = kwargs.get('flow_field_strength', 0.5)
         self.organic_factor = kwargs.get('organic_factor', 0.8)
+        # Feature size of the flow field, and the number of streamlines (default: one per flowing line)
+        self.flow_scale = kwargs.get('flow_scale', 240)
+        self.particles = kwargs.get('particles')
     
     def apply(self, canvas):
+        canvas.set_blend_mode(self.blend_mode)
+        
+        if self.params.get('legacy_shapes', False):
+            # Random-walk lines, reproduces the output of earlier releases for a given seed
+            for _ in range(self.complexity):
+                if canvas.rng.random() < 0.4:
+                    self._generate_organic_shape(canvas)
+                elif canvas.rng.random() < 0.7:
+                    self._generate_flowing_line(canvas)
+                else:
+                    self._generate_blob(canvas)
+            return
+        
+        layers = []
         for _ in range(self.complexity):
-            if random.random() < 0.4:
-                self._generate_organic_shape(canvas)
-            elif random.random() < 0.7:
-                self._generate_flowing_line(canvas)
+            if canvas.rng.random() < 0.4:
+                layers.append('shape')
+            elif canvas.rng.random() < 0.7:
+                layers.append('line')
             else:
-                self._generate_blob(canvas)
+                layers.append('blob')
+        
+        # Every run of flowing lines is drawn as one batch of streamlines
+        runs = [(layer, len(list(group))) for layer, group in itertools.groupby(layers)]
+        streamlines = self._trace_streamlines(canvas, [count for layer, count in runs if layer == 'line'])
+        for layer, count in runs:
+            if layer == 'line':
+                canvas.add_polylines(*next(streamlines))
+                continue
+            for _ in range(count):
+                if layer == 'shape':
+                    self._generate_organic_shape(canvas)
+                else:
+                    self._generate_blob(canvas)
+    
+    def _trace_streamlines(self, canvas, runs):
+        """Yield (points, sizes, colors, widths) for `add_polylines`, one batch per run of flowing lines.
+        
+        All streamlines are traced through one flow field together; `particles`
+        of them are shared among the runs in proportion to their lengths.
+        """
+        if not runs:
+            return
+        rng = canvas.np_rng
+        total = self.particles if self.particles is not None else sum(runs)
+        bounds = np.round(np.cumsum([0] + runs) / sum(runs) * total).astype(np.int64)
+        
+        field = FlowField(canvas.width, canvas.height, rng, scale=self.flow_scale,
+                          turbulence=1 + self.organic_factor)
+        xs = rng.uniform(0, canvas.width, total)
+        ys = rng.uniform(0, canvas.height, total)
+        # As long as the random-walk lines were: 5-15 segments of 10-50 units, times the strength
+        lengths = rng.integers(5, 16, total) * rng.uniform(10, 50, total) * self.flow_field_strength
+        steps = np.maximum(1, np.ceil(lengths / FLOW_STEP)).astype(np.int64)
+        points, sizes = field.trace(xs, ys, int(steps.max(initial=1)), FLOW_STEP)
+        sizes = np.minimum(sizes, steps + 1)
+        points = points[np.arange(points.shape[1]) < sizes[:, None]]
+        colors = canvas.sample_colors(total)
+        widths = rng.integers(2, 9, total)
+        
+        offsets = np.concatenate(([0], np.cumsum(sizes)))
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            yield points[offsets[start]:offsets[end]], sizes[start:end], colors[start:end], widths[start:end]
     
     def _generate_organic_shape(self, canvas):
-        center_x = random.randint(50, canvas.width - 50)
-        center_y = random.randint(50, canvas.height - 50)
-        base_radius = random.randint(20, 80)
+        center_x = canvas.rng.randint(50, canvas.width - 50)
+        center_y = canvas.rng.randint(50, canvas.height - 50)
+        base_radius = canvas.rng.randint(20, 80)
         
         points = []
-        sides = random.randint(6, 16)
+        sides = canvas.rng.randint(6, 16)
         
         for i in range(sides):
             angle = (2 * math.pi * i) / sides
-            noise_factor = 1 + random.uniform(-self.organic_factor, self.organic_factor)
+            noise_factor = 1 + canvas.rng.uniform(-self.organic_factor, self.organic_factor)
             radius = base_radius * noise_factor
             
             x = center_x + radius * math.cos(angle)
             y = center_y + radius * math.sin(angle)
             points.append((x, y))
         
-        fill = canvas.get_random_color(alpha=random.randint(80, 200))
+        fill = canvas.get_random_color(alpha=canvas.rng.randint(80, 200))
         canvas.add_polygon(points, fill=fill)
     
     def _generate_flowing_line(self, canvas):
-        start_x = random.randint(0, canvas.width)
-        start_y = random.randint(0, canvas.height)
+        start_x = canvas.rng.randint(0, canvas.width)
+        start_y = canvas.rng.randint(0, canvas.height)
         
         points = [(start_x, start_y)]
         current_x, current_y = start_x, start_y
         
-        for _ in range(random.randint(5, 15)):
-            angle = random.uniform(0, 2 * math.pi)
-            length = random.randint(10, 50)
+        for _ in range(canvas.rng.randint(5, 15)):
+            angle = canvas.rng.uniform(0, 2 * math.pi)
+            length = canvas.rng.randint(10, 50)
             
             current_x += length * math.cos(angle) * self.flow_field_strength
             current_y += length * math.sin(angle) * self.flow_field_strength
@@ -179,15 +323,15 @@ class OrganicGenerator(PatternGenerator):
         
         if len(points) >= 4:
             fill = canvas.get_random_color()
-            width = random.randint(2, 8)
+            width = canvas.rng.randint(2, 8)
             canvas.add_bezier(points, fill=fill, width=width)
     
     def _generate_blob(self, canvas):
-        x = random.randint(0, canvas.width)
-        y = random.randint(0, canvas.height)
-        radius = random.randint(5, 40)
+        x = canvas.rng.randint(0, canvas.width)
+        y = canvas.rng.randint(0, canvas.height)
+        radius = canvas.rng.randint(5, 40)
         
-        fill = canvas.get_random_color(alpha=random.randint(100, 180))
+        fill = canvas.get_random_color(alpha=canvas.rng.randint(100, 180))
         canvas.add_circle(x, y, radius, fill=fill)
 
 class GeometricGenerator(PatternGenerator):
@@ -197,6 +341,8 @@ class GeometricGenerator(PatternGenerator):
         self.grid_based = kwargs.get('grid_based', False)
     
     def apply(self, canvas):
+        canvas.set_blend_mode(self.blend_mode)
+        
         if self.grid_based:
             self._generate_grid_pattern(canvas)
         elif self.symmetry:
@@ -209,19 +355,33 @@ class GeometricGenerator(PatternGenerator):
         cell_width = canvas.width // grid_size
         cell_height = canvas.height // grid_size
         
+        if not self.params.get('legacy_shapes', False):
+            # Every cell's shape has the same radius, so they are drawn as stamps
+            rng = canvas.np_rng
+            i, j = np.divmod(np.arange(grid_size * grid_size), grid_size)
+            shape_types = rng.integers(0, 3, len(i))  # circle, polygon, line (nothing)
+            sides = np.where(shape_types == 0, 0, rng.integers(3, 7, len(i)))
+            fills = canvas.sample_colors(len(i))
+            
+            drawn = shape_types != 2
+            radius = min(cell_width, cell_height) // 4
+            canvas.add_stamps(i[drawn] * cell_width + cell_width // 2, j[drawn] * cell_height + cell_height // 2,
+                              radius, sides[drawn], fills[drawn])
+            return
+        
         for i in range(grid_size):
             for j in range(grid_size):
                 center_x = i * cell_width + cell_width // 2
                 center_y = j * cell_height + cell_height // 2
                 
-                shape_type = random.choice(['circle', 'polygon', 'line'])
+                shape_type = canvas.rng.choice(['circle', 'polygon', 'line'])
                 fill = canvas.get_random_color()
                 
                 if shape_type == 'circle':
                     radius = min(cell_width, cell_height) // 4
                     canvas.add_circle(center_x, center_y, radius, fill=fill)
                 elif shape_type == 'polygon':
-                    sides = random.randint(3, 6)
+                    sides = canvas.rng.randint(3, 6)
                     radius = min(cell_width, cell_height) // 4
                     points = []
                     for k in range(sides):
@@ -234,28 +394,45 @@ class GeometricGenerator(PatternGenerator):
     def _generate_symmetric_pattern(self, canvas):
         center_x = canvas.width // 2
         center_y = canvas.height // 2
+        legacy = self.params.get('legacy_shapes', False)
+        
+        top = center_y
+        if not legacy:
+            # Only the motif is stored; the canvas unfolds the copies when it renders
+            symmetry = Symmetry.parse(self.symmetry)
+            canvas.set_symmetry(symmetry)
+            if symmetry.kind == 'bilateral':
+                top = 50
         
+        motif = []
         for _ in range(self.complexity // 4):  # Generate quarter, then mirror
-            x = random.randint(center_x, canvas.width - 50)
-            y = random.randint(center_y, canvas.height - 50)
+            x = canvas.rng.randint(center_x, canvas.width - 50)
+            y = canvas.rng.randint(top, canvas.height - 50)
             
-            shape_type = random.choice(['circle', 'polygon'])
+            shape_type = canvas.rng.choice(['circle', 'polygon'])
             fill = canvas.get_random_color()
             
             if shape_type == 'circle':
-                radius = random.randint(5, 30)
-                # Four quadrants
-                canvas.add_circle(x, y, radius, fill=fill)
-                canvas.add_circle(canvas.width - x, y, radius, fill=fill)
-                canvas.add_circle(x, canvas.height - y, radius, fill=fill)
-                canvas.add_circle(canvas.width - x, canvas.height - y, radius, fill=fill)
-            
+                radius = canvas.rng.randint(5, 30)
+                if legacy:
+                    # Four quadrants drawn as shapes, as in earlier releases
+                    mirrored_x = (x, canvas.width - x, x, canvas.width - x)
+                    mirrored_y = (y, y, canvas.height - y, canvas.height - y)
+                    for mx, my in zip(mirrored_x, mirrored_y):
+                        canvas.add_circle(mx, my, radius, fill=fill)
+                else:
+                    motif.append((x, y, radius, fill))
+        
+        if motif:
+            xs, ys, radii, fills = zip(*motif)
+            canvas.add_circles(xs, ys, radii, fills)
+    
     def _generate_geometric_shapes(self, canvas):
         for _ in range(self.complexity):
-            shape_type = random.choice(['triangle', 'square', 'pentagon', 'hexagon'])
-            center_x = random.randint(0, canvas.width)
-            center_y = random.randint(0, canvas.height)
-            size = random.randint(10, 60)
+            shape_type = canvas.rng.choice(['triangle', 'square', 'pentagon', 'hexagon'])
+            center_x = canvas.rng.randint(0, canvas.width)
+            center_y = canvas.rng.randint(0, canvas.height)
+            size = canvas.rng.randint(10, 60)
             
             if shape_type == 'triangle':
                 points = [
@@ -279,7 +456,7 @@ class GeometricGenerator(PatternGenerator):
                     y = center_y + size * math.sin(angle)
                     points.append((x, y))
             
-            fill = canvas.get_random_color(alpha=random.randint(120, 255))
+            fill = canvas.get_random_color(alpha=canvas.rng.randint(120, 255))
             canvas.add_polygon(points, fill=fill)
 
 class OilPaintingGenerator(PatternGenerator):
@@ -290,57 +467,116 @@ class OilPaintingGenerator(PatternGenerator):
         self.color_mixing = kwargs.get('color_mixing', 0.8)
         self.texture_density = kwargs.get('texture_density', 0.3)
         self.stroke_variation = kwargs.get('stroke_variation', 0.9)
+        self.legacy_noise = kwargs.get('legacy_noise', False)
+        # 'noise' scatters pixels for the canvas texture, 'field' lays a fine noise field over the ground
+        self.canvas_texture = kwargs.get('canvas_texture', 'noise')
+        # 'bezier' paints brush strokes as plain curves, 'bristle' with a bristle brush (see `Canvas.add_brush_strokes`)
+        self.brush_strokes = kwargs.get('brush_strokes', 'bezier')
+        # Processes that rasterize the paint layers side by side (0 for all cores); None paints in order
+        self.layer_workers = kwargs.get('layer_workers')
     
     def apply(self, canvas):
+        canvas.set_blend_mode(self.blend_mode)
+        
         # Base texture layer
         self._add_canvas_texture(canvas)
         
         # Paint layers - simulate oil painting technique
         layers = ['background', 'midground', 'highlights', 'details']
         
-        for i, layer in enumerate(layers):
-            layer_complexity = self.complexity // len(layers)
-            alpha_range = self._get_alpha_for_layer(i)
-            
+        if self.params.get('legacy_shapes', False):
+            # One random stream for all layers, reproduces earlier releases for a given seed
+            for i, layer in enumerate(layers):
+                self._paint_layer(canvas, i, layer)
+            return
+        
+        # Each layer is painted on its own canvas from a seed of its own, so
+        # the layers don't depend on each other until they are composited
+        seeds = canvas.np_rng.integers(0, 2 ** 63, len(layers))
+        paintings = []
+        for i, (layer, seed) in enumerate(zip(layers, seeds)):
+            painting = canvas.new_layer(int(seed))
+            self._paint_layer(painting, i, layer)
+            paintings.append(painting)
+        canvas.add_layers(paintings, workers=self.layer_workers)
+    
+    def _paint_layer(self, canvas, index, layer):
+        layer_complexity = self.complexity // 4
+        alpha_range = self._get_alpha_for_layer(index)
+        
+        if self.params.get('legacy_shapes', False):
             for _ in range(layer_complexity):
-                if random.random() < 0.6:
+                if canvas.rng.random() < 0.6:
+                    self._paint_brush_stroke(canvas, alpha_range, layer)
+                elif canvas.rng.random() < 0.8:
+                    self._paint_color_blob(canvas, alpha_range, layer)
+                else:
+                    self._paint_impasto_effect(canvas, alpha_range)
+            return
+        
+        # The layer's marks are chosen up front and painted in that order
+        marks = ['stroke' if canvas.rng.random() < 0.6 else 'blob' if canvas.rng.random() < 0.8 else 'impasto'
+                 for _ in range(layer_complexity)]
+        if self.brush_strokes != 'bristle':
+            for mark in marks:
+                if mark == 'stroke':
                     self._paint_brush_stroke(canvas, alpha_range, layer)
-                elif random.random() < 0.8:
+                elif mark == 'blob':
                     self._paint_color_blob(canvas, alpha_range, layer)
                 else:
                     self._paint_impasto_effect(canvas, alpha_range)
+            return
+        
+        # Bristle strokes are painted in one batch, so they are grouped by
+        # kind instead: color blobs, the strokes over them, and impasto on top
+        for _ in range(marks.count('blob')):
+            self._paint_color_blob(canvas, alpha_range, layer)
+        
+        strokes = [self._brush_stroke(canvas, alpha_range, layer) for _ in range(marks.count('stroke'))]
+        if strokes:
+            points, colors, widths = zip(*strokes)
+            # Pressure at the two ends of each stroke; it rises to full in the middle
+            canvas.add_brush_strokes(np.concatenate(points), [len(p) for p in points], colors, widths,
+                                     canvas.np_rng.uniform(0.2, 0.6, len(strokes)))
+        
+        for _ in range(marks.count('impasto')):
+            self._paint_impasto_effect(canvas, alpha_range)
     
     def _add_canvas_texture(self, canvas):
-        # Simulate canvas texture with noise
+        if self.canvas_texture == 'field' and not self.legacy_noise and not canvas.indexed:
+            # Canvas grain: fine noise in the palette's colors, laid thinly over the ground;
+            # it covers every pixel, so images take longer to render and compress worse
+            grain = FieldNoiseGenerator(field_scale=CANVAS_GRAIN, field_octaves=3,
+                                        field_opacity=self.texture_density * CANVAS_GRAIN_OPACITY)
+            grain.generate(canvas, 1)
+            return
+        
+        # Simulate canvas texture with noise: subtle color variations of the palette.
+        # Indexed canvases always use it, a field would exceed their 256 colors
         texture_density = self.texture_density * 0.005
-        for _ in range(int(canvas.width * canvas.height * texture_density)):
-            x = random.randint(0, canvas.width - 1)
-            y = random.randint(0, canvas.height - 1)
-            
-            # Subtle canvas color variations
-            base_color = canvas.get_random_color()
-            noise_color = tuple(
-                max(0, min(255, c + random.randint(-15, 15))) for c in base_color
-            )
-            canvas.draw.point((x, y), fill=noise_color)
+        canvas.add_noise(density=texture_density, color_range=15, legacy=self.legacy_noise)
     
     def _paint_brush_stroke(self, canvas, alpha_range, layer):
+        points, paint_color, brush_width = self._brush_stroke(canvas, alpha_range, layer)
+        canvas.add_bezier(points, fill=paint_color, width=brush_width)
+    
+    def _brush_stroke(self, canvas, alpha_range, layer):
         # Simulate brush strokes with bezier curves
-        start_x = random.randint(0, canvas.width)
-        start_y = random.randint(0, canvas.height)
+        start_x = canvas.rng.randint(0, canvas.width)
+        start_y = canvas.rng.randint(0, canvas.height)
         
         # Brush stroke direction and flow
-        stroke_length = random.randint(30, 120)
-        stroke_angle = random.uniform(0, 2 * math.pi)
+        stroke_length = canvas.rng.randint(30, 120)
+        stroke_angle = canvas.rng.uniform(0, 2 * math.pi)
         
         points = [(start_x, start_y)]
         current_x, current_y = start_x, start_y
         
         # Create brush stroke path
-        segments = random.randint(3, 6)
+        segments = canvas.rng.randint(3, 6)
         for i in range(segments):
             # Add some natural variation to the stroke
-            angle_variation = random.uniform(-0.3, 0.3) * self.stroke_variation
+            angle_variation = canvas.rng.uniform(-0.3, 0.3) * self.stroke_variation
             length_segment = stroke_length / segments
             
             current_x += length_segment * math.cos(stroke_angle + angle_variation)
@@ -352,56 +588,62 @@ class OilPaintingGenerator(PatternGenerator):
             
             points.append((current_x, current_y))
         
-        if len(points) >= 4:
-            color = self._get_paint_color(canvas, layer)
-            alpha = random.randint(*alpha_range)
-            paint_color = (*color[:3], alpha) if len(color) == 3 else color
-            
-            # Brush stroke width varies based on pressure
-            brush_width = self._get_brush_width()
-            canvas.add_bezier(points, fill=paint_color, width=brush_width)
+        # Always 4 or more points, as there are at least 3 segments
+        color = self._get_paint_color(canvas, layer)
+        alpha = canvas.rng.randint(*alpha_range)
+        paint_color = (*color[:3], alpha) if len(color) == 3 else color
+        
+        # Brush stroke width varies based on pressure
+        brush_width = self._get_brush_width(canvas.rng)
+        return points, paint_color, brush_width
     
     def _paint_color_blob(self, canvas, alpha_range, layer):
         # Simulate paint blobs and color mixing
-        x = random.randint(0, canvas.width)
-        y = random.randint(0, canvas.height)
+        x = canvas.rng.randint(0, canvas.width)
+        y = canvas.rng.randint(0, canvas.height)
         
         # Irregular blob shape
-        blob_size = random.randint(10, 40)
-        sides = random.randint(8, 16)  # More sides for organic shape
+        blob_size = canvas.rng.randint(10, 40)
+        sides = canvas.rng.randint(8, 16)  # More sides for organic shape
         
         points = []
         for i in range(sides):
             angle = (2 * math.pi * i) / sides
             # Irregular radius for organic blob shape
-            radius = blob_size * random.uniform(0.5, 1.5)
+            radius = blob_size * canvas.rng.uniform(0.5, 1.5)
             point_x = x + radius * math.cos(angle)
             point_y = y + radius * math.sin(angle)
             points.append((point_x, point_y))
         
         color = self._get_paint_color(canvas, layer)
-        alpha = random.randint(*alpha_range)
+        alpha = canvas.rng.randint(*alpha_range)
         paint_color = (*color[:3], alpha) if len(color) == 3 else color
         
         canvas.add_polygon(points, fill=paint_color)
     
     def _paint_impasto_effect(self, canvas, alpha_range):
         # Simulate thick paint (impasto) technique
-        x = random.randint(0, canvas.width)
-        y = random.randint(0, canvas.height)
+        x = canvas.rng.randint(0, canvas.width)
+        y = canvas.rng.randint(0, canvas.height)
         
         # Multiple small thick paint dabs
-        for _ in range(random.randint(2, 5)):
-            dab_x = x + random.randint(-15, 15)
-            dab_y = y + random.randint(-15, 15)
-            dab_size = random.randint(3, 12)
+        dabs = []
+        for _ in range(canvas.rng.randint(2, 5)):
+            dab_x = x + canvas.rng.randint(-15, 15)
+            dab_y = y + canvas.rng.randint(-15, 15)
+            dab_size = canvas.rng.randint(3, 12)
             
             if 0 <= dab_x <= canvas.width and 0 <= dab_y <= canvas.height:
                 color = canvas.get_random_color()
-                alpha = random.randint(180, 255)  # Thick paint is more opaque
-                paint_color = (*color[:3], alpha)
-                
+                alpha = canvas.rng.randint(180, 255)  # Thick paint is more opaque
+                dabs.append((dab_x, dab_y, dab_size, (*color[:3], alpha)))
+        
+        if self.params.get('legacy_shapes', False):
+            for dab_x, dab_y, dab_size, paint_color in dabs:
                 canvas.add_circle(dab_x, dab_y, dab_size, fill=paint_color)
+        elif dabs:
+            dab_x, dab_y, dab_size, paint_color = zip(*dabs)
+            canvas.add_circles(dab_x, dab_y, dab_size, paint_color)
     
     def _get_paint_color(self, canvas, layer):
         base_color = canvas.get_random_color()
@@ -409,7 +651,7 @@ class OilPaintingGenerator(PatternGenerator):
         if self.color_mixing > 0.5:
             # Simulate color mixing
             mix_color = canvas.get_random_color()
-            mixing_ratio = random.uniform(0.2, 0.8) * self.color_mixing
+            mixing_ratio = canvas.rng.uniform(0.2, 0.8) * self.color_mixing
             
             mixed_color = (
                 int(base_color[0] * (1 - mixing_ratio) + mix_color[0] * mixing_ratio),
@@ -430,12 +672,12 @@ class OilPaintingGenerator(PatternGenerator):
         ]
         return alpha_ranges[layer_index]
     
-    def _get_brush_width(self):
+    def _get_brush_width(self, rng):
         if self.brush_size == 'fine':
-            return random.randint(1, 4)
+            return rng.randint(1, 4)
         elif self.brush_size == 'medium':
-            return random.randint(3, 8)
+            return rng.randint(3, 8)
         elif self.brush_size == 'thick':
-            return random.randint(6, 15)
+            return rng.randint(6, 15)
         else:  # mixed
-            return random.randint(1, 12) 
\ No newline at end of file
+            return rng.randint(1, 12) 
\ No newline at end of file
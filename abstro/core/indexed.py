@@ -0,0 +1,94 @@
+import numpy as np
+from PIL import Image
+
+from .raster import Rasterizer
+from .scene import BLEND, LAYER
+
+# Palette-mode PNGs hold at most 256 colors; index 0 is the background
+MAX_COLORS = 256
+
+# Channel distance within which a color counts as a shade of a palette color
+RECOLOR_TOLERANCE = 64
+
+def _pack(colors):
+    colors = colors.astype(np.uint32)
+    return colors[:, 0] << 16 | colors[:, 1] << 8 | colors[:, 2]
+
+def index_scene(scene, background):
+    """A copy of `scene` drawn in palette indices, and its (n, 3) color table.
+    
+    Every fill and outline color is replaced by its index into the table,
+    repeated in the three channels, so the scene rasterizes to an index
+    buffer. Row 0 of the table is the background, which is never recolored.
+    
+    A scene with more than 255 colors (e.g. from jittered noise) keeps the
+    most used ones and draws the rest in the nearest kept color.
+    """
+    indexed = scene.copy()
+    fills = np.frombuffer(indexed._fills, dtype=np.uint8).reshape(-1, 4)
+    outlines = np.frombuffer(indexed._outlines, dtype=np.uint8).reshape(-1, 4)
+    drawn = ~np.isin(indexed.kinds, (BLEND, LAYER))
+    has_outline = drawn & (outlines[:, 3] > 0)
+    
+    keys, inverse, counts = np.unique(np.concatenate((_pack(fills[drawn]), _pack(outlines[has_outline]))),
+                                      return_inverse=True, return_counts=True)
+    colors = np.column_stack((keys >> 16, keys >> 8 & 255, keys & 255)).astype(np.uint8)
+    slots = np.arange(len(keys))
+    if len(keys) >= MAX_COLORS:
+        order = np.argsort(-counts, kind='stable')
+        kept, dropped = np.sort(order[:MAX_COLORS - 1]), order[MAX_COLORS - 1:]
+        slots = np.empty(len(keys), dtype=np.int64)
+        slots[kept] = np.arange(len(kept))
+        distances = ((colors[dropped, None, :].astype(np.int32) - colors[None, kept, :]) ** 2).sum(axis=2)
+        slots[dropped] = distances.argmin(axis=1)
+        colors = colors[kept]
+    
+    table = np.empty((len(colors) + 1, 3), dtype=np.uint8)
+    table[0] = background[:3]
+    table[1:] = colors
+    
+    indices = (1 + slots[inverse]).astype(np.uint8)[:, None]
+    count = drawn.sum()
+    fills[drawn, :3] = indices[:count]
+    outlines[has_outline, :3] = indices[count:]
+    return indexed, table
+
+def render_indices(scene, width, height, background, scale=1.0, symmetry=None):
+    """Rasterize `scene` into a (height, width) uint8 index buffer plus its color table."""
+    indexed, table = index_scene(scene, background)
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    raster = Rasterizer(Image.new('RGB', size, (0, 0, 0)), scale, indexed=True)
+    if symmetry is not None:
+        symmetry.render(indexed, raster)
+    else:
+        raster.render(indexed)
+    return np.ascontiguousarray(np.asarray(raster.image)[..., 0]), table
+
+def recolor(colors, source, target, tolerance=RECOLOR_TOLERANCE):
+    """Move `colors` drawn from the `source` palette onto the `target` palette.
+    
+    Each color is matched to its nearest source palette color and keeps its
+    offset from it, so exact palette colors map to the target color with the
+    same index (wrapping like `ColorPalette.get_color`) and darkened, lightened
+    or jittered shades follow along. Colors further than `tolerance` in any
+    channel from every palette color are left alone.
+    """
+    colors = np.asarray(colors, dtype=np.int16).reshape(-1, 3)
+    source = np.array([c[:3] for c in source], dtype=np.int16)
+    target = np.array([c[:3] for c in target], dtype=np.int16)
+    
+    differences = colors[:, None, :] - source[None, :, :]
+    nearest = (differences.astype(np.int32) ** 2).sum(axis=2).argmin(axis=1)
+    offset = differences[np.arange(len(colors)), nearest]
+    close = np.abs(offset).max(axis=1) <= tolerance
+    
+    result = colors.copy()
+    result[close] = target[nearest[close] % len(target)] + offset[close]
+    return np.clip(result, 0, 255).astype(np.uint8)
+
+def palette_image(indices, table):
+    """An 8-bit palette ('P' mode) PIL image of an index buffer."""
+    image = Image.fromarray(indices)
+    # putpalette turns the 'L' image into a 'P' image
+    image.putpalette(table.tobytes(), 'RGB')
+    return image
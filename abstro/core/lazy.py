@@ -0,0 +1,23 @@
+import importlib
+
+def lazy_attributes(namespace, attributes):
+    """`__getattr__` and `__dir__` for a package that imports some attributes on first access.
+    
+    `namespace` is the package's globals() and `attributes` maps each lazy
+    name to the module (relative to the package) that defines it. A loaded
+    attribute is stored in the namespace, so later lookups skip the hook.
+    """
+    package = namespace['__name__']
+    
+    def __getattr__(name):
+        module = attributes.get(name)
+        if module is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module, package), name)
+        namespace[name] = value
+        return value
+    
+    def __dir__():
+        return sorted(set(namespace) | set(attributes))
+    
+    return __getattr__, __dir__
@@ -0,0 +1,112 @@
+import math
+
+import numpy as np
+
+# Lattice gradients are hashed from a table of this size, so noise repeats every TABLE_SIZE cells
+TABLE_SIZE = 1024
+
+# Noise is mapped to gradient positions 0.5 + FIELD_CONTRAST * noise; fractal
+# noise has a standard deviation of about 0.13, so this spans most of the gradient
+FIELD_CONTRAST = 2.5
+
+# Seeds are stored in float32 scene geometry, which holds integers exactly below 2**24
+FIELD_SEEDS = 1 << 24
+
+def _fade(t):
+    # Perlin's quintic ease curve: zero first and second derivatives at the lattice
+    return t * t * t * (t * (t * 6 - 15) + 10)
+
+def _lattice(seed):
+    rng = np.random.default_rng(seed)
+    permutation = rng.permutation(TABLE_SIZE)
+    angles = rng.uniform(0, 2 * math.pi, TABLE_SIZE)
+    return permutation, np.cos(angles).astype(np.float32), np.sin(angles).astype(np.float32)
+
+def perlin(xs, ys, seed):
+    """Gradient noise, roughly in [-0.7, 0.7], at every point of the grid `xs` by `ys`.
+    
+    `xs` and `ys` are 1-D lattice coordinates (one unit per lattice cell).
+    The corner gradients are hashed from the cell coordinates with a table
+    drawn from `seed`, so any window of the plane can be evaluated on its
+    own and agrees with a larger evaluation, as tiled renders need. Returns
+    a (len(ys), len(xs)) float32 array, computed in one pass.
+    """
+    permutation, gradient_x, gradient_y = _lattice(seed)
+    xs, ys = np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)
+    x0, y0 = np.floor(xs), np.floor(ys)
+    fx, fy = (xs - x0).astype(np.float32)[None, :], (ys - y0).astype(np.float32)[:, None]
+    x0, y0 = x0.astype(np.int64), y0.astype(np.int64)
+    
+    # Gradients of just the lattice points in reach, hashed once each
+    left, top = x0.min(initial=0), y0.min(initial=0)
+    lattice_x = np.arange(left, x0.max(initial=0) + 2) & (TABLE_SIZE - 1)
+    lattice_y = np.arange(top, y0.max(initial=0) + 2) & (TABLE_SIZE - 1)
+    corner = permutation[(permutation[lattice_x][None, :] + lattice_y[:, None]) & (TABLE_SIZE - 1)]
+    corner_x, corner_y = gradient_x[corner], gradient_y[corner]
+    x0 -= left
+    y0 -= top
+    
+    def ramp(dy, dx):
+        # Each corner's gradient dotted with the offset from that corner
+        ramp = corner_x[y0 + dy][:, x0 + dx]
+        ramp *= fx - dx
+        ramp += corner_y[y0 + dy][:, x0 + dx] * (fy - dy)
+        return ramp
+    
+    u, v = _fade(fx), _fade(fy)
+    noise = ramp(0, 0)
+    noise += (ramp(0, 1) - noise) * u
+    bottom = ramp(1, 0)
+    bottom += (ramp(1, 1) - bottom) * u
+    noise += (bottom - noise) * v
+    return noise
+
+def fractal_noise(xs, ys, seed, octaves=4, lacunarity=2.0, gain=0.5):
+    """Sum of `octaves` Perlin layers, each `lacunarity` times finer and `gain` times weaker.
+    
+    Every octave has its own gradients (seeds `seed`, `seed + 1`, ...). The
+    sum is normalized by the total amplitude, so the range matches `perlin`.
+    """
+    xs, ys = np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)
+    total = np.zeros((len(ys), len(xs)), dtype=np.float32)
+    amplitude, frequency, weight = 1.0, 1.0, 0.0
+    for octave in range(int(octaves)):
+        total += amplitude * perlin(xs * frequency, ys * frequency, seed + octave)
+        weight += amplitude
+        frequency *= lacunarity
+        amplitude *= gain
+    if weight:
+        total /= weight
+    return total
+
+def gradient_lut(colors, size=256):
+    """(size, 3) uint8 colors running evenly through the RGB `colors`."""
+    stops = np.asarray(colors, dtype=np.float64).reshape(-1, 3)
+    if len(stops) == 1:
+        return np.repeat(stops, size, axis=0).astype(np.uint8)
+    positions = np.linspace(0, len(stops) - 1, size)
+    lut = np.column_stack([np.interp(positions, np.arange(len(stops)), stops[:, c]) for c in range(3)])
+    return np.round(lut).astype(np.uint8)
+
+def field_geometry(seed, scale, octaves, lacunarity, gain, opacity, colors):
+    """Scene geometry of a noise field: its parameters followed by its RGB gradient stops."""
+    stops = np.asarray([c[:3] for c in colors], dtype=np.float64).ravel()
+    return np.concatenate(([seed, scale, octaves, lacunarity, gain, opacity], stops))
+
+def field_pixels(geometry, size, scale=1.0, origin=(0, 0)):
+    """(height, width, 3) uint8 colors of a noise field for output pixels, and its opacity.
+    
+    `size` is the output window in pixels, `origin` its top-left output
+    pixel and `scale` output pixels per canvas unit. Pixel centers are
+    sampled, so the field looks the same at every scale.
+    """
+    seed, period, octaves, lacunarity, gain, opacity = geometry[:6]
+    width, height = size
+    xs = (np.arange(width) + origin[0] + 0.5) / (scale * period)
+    ys = (np.arange(height) + origin[1] + 0.5) / (scale * period)
+    noise = fractal_noise(xs, ys, int(seed), octaves, lacunarity, gain)
+    
+    lut = gradient_lut(geometry[6:])
+    position = noise * (FIELD_CONTRAST * (len(lut) - 1)) + (len(lut) - 1) / 2
+    index = np.clip(position, 0, len(lut) - 1).astype(np.intp)
+    return lut[index], float(opacity)
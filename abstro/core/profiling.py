@@ -0,0 +1,122 @@
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from . import canvas, generator, raster
+
+# Canvas methods timed while profiling; generator `generate`/`apply` methods
+# are found on every subclass, so user-defined generators are included
+CANVAS_METHODS = ('add_circle', 'add_polygon', 'add_line', 'add_bezier', 'add_noise',
+                  'add_circles', 'add_stamps', 'add_polygons', 'add_lines', 'add_polylines',
+                  'add_brush_stroke', 'add_brush_strokes', 'add_field', 'save')
+
+_lock = threading.Lock()
+_active = None
+
+class ProfileStats:
+    """Call counts and wall time per instrumented function.
+    
+    `total` time includes nested instrumented calls; `self` time excludes
+    them, so the self time of a generator's `generate` is its own work
+    (random numbers and geometry) while drawing shows up under the
+    `Canvas.add_*` rows, rasterization of deferred canvases under
+    `Rasterizer.render` and image encoding under `Canvas.save`.
+    """
+    
+    def __init__(self):
+        self.calls = {}
+        self._lock = threading.Lock()
+        self._stack = threading.local()
+    
+    def _enter(self):
+        frames = self._stack.__dict__.setdefault('frames', [])
+        frames.append(0.0)
+        return time.perf_counter()
+    
+    def _exit(self, name, start):
+        elapsed = time.perf_counter() - start
+        frames = self._stack.frames
+        child_time = frames.pop()
+        if frames:
+            frames[-1] += elapsed
+        with self._lock:
+            entry = self.calls.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] += elapsed - child_time
+    
+    def as_dict(self):
+        """Plain-data stats, e.g. for a metrics pipeline."""
+        return {name: {'calls': calls, 'total_seconds': total, 'self_seconds': own}
+                for name, (calls, total, own) in self.calls.items()}
+    
+    @property
+    def total_seconds(self):
+        return sum(own for _, _, own in self.calls.values())
+    
+    def format_table(self):
+        rows = sorted(self.calls.items(), key=lambda item: item[1][2], reverse=True)
+        overall = self.total_seconds or 1.0
+        lines = [f"{'function':<34} {'calls':>8} {'total ms':>10} {'self ms':>10} {'self %':>7}"]
+        for name, (calls, total, own) in rows:
+            lines.append(f"{name:<34} {calls:>8} {total * 1000:>10.1f} {own * 1000:>10.1f} {own / overall:>7.1%}")
+        return '\n'.join(lines)
+    
+    def __str__(self):
+        return self.format_table()
+
+def _subclasses(cls):
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from _subclasses(subclass)
+
+def _targets():
+    yield canvas.Canvas, CANVAS_METHODS
+    yield raster.Rasterizer, ('render',)
+    for base, method in ((generator.PatternGenerator, 'apply'), (generator.BaseShapeGenerator, 'generate')):
+        for cls in (base, *_subclasses(base)):
+            yield cls, (method,)
+
+def _instrument(function, name, stats):
+    @wraps(function)
+    def timed(*args, **kwargs):
+        start = stats._enter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            stats._exit(name, start)
+    return timed
+
+@contextmanager
+def profile():
+    """Count calls and time the canvas, generator and save hot paths.
+    
+    Instrumentation is installed on entry and removed on exit, so code
+    outside the block runs the plain methods at no extra cost:
+        
+        with abstro.profile() as stats:
+            abstro.generate(preset='chaos', output='chaos.png')
+        print(stats.format_table())
+    """
+    global _active
+    with _lock:
+        if _active is not None:
+            raise RuntimeError("Profiling is already enabled")
+        stats = _active = ProfileStats()
+    
+    originals = []
+    try:
+        for cls, methods in _targets():
+            for method in methods:
+                # Only methods a class defines itself; inherited ones are wrapped on the base
+                function = cls.__dict__.get(method)
+                if function is not None:
+                    originals.append((cls, method, function))
+                    setattr(cls, method, _instrument(function, f'{cls.__name__}.{method}', stats))
+        yield stats
+    finally:
+        for cls, method, function in reversed(originals):
+            setattr(cls, method, function)
+        with _lock:
+            _active = None
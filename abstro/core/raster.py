@@ -0,0 +1,852 @@
+from contextlib import contextmanager
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from .brush import stroke_coverage
+from .compositor import Compositor
+from .noise import field_pixels
+from .scene import (CIRCLE, POLYGON, LINE, BEZIER, POINT, BLEND, DISC, STAMP, PATH, FIELD, BRUSH, LAYER,
+                    BLEND_MODE_NAMES, layer_rows)
+
+def flatten_bezier(control, width):
+    p = np.asarray(control, dtype=np.float64)
+    
+    # Wang's formula: segments needed to keep the polyline within `tolerance`
+    # of the true curve. Wider strokes hide small deviations, and segments
+    # shorter than a couple of pixels are never useful.
+    tolerance = 0.25 + 0.05 * width
+    second_diff = np.abs(p[:2] - 2 * p[1:3] + p[2:]).max(initial=0.0)
+    segments = np.ceil(np.sqrt(0.75 * second_diff / tolerance))
+    polygon_length = np.hypot(*np.diff(p, axis=0).T).sum()
+    segments = int(np.clip(segments, 1, max(1, min(256, polygon_length / 2))))
+    
+    t = np.linspace(0.0, 1.0, segments + 1)[:, None]
+    mt = 1.0 - t
+    return (mt**3 * p[0] + 3 * mt**2 * t * p[1]
+            + 3 * mt * t**2 * p[2] + t**3 * p[3])
+
+def points_bbox(points, width=0):
+    xy = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    pad = width / 2 + 1
+    x0, y0 = xy.min(axis=0) - pad
+    x1, y1 = xy.max(axis=0) + pad
+    return (x0, y0, x1, y1)
+
+# Pixels of disc windows gathered in one pass; bounds the memory of one pass
+DISC_CHUNK_PIXELS = 1 << 22
+
+# Discs with windows at most this many pixels across are blended together;
+# larger ones cost more per pixel than per call and are blended one by one
+DISC_BATCH_SIZE = 64
+
+# Grid cell size, in pixels, by which disc windows are checked for overlap
+DISC_LEVEL_CELL = 16
+
+# Paint layers hold premultiplied RGBA in a four-band mode whose bands PIL
+# blends independently through a mask (RGBA pastes treat alpha apart)
+LAYER_MODE = 'CMYK'
+
+def _disc_windows(xs, ys, radii, antialias):
+    # Top-left pixels and sizes of the square coverage windows of discs
+    extent = radii + (1.0 if antialias else 0.5)
+    x0 = np.floor(xs - extent).astype(np.int64)
+    y0 = np.floor(ys - extent).astype(np.int64)
+    return x0, y0, np.ceil(2 * extent).astype(np.int64) + 2
+
+def _disc_blocks(xs, ys, radii, ring, antialias):
+    # Coverage of discs grouped by window size: yields each group's disc
+    # indices and their (count, size, size) float32 coverage
+    x0, y0, sizes = _disc_windows(xs, ys, radii, antialias)
+    edge = radii + 0.5
+    inner = None if ring is None else edge - np.asarray(ring, dtype=np.float64)
+    for size in np.unique(sizes):
+        group = np.flatnonzero(sizes == size)
+        grid = np.arange(size)
+        dx = (x0[group, None] + grid - xs[group, None]).astype(np.float32)
+        dy = (y0[group, None] + grid - ys[group, None]).astype(np.float32)
+        distance = np.sqrt(dy[:, :, None] ** 2 + dx[:, None, :] ** 2)
+        
+        outer = edge[group, None, None].astype(np.float32)
+        if antialias:
+            coverage = np.clip(outer + 0.5 - distance, 0.0, 1.0)
+            if inner is not None:
+                coverage -= np.clip(inner[group, None, None].astype(np.float32) + 0.5 - distance, 0.0, 1.0)
+        else:
+            inside = distance <= outer
+            if inner is not None:
+                inside &= distance > inner[group, None, None]
+            coverage = inside.astype(np.float32)
+        yield group, coverage
+
+def _covered_pixels(blocks, lefts, tops, shape):
+    """The covered pixels of square coverage windows inside a (rows, columns) target.
+    
+    `blocks` yields groups of window indices with their coverage, like
+    `_disc_blocks`, and windows sit at `lefts`, `tops`. Yields each group
+    with how many pixels each of its windows covers and those pixels'
+    flat target indices and coverage, window by window.
+    """
+    for group, coverage in blocks:
+        grid = np.arange(coverage.shape[1])
+        rows, columns = tops[group, None] + grid, lefts[group, None] + grid
+        covered = coverage > 0
+        covered &= ((rows >= 0) & (rows < shape[0]))[:, :, None]
+        covered &= ((columns >= 0) & (columns < shape[1]))[:, None, :]
+        found = np.flatnonzero(covered)
+        pixels = (rows[:, :, None] * shape[1] + columns[:, None, :]).ravel()[found]
+        yield group, np.count_nonzero(covered.reshape(len(group), -1), axis=1), pixels, coverage.ravel()[found]
+
+def disc_coverage(xs, ys, radii, ring=None, antialias=False):
+    """Coverage windows for many discs, computed in one broadcast per window size.
+    
+    Returns the windows' top-left pixels and a list with one float32 coverage
+    array per disc. As with `ImageDraw`, pixel centers sit on integer
+    coordinates and the bounding box is inclusive, so the edge lies at
+    `radius + 0.5`. With `ring`, only an outline of that width (per disc)
+    is covered. With `antialias`, edge pixels get fractional coverage.
+    """
+    xs, ys, radii = (np.asarray(v, dtype=np.float64) for v in (xs, ys, radii))
+    windows = [None] * len(xs)
+    for group, coverage in _disc_blocks(xs, ys, radii, ring, antialias):
+        for index, window in zip(group, coverage):
+            windows[index] = window
+    x0, y0, _ = _disc_windows(xs, ys, radii, antialias)
+    return x0, y0, windows
+
+def _disc_levels(lefts, tops, sizes, heights=None):
+    """Blend levels of windows in order; windows of one level share no pixel.
+    
+    Windows are `sizes` wide and as tall (or `heights` tall). A window's
+    level is one above those of all earlier windows touching a common
+    DISC_LEVEL_CELL grid cell, so blending level after level stacks
+    overlapping shapes in their order while each level is one scatter.
+    """
+    count = len(lefts)
+    heights = sizes if heights is None else heights
+    cx0, cy0 = lefts // DISC_LEVEL_CELL, tops // DISC_LEVEL_CELL
+    nx = (lefts + sizes - 1) // DISC_LEVEL_CELL - cx0 + 1
+    ny = (tops + heights - 1) // DISC_LEVEL_CELL - cy0 + 1
+    cells = nx * ny
+    owner = np.repeat(np.arange(count), cells)
+    local = np.arange(len(owner)) - np.repeat(np.cumsum(cells) - cells, cells)
+    column = cx0[owner] + local % nx[owner]
+    row = cy0[owner] + local // nx[owner]
+    key = (row - row.min(initial=0)) * (column.max(initial=0) - column.min(initial=0) + 1) + column
+    
+    # Within a cell levels rise window by window, so each window only
+    # needs to rise above the previous window of each of its cells
+    order = np.argsort(key, kind='stable')
+    key, owner = key[order], owner[order]
+    shared = np.flatnonzero(key[1:] == key[:-1])
+    before, after = owner[shared], owner[shared + 1]
+    order = np.argsort(after, kind='stable')
+    levels = [0] * count
+    for before, after in zip(before[order].tolist(), after[order].tolist()):
+        if levels[before] >= levels[after]:
+            levels[after] = levels[before] + 1
+    return np.array(levels, dtype=np.int64)
+
+# Stamps placed in one vectorized pass; bounds the memory of one pass
+STAMP_CHUNK = 16384
+
+# Stamp positions are snapped to this fraction of a pixel, so nearby
+# placements with the same shape share one cached coverage mask
+STAMP_SUBPIXELS = 8
+
+def stamp_coverage(radius, sides, angle, dx, dy, antialias=False):
+    """Coverage window of a circle (`sides` 0) or regular polygon, and its top-left offset.
+    
+    The shape's center sits `dx`, `dy` (in [0, 1)) right of and below a
+    pixel center. Circles match `disc_coverage`; polygons, whose first
+    vertex points at `angle`, cover the pixels whose centers they contain,
+    or 4x4 samples per pixel with `antialias`.
+    """
+    if sides == 0:
+        x0, y0, windows = disc_coverage([dx], [dy], [radius], antialias=antialias)
+        return int(x0[0]), int(y0[0]), windows[0]
+    
+    offset = int(np.ceil(radius)) + 1
+    size = 2 * offset + 1
+    samples = 4 if antialias else 1
+    grid = (np.arange(size * samples) + 0.5) / samples - 0.5 - offset
+    px = grid[None, :] - dx
+    py = grid[:, None] - dy
+    
+    # Inside every edge of the convex polygon (vertices in order of angle)
+    theta = angle + 2 * np.pi * np.arange(sides) / sides
+    vx, vy = radius * np.cos(theta), radius * np.sin(theta)
+    inside = np.ones((len(grid), len(grid)), dtype=bool)
+    for k in range(sides):
+        ex, ey = vx[(k + 1) % sides] - vx[k], vy[(k + 1) % sides] - vy[k]
+        inside &= ex * (py - vy[k]) - ey * (px - vx[k]) >= -1e-9
+    coverage = inside.reshape(size, samples, size, samples).mean(axis=(1, 3), dtype=np.float32)
+    return -offset, -offset, coverage
+
+def _rows(array):
+    # A contiguous 2-D array's rows as single opaque items, which NumPy
+    # gathers and scatters several times faster than rows of numbers
+    return array.view(np.dtype((np.void, array.shape[1] * array.itemsize))).reshape(-1)
+
+def _blend_window(target, left, top, coverage, color, opacity):
+    """Source-over `color` through one coverage window at (left, top) of `target`.
+    
+    A float32 `target` is a premultiplied layer (and `color` carries alpha 1);
+    a uint8 `target` holds image pixels and is rounded back after blending.
+    """
+    height, width = target.shape[:2]
+    x0, y0 = max(left, 0), max(top, 0)
+    x1 = min(left + coverage.shape[1], width)
+    y1 = min(top + coverage.shape[0], height)
+    if x0 >= x1 or y0 >= y1:
+        return
+    alpha = coverage[y0 - top:y1 - top, x0 - left:x1 - left, None] * opacity
+    region = target[y0:y1, x0:x1]
+    if region.dtype == np.float32:
+        region += (color - region) * alpha
+    else:
+        pixels = region.astype(np.float32)
+        pixels += (color - pixels) * alpha
+        region[...] = pixels + 0.5
+
+class Rasterizer:
+    """Draws scene shapes onto a PIL image, scaling canvas coordinates by `scale`.
+    
+    `origin` is the output pixel at the image's top-left corner, so a tile of
+    a larger render is drawn by a rasterizer with that tile's offset. An
+    `indexed` rasterizer draws palette indices, which cover a pixel wholly
+    or not at all.
+    """
+    
+    def __init__(self, image, scale=1.0, compositing=False, blend_mode='normal', antialias=False, origin=(0, 0),
+                 indexed=False):
+        self.image = image
+        self.draw = ImageDraw.Draw(image)
+        self.scale = scale
+        self.origin = origin
+        self.antialias = antialias
+        self.indexed = indexed
+        # Coverage stamps by shape, see `stamps`
+        self._stamps = {}
+        self.compositor = None
+        if compositing or blend_mode != 'normal':
+            self.compositor = Compositor(image, blend_mode)
+    
+    def set_blend_mode(self, blend_mode):
+        if self.compositor is None:
+            if blend_mode == 'normal':
+                return
+            self.compositor = Compositor(self.image, blend_mode)
+        elif blend_mode != self.compositor.blend_mode:
+            self.flush()
+            self.compositor.blend_mode = blend_mode
+    
+    def flush(self):
+        if self.compositor is not None:
+            self.compositor.flush()
+    
+    def _stroke(self, width):
+        return width if self.scale == 1 else max(1, round(width * self.scale))
+    
+    def _coords(self, coords):
+        if self.scale == 1:
+            return coords
+        return (np.asarray(coords, dtype=np.float64) * self.scale).tolist()
+    
+    def _circle_bbox(self, x, y, radius):
+        if self.scale != 1:
+            x, y, radius = x * self.scale, y * self.scale, radius * self.scale
+        return [x - radius, y - radius, x + radius, y + radius]
+    
+    def _bbox(self, coords, width=0):
+        # Bounding box of output-pixel coordinates, relative to this image
+        x0, y0, x1, y1 = points_bbox(coords, width)
+        return (x0 - self.origin[0], y0 - self.origin[1], x1 - self.origin[0], y1 - self.origin[1])
+    
+    def _draw(self, draw, target, coords, width, draw_shape, ink):
+        """Call `draw_shape(draw, xy, ink)` for output-pixel coordinates `coords`.
+        
+        ImageDraw rounds toward zero, so moving a shape to a tile's origin
+        must not turn any of its coordinates negative, or it would round
+        differently than in a full render. Shapes reaching into a tile from
+        the left or top are drawn on a scratch mask that starts well before
+        them (or at the canvas edge), then pasted into `target`.
+        """
+        if self.origin == (0, 0):
+            draw_shape(draw, coords, ink)
+            return
+        xy = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        left, top = self.origin
+        x0, y0 = np.floor(xy.min(axis=0) - 2 * width - 16)
+        frame = (min(left, max(0, int(x0))), min(top, max(0, int(y0))))
+        if frame == self.origin:
+            draw_shape(draw, (xy - self.origin).ravel().tolist(), ink)
+            return
+        
+        scratch = Image.new('L', (left + target.width - frame[0], top + target.height - frame[1]), 0)
+        draw_shape(ImageDraw.Draw(scratch), (xy - frame).ravel().tolist(), 255)
+        ink = ink if target.mode == 'L' else tuple(ink[:len(target.getbands())])
+        target.paste(ink, (frame[0] - left, frame[1] - top), scratch)
+    
+    def _shape(self, coords, width, draw_shape, fill, outline=None):
+        # Fill then outline, directly or through the compositor
+        for ink, outlined in ((fill, False), (outline, True)):
+            if ink is None:
+                continue
+            stroke = lambda draw, xy, ink, outlined=outlined: draw_shape(draw, xy, ink, outlined)
+            if self.compositor is None:
+                if outlined and fill is not None and self._ink(ink) == self._ink(fill):
+                    # ImageDraw leaves out an outline in the fill's ink, as a full render does
+                    continue
+                self._draw(self.draw, self.image, coords, width, stroke, self._ink(ink))
+            else:
+                mask = self.compositor.mask
+                self.compositor.paint(lambda draw, alpha: self._draw(draw, mask, coords, width, stroke, alpha),
+                                      ink, self._bbox(coords, width))
+    
+    def circle(self, x, y, radius, fill, outline=None, width=1):
+        bbox = self._circle_bbox(x, y, radius)
+        width = self._stroke(width)
+        if self.compositor is None and self.origin == (0, 0):
+            self.draw.ellipse(bbox, fill=self._ink(fill), outline=self._ink(outline), width=width)
+            return
+        self._shape(bbox, width, lambda draw, xy, ink, outlined: draw.ellipse(
+            xy, **({'outline': ink, 'width': width} if outlined else {'fill': ink})), fill, outline)
+    
+    def polygon(self, coords, fill, outline=None, width=1):
+        points = self._coords(coords)
+        width = self._stroke(width)
+        if self.compositor is None and self.origin == (0, 0):
+            self.draw.polygon(points, fill=self._ink(fill), outline=self._ink(outline), width=width)
+            return
+        self._shape(points, width, lambda draw, xy, ink, outlined: draw.polygon(
+            xy, **({'outline': ink, 'width': width} if outlined else {'fill': ink})), fill, outline)
+    
+    def line(self, x1, y1, x2, y2, fill, width=2):
+        xy = self._coords([x1, y1, x2, y2])
+        width = self._stroke(width)
+        self._shape(xy, width, lambda draw, xy, ink, outlined: draw.line(xy, fill=ink, width=width), fill)
+    
+    def bezier(self, coords, fill, width=2):
+        control_points = np.asarray(coords, dtype=np.float64).reshape(-1, 2) * self.scale
+        if len(control_points) < 4:
+            return
+        width = self._stroke(width)
+        
+        # Consecutive cubic segments share end points, so the whole path
+        # is flattened into one polyline and drawn with a single call
+        curves = []
+        for i in range(0, len(control_points) - 3, 3):
+            curves.append(flatten_bezier(control_points[i:i+4], width)[1 if i else 0:])
+        
+        xy = np.concatenate(curves).ravel().tolist()
+        joint = 'curve' if width > 2 else None
+        self._shape(xy, width, lambda draw, xy, ink, outlined: draw.line(xy, fill=ink, width=width, joint=joint), fill)
+    
+    def polyline(self, coords, fill, width=2):
+        """Draw an open polyline with round joins.
+        
+        ImageDraw's curved joints cost a pie slice each, which dominates
+        long, densely sampled paths (flow-field streamlines). Most of their
+        turns are too gentle to open a gap, so only vertices where the
+        outer edge would part by more than a pixel get a disc.
+        """
+        xy = self._coords(coords)
+        width = self._stroke(width)
+        
+        def draw_polyline(draw, xy, ink, outlined):
+            draw.line(xy, fill=ink, width=width)
+            if width <= 2:
+                return
+            points = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+            before, after = np.diff(points[:-1], axis=0), np.diff(points[1:], axis=0)
+            cross = before[:, 0] * after[:, 1] - before[:, 1] * after[:, 0]
+            turns = np.abs(np.arctan2(cross, (before * after).sum(axis=1)))
+            radius = (width - 1) / 2
+            for x, y in points[1:-1][width * np.sin(turns / 2) > 1].tolist():
+                draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=ink)
+        
+        self._shape(xy, width, draw_polyline, fill)
+    
+    def discs(self, xs, ys, radii, fills, outlines=None, widths=1):
+        """Draw many circles (and their outlines) in order.
+        
+        Opaque, aliased discs go straight to `ImageDraw`, whose C fill beats
+        any per-pixel scatter; their boxes and colors are prepared for all
+        discs at once. Anti-aliased or composited discs use `disc_coverage`
+        windows: small ones are sorted into levels whose windows share no
+        pixel (see `_disc_levels`), and each level is blended with one
+        gather and one scatter per window size, fills before outlines, so
+        overlaps still stack in order. Large discs are blended one window at
+        a time. Alpha is honored when compositing, as for the other shapes.
+        """
+        count = len(xs)
+        fills = np.asarray(fills, dtype=np.uint8).reshape(count, -1)
+        widths = np.broadcast_to(np.asarray(widths, dtype=np.float64), (count,))
+        has_outline = np.zeros(count, dtype=bool)
+        if outlines is not None:
+            outlines = np.asarray(outlines, dtype=np.uint8).reshape(count, -1)
+            has_outline = outlines[:, 3] > 0 if outlines.shape[1] > 3 else np.ones(count, dtype=bool)
+        xs = np.asarray(xs, dtype=np.float64) * self.scale
+        ys = np.asarray(ys, dtype=np.float64) * self.scale
+        radii = np.asarray(radii, dtype=np.float64) * self.scale
+        if self.scale != 1:
+            widths = np.maximum(1, np.round(widths * self.scale))
+        
+        if self.compositor is None and not self.antialias:
+            # An ellipse only depends on its box truncated to whole pixels, so
+            # truncating in full-render coordinates draws tiles like the full render
+            boxes = np.column_stack((xs - radii, ys - radii, xs + radii, ys + radii)).astype(np.int64)
+            boxes -= np.tile(self.origin, 2)
+            inks = [tuple(fill) for fill in self._inks(fills).tolist()]
+            rims = [None] * count
+            if outlines is not None:
+                rims = [tuple(outline) if outlined else None
+                        for outline, outlined in zip(self._inks(outlines).tolist(), has_outline.tolist())]
+            ellipse = self.draw.ellipse
+            for box, fill, outline, width in zip(boxes.tolist(), inks, rims, widths.astype(np.int64).tolist()):
+                ellipse(box, fill=fill, outline=outline, width=width)
+            return
+        
+        xs -= self.origin[0]
+        ys -= self.origin[1]
+        reach = radii + 2
+        box = (int(np.floor((xs - reach).min())), int(np.floor((ys - reach).min())),
+               int(np.ceil((xs + reach).max())) + 1, int(np.ceil((ys + reach).max())) + 1)
+        with self._blending(box) as blending:
+            if blending is None:
+                return
+            target, origin, layered = blending
+            paints = [self._disc_paint(fills, layered)]
+            if outlines is not None:
+                paints.append(self._disc_paint(outlines, layered))
+            
+            lefts, tops, sizes = _disc_windows(xs, ys, radii, self.antialias)
+            lefts, tops = lefts - origin[0], tops - origin[1]
+            flat = target.reshape(-1, target.shape[2])
+            pixel_rows = _rows(flat)
+            rings = (None, widths)
+            small = sizes <= DISC_BATCH_SIZE
+            windows = np.cumsum(np.where(small, sizes ** 2, 0))
+            
+            start = 0
+            while start < count:
+                # As many discs as keep the small windows of one pass in bounds
+                budget = (windows[start - 1] if start else 0) + DISC_CHUNK_PIXELS
+                end = max(start + 1, int(np.searchsorted(windows, budget, side='right')))
+                chunk = np.arange(start, end)
+                levels = _disc_levels(lefts[chunk], tops[chunk], sizes[chunk])
+                order = np.argsort(levels, kind='stable')
+                chunk, levels = chunk[order], levels[order]
+                marks = np.arange(levels[-1] + 2)
+                
+                # Covered pixels of the small discs by window size, each size in level order
+                pieces = []
+                for ring, (colors, opacity) in zip(rings, paints):
+                    members = small[chunk] if ring is None else small[chunk] & has_outline[chunk]
+                    discs, disc_levels = chunk[members], levels[members]
+                    blocks = _disc_blocks(xs[discs], ys[discs], radii[discs], None if ring is None else ring[discs],
+                                          self.antialias)
+                    for group, counts, pixel, weight in _covered_pixels(blocks, lefts[discs], tops[discs],
+                                                                        target.shape[:2]):
+                        firsts = np.searchsorted(disc_levels[group], marks)
+                        ends = np.concatenate(([0], np.cumsum(counts)))
+                        pieces.append((discs[group], counts, pixel, weight, firsts, ends[firsts], colors, opacity))
+                large, large_levels = chunk[~small[chunk]], levels[~small[chunk]]
+                
+                for level in marks[:-1].tolist():
+                    # Discs of one level share no pixel: fills, then outlines, one scatter per window size
+                    for discs, counts, pixel, weight, firsts, ends, colors, opacity in pieces:
+                        first, last = firsts[level], firsts[level + 1]
+                        if first == last:
+                            continue
+                        low, high = ends[level], ends[level + 1]
+                        discs, counts = discs[first:last], counts[first:last]
+                        values = np.take(flat, pixel[low:high], axis=0).astype(np.float32)
+                        alpha = weight[low:high] * np.repeat(opacity[discs], counts)
+                        values += (np.repeat(colors[discs], counts, axis=0) - values) * alpha[:, None]
+                        np.put(pixel_rows, pixel[low:high],
+                               _rows(values if layered else (values + 0.5).astype(np.uint8)))
+                    for disc in large[large_levels == level].tolist():
+                        for ring, (colors, opacity) in zip(rings, paints):
+                            if ring is not None and not has_outline[disc]:
+                                continue
+                            window = disc_coverage(xs[disc:disc + 1], ys[disc:disc + 1], radii[disc:disc + 1],
+                                                   None if ring is None else ring[disc:disc + 1], self.antialias)[2][0]
+                            _blend_window(target, lefts[disc], tops[disc], window, colors[disc], opacity[disc])
+                start = end
+    
+    def stamps(self, xs, ys, radii, sides, angles, fills):
+        """Draw many circles (`sides` 0) and regular polygons from cached coverage stamps.
+        
+        Each distinct (radius, sides, angle, subpixel offset) is rasterized
+        once per rasterizer, anti-aliased if the canvas is, and copied to
+        all of its placements. When no two stamps of a chunk touch the same
+        pixel, as in a grid, the chunk is written with one gather and one
+        scatter; otherwise stamps are blended one at a time, in order.
+        """
+        count = len(xs)
+        fills = np.asarray(fills, dtype=np.uint8).reshape(count, -1)
+        radii = np.round(np.asarray(radii, dtype=np.float64) * self.scale * STAMP_SUBPIXELS) / STAMP_SUBPIXELS
+        sides = np.broadcast_to(np.asarray(sides, dtype=np.int64), (count,))
+        angles = np.round(np.broadcast_to(np.asarray(angles, dtype=np.float64), (count,)), 6)
+        
+        # Positions snapped to subpixels: a whole pixel plus a quantized fraction
+        px, fx = np.divmod(np.round((np.asarray(xs, dtype=np.float64) * self.scale - self.origin[0])
+                                    * STAMP_SUBPIXELS).astype(np.int64), STAMP_SUBPIXELS)
+        py, fy = np.divmod(np.round((np.asarray(ys, dtype=np.float64) * self.scale - self.origin[1])
+                                    * STAMP_SUBPIXELS).astype(np.int64), STAMP_SUBPIXELS)
+        
+        # One coverage stamp per distinct shape; `stamp` numbers them for the placements
+        keys, stamp = np.unique(np.column_stack((radii, sides, angles, fx, fy)), axis=0, return_inverse=True)
+        stamp = stamp.ravel()
+        windows = []
+        for radius, count_sides, angle, dx, dy in keys.tolist():
+            key = (radius, int(count_sides), angle, int(dx), int(dy))
+            if key not in self._stamps:
+                self._stamps[key] = stamp_coverage(radius, key[1], angle, dx / STAMP_SUBPIXELS,
+                                                   dy / STAMP_SUBPIXELS, self.antialias)
+            windows.append(self._stamps[key])
+        
+        reach = np.ceil(radii).astype(np.int64) + 3
+        box = (int((px - reach).min()), int((py - reach).min()), int((px + reach).max()) + 1,
+               int((py + reach).max()) + 1)
+        with self._blending(box) as blending:
+            if blending is None:
+                return
+            target, origin, layered = blending
+            colors, opacity = self._disc_paint(fills, layered)
+            px, py = px - origin[0], py - origin[1]
+            rows_total, columns_total = target.shape[:2]
+            flat = target.reshape(-1, target.shape[2])
+            
+            for start in range(0, count, STAMP_CHUNK):
+                chunk = np.arange(start, min(start + STAMP_CHUNK, count))
+                # Covered pixels of every placement, stamp by stamp, as flat target indices
+                pixels, weights, owners = [], [], []
+                for number in np.unique(stamp[chunk]):
+                    left, top, window = windows[number]
+                    placed = chunk[stamp[chunk] == number]
+                    window_rows, window_columns = np.nonzero(window)
+                    rows = (py[placed] + top)[:, None] + window_rows
+                    columns = (px[placed] + left)[:, None] + window_columns
+                    inside = (rows >= 0) & (rows < rows_total) & (columns >= 0) & (columns < columns_total)
+                    pixels.append((rows * columns_total + columns)[inside])
+                    weights.append(np.broadcast_to(window[window_rows, window_columns], rows.shape)[inside])
+                    owners.append(np.broadcast_to(placed[:, None], rows.shape)[inside])
+                index = np.concatenate(pixels)
+                
+                covered = np.zeros(len(flat), dtype=bool)
+                covered[index] = True
+                if np.count_nonzero(covered) == len(index):
+                    owner = np.concatenate(owners)
+                    alpha = (np.concatenate(weights) * opacity[owner])[:, None]
+                    values = flat[index].astype(np.float32)
+                    values += (colors[owner] - values) * alpha
+                    flat[index] = values if layered else values + 0.5
+                    continue
+                for i in chunk:
+                    left, top, window = windows[stamp[i]]
+                    _blend_window(target, px[i] + left, py[i] + top, window, colors[i], opacity[i])
+    
+    def brushes(self, strokes, fills, widths):
+        """Paint brush strokes from their BRUSH geometry (bristles, pressure, control points).
+        
+        All strokes are stamped together into coverage windows (see
+        `brush.stroke_coverage`), whose coverage is the stroke's alpha, so
+        pressure and bristles thin the paint. Like small discs, the windows
+        are sorted into levels that share no pixel (see `_disc_levels`) and
+        each level is blended with one gather and one scatter, into the
+        image or the compositor's layer for other blend modes than normal.
+        Shape alpha is honored when compositing; indexed rasterizers cover
+        the pixels at least half painted.
+        """
+        count = len(strokes)
+        fills = np.asarray(fills, dtype=np.uint8).reshape(count, -1)
+        widths = np.broadcast_to(np.asarray(widths, dtype=np.float64), (count,)) * self.scale
+        variants, pressures = np.empty(count, dtype=np.int64), np.empty(count)
+        segments, owners = [], []
+        for i, geometry in enumerate(strokes):
+            variants[i], pressures[i] = geometry[0], geometry[1]
+            control = np.asarray(geometry[2:], dtype=np.float64).reshape(-1, 2)
+            for k in range(0, len(control) - 3, 3):
+                segments.append(control[k:k+4])
+                owners.append(i)
+        if not segments:
+            return
+        # Strokes are stamped in output pixels, so a tile stamps them like a full render
+        segments, owners = np.array(segments) * self.scale, np.array(owners)
+        
+        # Strokes lie within their control points' hull, widened by the brush;
+        # the image is copied with a margin there, so strokes needn't be clipped
+        reach = widths.max() / 2 + 2
+        low = np.floor(segments.reshape(-1, 2).min(axis=0) - reach - self.origin).astype(np.int64)
+        high = np.ceil(segments.reshape(-1, 2).max(axis=0) + reach - self.origin).astype(np.int64) + 1
+        with self._blending((*low.tolist(), *high.tolist()), pad=True) as blending:
+            if blending is None:
+                return
+            target, origin, layered = blending
+            # Windows are placed in output pixels
+            origin = (self.origin[0] + origin[0], self.origin[1] + origin[1])
+            colors, opacity = self._disc_paint(fills, layered)
+            flat = target.reshape(-1, target.shape[2])
+            pixel_rows = _rows(flat)
+            
+            for drawn, lefts, tops, columns, offsets, found, weight in stroke_coverage(segments, owners, widths,
+                                                                                         pressures, variants):
+                # Target pixels of the painted pixels, window after window
+                window = np.repeat(np.arange(len(drawn)), np.diff(np.searchsorted(found, offsets)))
+                ys, xs = np.divmod(found - offsets[window], columns[window])
+                ys += (tops - origin[1])[window]
+                xs += (lefts - origin[0])[window]
+                pixel = ys * target.shape[1] + xs
+                rows = np.diff(offsets) // columns
+                clipped = ((lefts < origin[0]) | (tops < origin[1]) | (lefts + columns > origin[0] + target.shape[1])
+                           | (tops + rows > origin[1] + target.shape[0]))
+                if clipped.any():
+                    inside = (xs >= 0) & (xs < target.shape[1]) & (ys >= 0) & (ys < target.shape[0])
+                    window, pixel, weight = window[inside], pixel[inside], weight[inside]
+                if self.indexed:
+                    weight = (weight >= 0.5).astype(np.float32)
+                stroke = drawn[window]
+                weight *= opacity[stroke]
+                
+                # Few levels as small integers, which a stable sort orders in linear time
+                levels = _disc_levels(lefts, tops, columns, rows)
+                levels = levels.astype(np.min_scalar_type(levels.max()))[window]
+                order = np.argsort(levels, kind='stable')
+                stroke, pixel, weight = stroke[order], pixel[order], weight[order]
+                ends = np.concatenate(([0], np.cumsum(np.bincount(levels))))
+                for first, last in zip(ends[:-1].tolist(), ends[1:].tolist()):
+                    # Strokes of one level share no pixel: one scatter for all of them
+                    values = np.take(flat, pixel[first:last], axis=0).astype(np.float32)
+                    values += (colors[stroke[first:last]] - values) * weight[first:last, None]
+                    np.put(pixel_rows, pixel[first:last], _rows(values if layered else (values + 0.5).astype(np.uint8)))
+    
+    def field(self, geometry):
+        """Blend a noise field over the whole image (see `noise.field_pixels`).
+        
+        The field's opacity applies whether or not the canvas composites,
+        like a layer's opacity rather than a shape's alpha.
+        """
+        colors, opacity = field_pixels(geometry, self.image.size, self.scale, self.origin)
+        if opacity <= 0:
+            return
+        with self._blending((0, 0, *self.image.size)) as (target, _, layered):
+            if layered:
+                target *= 1 - opacity
+                target[..., :3] += colors * np.float32(opacity / 255)
+                target[..., 3] += opacity
+                return
+            field = Image.fromarray(self._inks(colors.reshape(-1, 3)).reshape(*colors.shape[:2], -1), self.image.mode)
+            if opacity < 1:
+                field = Image.blend(Image.fromarray(target, self.image.mode), field, opacity)
+            target[...] = np.asarray(field)
+    
+    @contextmanager
+    def _blending(self, box, pad=False):
+        """Where shapes batched within `box`, image pixels that may reach past its edges, are blended.
+        
+        Yields (target, origin, layered): for blend modes other than normal
+        the compositor's premultiplied layer, which is marked dirty after;
+        otherwise a copy of the image, pasted back after. `origin` is the
+        image pixel at the target's top-left. The copy is cropped to the
+        image, or with `pad` spans all of `box` so that shapes inside it
+        need no clipping. Yields None when `box` misses the image.
+        """
+        width, height = self.image.size
+        bounds = (max(0, box[0]), max(0, box[1]), min(width, box[2]), min(height, box[3]))
+        if bounds[0] >= bounds[2] or bounds[1] >= bounds[3]:
+            yield None
+            return
+        compositor = self.compositor
+        if compositor is not None and compositor.blend_mode != 'normal':
+            yield compositor.ensure_layer(), (0, 0), True
+            compositor.mark_dirty(bounds)
+            return
+        
+        self.flush()
+        box = box if pad else bounds
+        target = np.array(self.image.crop(box))
+        yield target, box[:2], False
+        target = target[bounds[1] - box[1]:bounds[3] - box[1], bounds[0] - box[0]:bounds[2] - box[0]]
+        self.image.paste(Image.fromarray(np.ascontiguousarray(target), self.image.mode), bounds[:2])
+    
+    def _disc_paint(self, colors, premultiplied):
+        # Blend colors (with alpha 1 for a premultiplied layer, and full alpha
+        # on a paint layer) and opacities; shape alpha only counts when
+        # compositing, as for the other shapes
+        count = len(colors)
+        paint = np.full((count, 4 if premultiplied else len(self.image.getbands())), 1 if premultiplied else 255,
+                        dtype=np.float32)
+        paint[:, :3] = colors[:, :3] / 255.0 if premultiplied else colors[:, :3]
+        opacity = np.ones(count, dtype=np.float32)
+        if self.compositor is not None and colors.shape[1] > 3:
+            opacity = colors[:, 3] / np.float32(255.0)
+        return paint, opacity
+    
+    def _ink(self, color):
+        # A color as drawn on the image: on a paint layer, premultiplied with full alpha
+        if color is None or self.image.mode != LAYER_MODE:
+            return color
+        return (*color[:3], 255)
+    
+    def _inks(self, colors):
+        # (n, 3+) uint8 colors as drawn on the image, like `_ink`
+        colors = np.asarray(colors, dtype=np.uint8)
+        if self.image.mode != LAYER_MODE:
+            return colors[:, :3]
+        inks = np.full((len(colors), 4), 255, dtype=np.uint8)
+        inks[:, :3] = colors[:, :3]
+        return inks
+    
+    def points(self, xs, ys, colors):
+        # Single pixels written in one scatter; later points win, like sequential draws
+        self.flush()
+        width, height = self.image.size
+        if self.scale < 1:
+            # Keep the noise density of the original canvas. Points are kept by
+            # a hash of their position, so any subset of them (a tile) agrees.
+            xs, ys = np.asarray(xs, dtype=np.int64), np.asarray(ys, dtype=np.int64)
+            mixed = ((xs * 0x9E3779B1 + ys * 0x85EBCA77) & 0xFFFFFFFF) * 0x27D4EB2D & 0xFFFFFFFF
+            keep = (mixed >> 16) < self.scale * self.scale * 65536
+            xs = np.floor(xs[keep] * self.scale).astype(np.int64)
+            ys = np.floor(ys[keep] * self.scale).astype(np.int64)
+            colors = np.asarray(colors)[keep]
+        elif self.scale != 1:
+            # A canvas pixel covers a scale x scale block of the target
+            size = max(1, round(self.scale))
+            dy, dx = np.divmod(np.arange(size * size), size)
+            xs = (np.floor(np.asarray(xs) * self.scale).astype(np.int64)[:, None] + dx).ravel()
+            ys = (np.floor(np.asarray(ys) * self.scale).astype(np.int64)[:, None] + dy).ravel()
+            colors = np.repeat(colors, size * size, axis=0)
+        xs = np.asarray(xs) - self.origin[0]
+        ys = np.asarray(ys) - self.origin[1]
+        inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+        xs, ys, colors = xs[inside], ys[inside], np.asarray(colors)[inside]
+        
+        pixels = np.array(self.image)
+        pixels[ys, xs] = self._inks(colors)
+        self.image.paste(Image.fromarray(pixels, self.image.mode))
+    
+    def shape(self, kind, geometry, fill, outline=None, width=1):
+        if kind == CIRCLE:
+            self.circle(*geometry, fill, outline, width)
+        elif kind == POLYGON:
+            self.polygon(geometry, fill, outline, width)
+        elif kind == LINE:
+            self.line(*geometry, fill, width)
+        elif kind == BEZIER:
+            self.bezier(geometry, fill, width)
+        elif kind == PATH:
+            self.polyline(geometry, fill, width)
+        elif kind == FIELD:
+            self.field(geometry)
+        elif kind == POINT:
+            self.points([int(geometry[0])], [int(geometry[1])], [fill[:3]])
+        elif kind == BLEND:
+            self.set_blend_mode(BLEND_MODE_NAMES[int(geometry[0])])
+        elif kind == DISC:
+            self.discs(*([v] for v in geometry), [fill], None if outline is None else [outline], width)
+        elif kind == STAMP:
+            self.stamps(*([v] for v in geometry), [fill])
+        elif kind == BRUSH:
+            self.brushes([geometry], [fill], [width])
+    
+    def paint_layer(self, scene, rows=None):
+        """Paint scene `rows` (default: all) on a layer of their own, leaving the image as it is.
+        
+        The layer is a LAYER_MODE image of premultiplied RGBA, blank where
+        nothing is painted, and shapes go onto it as they would onto the
+        image. Returns it for `composite_layer`. Scenes painted as layers
+        hold no BLEND rows.
+        """
+        if rows is None:
+            rows = np.arange(len(scene))
+        self.flush()
+        image, draw, compositor = self.image, self.draw, self.compositor
+        self.image = Image.new(LAYER_MODE, image.size, (0, 0, 0, 0))
+        self.draw = ImageDraw.Draw(self.image)
+        if compositor is not None:
+            self.compositor = Compositor(self.image)
+        try:
+            self._render_rows(scene, rows)
+            return self.image
+        finally:
+            self.image, self.draw, self.compositor = image, draw, compositor
+    
+    def composite_layer(self, layer):
+        """Composite a layer from `paint_layer` over the image: image * (1 - alpha) + layer."""
+        self.flush()
+        # Layers are mostly blank, so only the pixels they cover are blended
+        covered = np.flatnonzero(np.asarray(layer.getchannel(3)))
+        if not len(covered):
+            return
+        paint = np.take(np.asarray(layer).reshape(-1, 4), covered, axis=0).astype(np.uint16)
+        pixels = np.array(self.image)
+        flat = pixels.reshape(-1, 3)
+        values = np.take(flat, covered, axis=0).astype(np.uint16)
+        values *= 255 - paint[:, 3:]
+        values += 127
+        values //= 255
+        values += paint[:, :3]
+        np.put(_rows(flat), covered, _rows(np.minimum(values, 255).astype(np.uint8)))
+        self.image.paste(Image.fromarray(pixels))
+    
+    def render(self, scene, start=0, stop=None, rows=None):
+        """Draw scene rows `start:stop`, or only the ascending row indices `rows`.
+        
+        The rows of a LAYER row are painted and composited as one layer; a
+        layer within a layer is painted along with it.
+        """
+        if rows is None:
+            rows = np.arange(start, len(scene) if stop is None else stop)
+        index = 0
+        for marker in np.flatnonzero(scene.kinds[rows] == LAYER).tolist():
+            if marker < index:
+                continue
+            self._render_rows(scene, rows[index:marker])
+            row = rows[marker]
+            index = np.searchsorted(rows, row + layer_rows(scene.shape(row)[1]), side='right')
+            layer = rows[marker + 1:index]
+            opaque = self.indexed or not np.isin(scene.kinds[layer], (FIELD, BRUSH)).any()
+            if self.compositor is None and not self.antialias and opaque:
+                # Opaque paint covers a pixel wholly or not at all, so drawing
+                # it in place composites it exactly as its own layer would
+                self._render_rows(scene, layer)
+            else:
+                self.composite_layer(self.paint_layer(scene, layer))
+        self._render_rows(scene, rows[index:])
+        self.flush()
+    
+    def _render_rows(self, scene, rows):
+        kinds = scene.kinds[rows]
+        # Runs of single pixels (noise), discs, stamps and brush strokes are each drawn in one batch
+        batched = (kinds == POINT) | (kinds == DISC) | (kinds == STAMP) | (kinds == BRUSH)
+        run_ends = np.append(np.flatnonzero(kinds[1:] != kinds[:-1]) + 1, len(rows))
+        
+        index = 0
+        while index < len(rows):
+            if not batched[index]:
+                self.shape(*scene.shape(rows[index]))
+                index += 1
+                continue
+            
+            end = run_ends[np.searchsorted(run_ends, index, side='right')]
+            run = rows[index:end]
+            offsets = scene.offsets[run]
+            if kinds[index] == POINT:
+                xy = scene.geometry[offsets[:, None] + np.arange(2)].astype(np.int64)
+                self.points(xy[:, 0], xy[:, 1], scene.fills[run, :3])
+            elif kinds[index] == STAMP:
+                stamps = scene.geometry[offsets[:, None] + np.arange(5)]
+                self.stamps(*stamps.T, scene.fills[run])
+            elif kinds[index] == BRUSH:
+                ends = scene.offsets[run + 1]
+                self.brushes([scene.geometry[start:end] for start, end in zip(offsets.tolist(), ends.tolist())],
+                             scene.fills[run], scene.widths[run])
+            else:
+                circles = scene.geometry[offsets[:, None] + np.arange(3)]
+                self.discs(circles[:, 0], circles[:, 1], circles[:, 2], scene.fills[run],
+                           scene.outlines[run], scene.widths[run])
+            index = end
@@ -0,0 +1,177 @@
+from array import array
+import numpy as np
+
+from .compositor import BLEND_MODES
+
+# Shape type codes
+CIRCLE, POLYGON, LINE, BEZIER, POINT, BLEND, DISC, STAMP, PATH, FIELD, BRUSH, LAYER = range(12)
+BLEND_MODE_NAMES = list(BLEND_MODES)
+
+def _rgba(color):
+    if color is None:
+        return (0, 0, 0, 0)
+    if len(color) > 3:
+        return tuple(color[:4])
+    return (*color, 255)
+
+def _rgba_array(colors, count):
+    colors = np.asarray(colors, dtype=np.uint8).reshape(count, -1)
+    if colors.shape[1] >= 4:
+        return np.ascontiguousarray(colors[:, :4])
+    rgba = np.full((count, 4), 255, dtype=np.uint8)
+    rgba[:, :colors.shape[1]] = colors
+    return rgba
+
+def layer_rows(geometry):
+    """The number of rows in a LAYER row's layer, from its geometry."""
+    return (int(geometry[0]) << 24) + int(geometry[1])
+
+class Scene:
+    """Columnar display list of canvas shapes.
+    
+    One row per shape: a type code, fill and outline RGBA (an outline with
+    zero alpha means "no outline"), a stroke width and a slice of the packed
+    float32 geometry given by `offsets`:
+        
+        CIRCLE   cx, cy, r
+        POLYGON  x0, y0, x1, y1, ...
+        LINE     x1, y1, x2, y2
+        BEZIER   control points x0, y0, ... (1 + 3k points)
+        POINT    x, y               (single pixel, e.g. noise)
+        BLEND    blend mode index   (switches the blend mode for later rows)
+        DISC     cx, cy, r          (circle drawn by the batch disc rasterizer)
+        STAMP    cx, cy, r, sides, angle
+                            (circle if sides is 0, else a regular polygon with
+                            its first vertex at angle; drawn from cached stamps)
+        PATH     x0, y0, x1, y1, ...  (open polyline with round joins)
+        FIELD    seed, scale, octaves, lacunarity, gain, opacity, r0, g0, b0, ...
+                            (fractal noise over the whole canvas, colored
+                            through the RGB gradient stops; see noise.py)
+        BRUSH    bristles, pressure, control points x0, y0, ... (1 + 3k points)
+                            (bezier stroke painted with a bristle kernel;
+                            see brush.py)
+        LAYER    rows // 2**24, rows % 2**24
+                            (the next `rows` rows are painted as one layer
+                            and composited as a whole; float32 keeps both
+                            halves exact)
+    
+    Columns are typed `array.array` buffers, so appends are amortized O(1)
+    and copying the scene is a handful of memcpys. The NumPy properties are
+    zero-copy views for vectorized readers; don't hold them across appends.
+    """
+    
+    def __init__(self):
+        self._kinds = array('B')
+        self._fills = array('B')
+        self._outlines = array('B')
+        self._widths = array('f')
+        self._offsets = array('q', [0])
+        self._geometry = array('f')
+    
+    def __len__(self):
+        return len(self._kinds)
+    
+    def add(self, kind, geometry, fill=None, outline=None, width=0):
+        self._kinds.append(kind)
+        self._fills.extend(_rgba(fill))
+        self._outlines.extend(_rgba(outline))
+        self._widths.append(width)
+        self._geometry.extend(geometry)
+        self._offsets.append(len(self._geometry))
+        return len(self._kinds) - 1
+    
+    def add_batch(self, kind, geometry, sizes, fills, outlines=None, widths=0):
+        """Append one `kind` row per entry of `sizes` in a single vectorized step.
+        
+        `geometry` holds the rows' values back to back, `sizes[i]` of them for
+        row i. Colors are (n, 3) or (n, 4) arrays; outlines with zero alpha
+        mean "no outline", as for single rows.
+        """
+        sizes = np.asarray(sizes, dtype=np.int64)
+        count = len(sizes)
+        if count == 0:
+            return len(self._kinds)
+        outlines = np.zeros((count, 4), dtype=np.uint8) if outlines is None else _rgba_array(outlines, count)
+        widths = np.broadcast_to(np.asarray(widths, dtype=np.float32), (count,))
+        
+        start = len(self._geometry)
+        self._kinds.frombytes(np.full(count, kind, dtype=np.uint8).tobytes())
+        self._fills.frombytes(_rgba_array(fills, count).tobytes())
+        self._outlines.frombytes(outlines.tobytes())
+        self._widths.frombytes(widths.tobytes())
+        self._geometry.frombytes(np.asarray(geometry, dtype=np.float32).tobytes())
+        self._offsets.frombytes((start + np.cumsum(sizes)).tobytes())
+        return len(self._kinds) - count
+    
+    def add_points(self, xs, ys, colors):
+        """Append one POINT row per pixel in a single vectorized step."""
+        count = len(xs)
+        self.add_batch(POINT, np.column_stack((xs, ys)), np.full(count, 2), colors)
+    
+    def add_blend_mode(self, blend_mode):
+        return self.add(BLEND, (BLEND_MODE_NAMES.index(blend_mode),))
+    
+    def add_layer(self, rows):
+        """Mark the next `rows` rows as one paint layer (see `Rasterizer.paint_layer`)."""
+        return self.add(LAYER, divmod(rows, 1 << 24))
+    
+    def extend(self, other, geometry=None):
+        """Append the rows of `other`, optionally with its packed `geometry` replaced (same layout)."""
+        start = len(self._geometry)
+        self._kinds.extend(other._kinds)
+        self._fills.extend(other._fills)
+        self._outlines.extend(other._outlines)
+        self._widths.extend(other._widths)
+        self._offsets.frombytes((other.offsets[1:] + start).tobytes())
+        if geometry is None:
+            self._geometry.extend(other._geometry)
+        else:
+            self._geometry.frombytes(np.asarray(geometry, dtype=np.float32).tobytes())
+    
+    def copy(self):
+        scene = Scene.__new__(Scene)
+        for name in ('_kinds', '_fills', '_outlines', '_widths', '_offsets', '_geometry'):
+            setattr(scene, name, array(getattr(self, name).typecode, getattr(self, name)))
+        return scene
+    
+    @property
+    def kinds(self):
+        return np.frombuffer(self._kinds, dtype=np.uint8)
+    
+    @property
+    def fills(self):
+        return np.frombuffer(self._fills, dtype=np.uint8).reshape(-1, 4)
+    
+    @property
+    def outlines(self):
+        return np.frombuffer(self._outlines, dtype=np.uint8).reshape(-1, 4)
+    
+    @property
+    def widths(self):
+        return np.frombuffer(self._widths, dtype=np.float32)
+    
+    @property
+    def offsets(self):
+        return np.frombuffer(self._offsets, dtype=np.int64)
+    
+    @property
+    def geometry(self):
+        return np.frombuffer(self._geometry, dtype=np.float32)
+    
+    @property
+    def nbytes(self):
+        return sum(column.itemsize * len(column) for column in
+                   (self._kinds, self._fills, self._outlines, self._widths, self._offsets, self._geometry))
+    
+    def shape(self, index):
+        """Row `index` as (kind, geometry list, fill, outline or None, width)."""
+        fill = tuple(self._fills[4 * index:4 * index + 4])
+        outline = tuple(self._outlines[4 * index:4 * index + 4])
+        geometry = self._geometry[self._offsets[index]:self._offsets[index + 1]].tolist()
+        width = self._widths[index]
+        return (self._kinds[index], geometry, fill, outline if outline[3] else None,
+                int(width) if width.is_integer() else width)
+    
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.shape(index)
@@ -0,0 +1,166 @@
+import base64
+import gzip
+import io
+import math
+
+import numpy as np
+
+from .noise import field_pixels
+from .scene import CIRCLE, POLYGON, LINE, BEZIER, BLEND, DISC, STAMP, PATH, FIELD, BRUSH, LAYER, BLEND_MODE_NAMES
+
+XLINK = ' xmlns:xlink="http://www.w3.org/1999/xlink"'
+
+# CSS names for blend modes that differ from ours
+CSS_BLEND_MODES = {'add': 'plus-lighter'}
+
+def _hex(color):
+    return '#%02x%02x%02x' % tuple(color[:3])
+
+def _number_formatter(precision):
+    def number(value):
+        text = f'{value:.{precision}f}'
+        if precision > 0:
+            text = text.rstrip('0').rstrip('.')
+        return '0' if text == '-0' else text
+    return number
+
+def _paint(attribute, color, opacity):
+    paint = f'{attribute}="{_hex(color)}"'
+    if opacity and color[3] < 255:
+        paint += f' {attribute}-opacity="{color[3] / 255:.3g}"'
+    return paint
+
+def _field_image(geometry, width, height, style=''):
+    # Noise has no vector form either; it is embedded as a PNG of the canvas size
+    from PIL import Image
+    
+    colors, opacity = field_pixels(geometry, (width, height))
+    buffer = io.BytesIO()
+    Image.fromarray(colors).save(buffer, format='PNG')
+    data = base64.b64encode(buffer.getvalue()).decode('ascii')
+    opacity = f' opacity="{opacity:.3g}"' if opacity < 1 else ''
+    return f'<image width="{width}" height="{height}"{opacity}{style} xlink:href="data:image/png;base64,{data}"/>\n'
+
+def write_svg(stream, scene, width, height, background=None, precision=2, opacity=False, symmetry=None):
+    """Stream `scene` as SVG text to `stream`.
+    
+    Consecutive shapes with the same style share one `<g>` element, so only
+    their geometry is repeated. Coordinates are rounded to `precision`
+    decimals. With `opacity`, shape alpha is written as fill/stroke opacity.
+    With a `symmetry`, the shapes are written once as a motif group and
+    every other copy is a `<use>` of it with a transform; noise fields are
+    then written once, beneath the motif.
+    """
+    number = _number_formatter(precision)
+    fields = np.flatnonzero(scene.kinds == FIELD)
+    stream.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    stream.write(f'<svg width="{width}" height="{height}" viewBox="0 0 {width} {height}" '
+                 f'xmlns="http://www.w3.org/2000/svg"'
+                 f'{XLINK if symmetry is not None or len(fields) else ""}>\n')
+    if background is not None:
+        stream.write(f'<rect width="100%" height="100%" fill="{_hex(background)}"/>\n')
+    if symmetry is not None:
+        for row in fields:
+            stream.write(_field_image(scene.shape(row)[1], width, height))
+        stream.write('<g id="motif">\n')
+    
+    blend_style = ''
+    current_style = None
+    pending = None
+    group_open = False
+    
+    def close_run():
+        if group_open:
+            stream.write('</g>\n')
+        elif pending is not None:
+            stream.write(f'{pending} {current_style}/>\n')
+    
+    for kind, geometry, fill, outline, stroke_width in scene:
+        if kind == LAYER:
+            # A paint layer's shapes are written in order, as the layer blends them
+            continue
+        if kind == BLEND:
+            close_run()
+            current_style, pending, group_open = None, None, False
+            mode = BLEND_MODE_NAMES[int(geometry[0])]
+            if mode == 'normal':
+                blend_style = ''
+            else:
+                blend_style = f' style="mix-blend-mode:{CSS_BLEND_MODES.get(mode, mode)}"'
+            continue
+        if kind == FIELD:
+            close_run()
+            current_style, pending, group_open = None, None, False
+            if symmetry is None:
+                stream.write(_field_image(geometry, width, height, blend_style))
+            continue
+        
+        if kind == STAMP and geometry[3]:
+            # A regular polygon stamp
+            cx, cy, r, sides, angle = geometry
+            theta = [angle + 2 * math.pi * k / sides for k in range(int(sides))]
+            geometry = [v for t in theta for v in (cx + r * math.cos(t), cy + r * math.sin(t))]
+            kind = POLYGON
+        elif kind == BRUSH:
+            # Bristles have no vector form; the stroke keeps its path and full width
+            geometry = geometry[2:]
+            kind = BEZIER
+        
+        if kind in (CIRCLE, DISC, STAMP):
+            cx, cy, r = geometry[:3]
+            element = f'<circle cx="{number(cx)}" cy="{number(cy)}" r="{number(r)}"'
+        elif kind == POLYGON:
+            points = ' '.join(f'{number(x)},{number(y)}' for x, y in zip(geometry[0::2], geometry[1::2]))
+            element = f'<polygon points="{points}"'
+        elif kind == PATH:
+            points = ' '.join(f'{number(x)},{number(y)}' for x, y in zip(geometry[0::2], geometry[1::2]))
+            element = f'<polyline points="{points}"'
+        elif kind == LINE:
+            x1, y1, x2, y2 = geometry
+            element = f'<line x1="{number(x1)}" y1="{number(y1)}" x2="{number(x2)}" y2="{number(y2)}"'
+        elif kind == BEZIER:
+            coords = [number(v) for v in geometry]
+            path = [f'M{coords[0]} {coords[1]}']
+            for i in range(2, len(coords) - 5, 6):
+                path.append('C' + ' '.join(coords[i:i+6]))
+            element = f'<path d="{"".join(path)}"'
+        else:
+            # Single-pixel noise has no useful vector form
+            continue
+        
+        if kind in (CIRCLE, DISC, STAMP, POLYGON):
+            style = _paint('fill', fill, opacity)
+            if outline:
+                style += f' {_paint("stroke", outline, opacity)} stroke-width="{number(stroke_width)}"'
+        else:
+            style = f'fill="none" {_paint("stroke", fill, opacity)} stroke-width="{number(stroke_width)}"'
+            if kind in (BEZIER, PATH):
+                style += ' stroke-linejoin="round"'
+        style += blend_style
+        
+        if style == current_style:
+            if pending is not None:
+                stream.write(f'<g {style}>\n{pending}/>\n')
+                pending, group_open = None, True
+            stream.write(f'{element}/>\n')
+        else:
+            close_run()
+            current_style, pending, group_open = style, element, False
+    
+    close_run()
+    if symmetry is not None:
+        stream.write('</g>\n')
+        for a, b, c, d, e, f in symmetry.transforms(width - 1, height - 1)[1:]:
+            # Rotation terms need more digits than coordinates
+            matrix = ' '.join(_number_formatter(max(precision, 6))(v) for v in (a, d, b, e, c, f))
+            stream.write(f'<use xlink:href="#motif" transform="matrix({matrix})"/>\n')
+    stream.write('</svg>\n')
+
+def save_svg(filename, scene, width, height, **options):
+    """Write `scene` to an .svg file, or a gzip-compressed one for .svgz."""
+    if str(filename).lower().endswith('.svgz'):
+        stream = gzip.open(filename, 'wt', encoding='utf-8')
+    else:
+        stream = open(filename, 'w', encoding='utf-8')
+    with stream:
+        write_svg(stream, scene, width, height, **options)
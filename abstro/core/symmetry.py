@@ -0,0 +1,221 @@
+import math
+
+import numpy as np
+from PIL import Image
+
+from .scene import Scene, CIRCLE, BLEND, DISC, STAMP, FIELD, BRUSH, LAYER, BLEND_MODE_NAMES
+from .tiles import rows_within, scene_bounds
+
+SYMMETRY_KINDS = ('bilateral', 'quadrant', 'rotational')
+NORMAL = BLEND_MODE_NAMES.index('normal')
+
+class Symmetry:
+    """A symmetry group applied to the whole canvas when it is rendered.
+    
+    The scene holds the motif once, and every render replays it under each
+    transform of the group:
+        
+        bilateral    mirrored left to right (2 copies)
+        quadrant     mirrored left to right and top to bottom (4 copies)
+        rotational   `order` copies turned about the canvas center
+    
+    Mirrors map pixel x to width - 1 - x, so a mirrored half is an exact
+    array flip. For the mirror groups, half turns and quarter turns of a
+    square canvas only the top-left region is rasterized and the rest is
+    unfolded from it with flips; other rotations draw every copy.
+    """
+    
+    def __init__(self, kind='quadrant', order=None):
+        if kind not in SYMMETRY_KINDS:
+            raise ValueError(f"Unknown symmetry: {kind}. Available: {', '.join(SYMMETRY_KINDS)}")
+        if kind == 'rotational':
+            order = 4 if order is None else int(order)
+            if order < 2:
+                raise ValueError("Rotational symmetry needs an order of at least 2")
+        else:
+            order = 2 if kind == 'bilateral' else 4
+        self.kind = kind
+        self.order = order
+    
+    @classmethod
+    def parse(cls, value):
+        """A Symmetry from a kind name, 'rotational:N', an order N, True (quadrant) or a Symmetry."""
+        if value is None or value is False:
+            return None
+        if isinstance(value, Symmetry):
+            return value
+        if value is True:
+            return cls()
+        if isinstance(value, int):
+            return cls('rotational', value)
+        kind, _, order = str(value).partition(':')
+        return cls(kind, order or None)
+    
+    def __repr__(self):
+        return f"Symmetry({self.kind!r}, order={self.order})"
+    
+    def transforms(self, right, bottom):
+        """Affine maps (a, b, c, d, e, f) with x' = ax + by + c and y' = dx + ey + f, identity first.
+        
+        `right` and `bottom` are the canvas coordinates of the last pixel
+        column and row; mirror axes and the rotation center lie halfway.
+        """
+        if self.kind == 'bilateral':
+            return [(1, 0, 0, 0, 1, 0), (-1, 0, right, 0, 1, 0)]
+        if self.kind == 'quadrant':
+            return [(1, 0, 0, 0, 1, 0), (-1, 0, right, 0, 1, 0),
+                    (1, 0, 0, 0, -1, bottom), (-1, 0, right, 0, -1, bottom)]
+        cx, cy = right / 2, bottom / 2
+        maps = []
+        for k in range(self.order):
+            angle = 2 * math.pi * k / self.order
+            # Rounded so that half and quarter turns are exact
+            cos, sin = round(math.cos(angle), 12), round(math.sin(angle), 12)
+            maps.append((cos, -sin, cx - cos * cx + sin * cy, sin, cos, cy - sin * cx - cos * cy))
+        return maps
+    
+    def domain(self, width, height):
+        """Size of the top-left region the output unfolds from, or None if it can't be unfolded."""
+        half_width, half_height = width - width // 2, height - height // 2
+        if self.kind == 'bilateral':
+            return half_width, height
+        if self.kind == 'quadrant' or (self.order == 4 and width == height):
+            return half_width, half_height
+        if self.order == 2:
+            return width, half_height
+        return None
+    
+    def unfold(self, image):
+        """Fill a PIL image in place from its rendered top-left `domain`."""
+        width, height = image.size
+        half_width, half_height = width - width // 2, height - height // 2
+        if self.kind in ('bilateral', 'quadrant'):
+            image.paste(image.crop((0, 0, width // 2, height)).transpose(Image.Transpose.FLIP_LEFT_RIGHT),
+                        (half_width, 0))
+            if self.kind == 'quadrant':
+                image.paste(image.crop((0, 0, width, height // 2)).transpose(Image.Transpose.FLIP_TOP_BOTTOM),
+                            (0, half_height))
+        elif self.order == 2:
+            image.paste(image.crop((0, 0, width, height // 2)).transpose(Image.Transpose.ROTATE_180),
+                        (0, half_height))
+            if height % 2:
+                # The middle row is its own half turn
+                middle = height // 2
+                image.paste(image.crop((0, middle, width // 2, middle + 1)).transpose(Image.Transpose.FLIP_LEFT_RIGHT),
+                            (half_width, middle))
+        else:
+            if width % 2:
+                # The middle column's top is the middle row's left half, turned
+                middle = width // 2
+                image.paste(image.crop((0, middle, middle, middle + 1)).transpose(Image.Transpose.ROTATE_270),
+                            (middle, 0))
+            # Quarter turns: each quadrant is the previous one turned clockwise
+            for box in ((half_width, 0, width, half_height), (half_width, half_height, width, height),
+                        (0, half_height, half_width, height)):
+                image.paste(image.transpose(Image.Transpose.ROTATE_270).crop(box), box[:2])
+    
+    def sources(self, xs, ys, width, height):
+        """The domain pixels that `unfold` copies output pixels (`xs`, `ys`) from.
+        
+        Returns their x and y and the piece of the unfold each pixel lies
+        in, 0 for pixels of the domain that stay as rendered.
+        """
+        xs, ys = np.array(xs, dtype=np.int64), np.array(ys, dtype=np.int64)
+        half_width, half_height = width - width // 2, height - height // 2
+        piece = np.zeros(xs.shape, dtype=np.int64)
+        if self.kind in ('bilateral', 'quadrant'):
+            right = xs >= half_width
+            xs[right] = width - 1 - xs[right]
+            piece[right] = 1
+            if self.kind == 'quadrant':
+                below = ys >= half_height
+                ys[below] = height - 1 - ys[below]
+                piece[below] += 2
+        elif self.order == 2:
+            below = ys >= half_height
+            # An odd middle row's right half is its left half, turned
+            turned = below | ((height % 2 == 1) & (ys == height // 2) & (xs >= half_width))
+            xs[turned] = width - 1 - xs[turned]
+            ys[below] = height - 1 - ys[below]
+            piece[turned] = np.where(below[turned], 1, 2)
+        else:
+            # Quarter turns back toward the domain, then an odd middle column from the middle row
+            for _ in range(3):
+                outside = (xs >= half_width) | (ys >= half_height)
+                xs[outside], ys[outside] = ys[outside], width - 1 - xs[outside]
+                piece += outside
+            if width % 2:
+                middle = width // 2
+                column = (xs == middle) & (ys < middle)
+                xs[column], ys[column] = ys[column], middle
+                piece[column] += 4
+        return xs, ys, piece
+    
+    def unfold_array(self, frame, band_height=256):
+        """`unfold` for a (height, width, channels) array, such as a framebuffer, a band of rows at a time."""
+        height, width = frame.shape[:2]
+        for top in range(0, height, band_height):
+            ys, xs = np.divmod(np.arange(top * width, min(top + band_height, height) * width), width)
+            source_x, source_y, piece = self.sources(xs, ys, width, height)
+            moved = piece > 0
+            # Sources are never moved themselves, so bands can be filled in any order
+            frame[ys[moved], xs[moved]] = frame[source_y[moved], source_x[moved]]
+    
+    def expand(self, scene, right, bottom):
+        """`scene` replayed under every transform, one whole copy after another.
+        
+        Each copy starts in the normal blend mode, like the scene itself.
+        """
+        kinds, geometry, offsets = scene.kinds, scene.geometry, scene.offsets
+        sizes = np.diff(offsets)
+        row_kinds = np.repeat(kinds, sizes)
+        local = np.arange(len(geometry)) - np.repeat(offsets[:-1], sizes)
+        # Circles and stamps keep their radius (and sides), blend rows their mode,
+        # layer rows their size, noise fields their parameters and brush strokes
+        # their bristles and pressure; everything else is x, y pairs
+        coordinate = (~np.isin(row_kinds, (BLEND, FIELD, LAYER))
+                      & ~(np.isin(row_kinds, (CIRCLE, DISC, STAMP)) & (local >= 2))
+                      & ~((row_kinds == BRUSH) & (local < 2)))
+        xs = np.flatnonzero(coordinate & (local % 2 == 0))
+        x, y = geometry[xs].astype(np.float64), geometry[xs + 1].astype(np.float64)
+        # A stamp's angle follows the direction of its first vertex
+        angles = offsets[:-1][kinds == STAMP] + 4
+        vertex_x, vertex_y = np.cos(geometry[angles]), np.sin(geometry[angles])
+        # A noise field already covers the canvas, so later copies leave it out (opacity 0)
+        field_opacities = offsets[:-1][kinds == FIELD] + 5
+        
+        blend_rows = np.flatnonzero(kinds == BLEND)
+        ends_blended = len(blend_rows) > 0 and geometry[offsets[blend_rows[-1]]] != NORMAL
+        
+        expanded = Scene()
+        for index, (a, b, c, d, e, f) in enumerate(self.transforms(right, bottom)):
+            if index and ends_blended:
+                expanded.add_blend_mode('normal')
+            moved = geometry.copy()
+            moved[xs] = a * x + b * y + c
+            moved[xs + 1] = d * x + e * y + f
+            moved[angles] = np.arctan2(d * vertex_x + e * vertex_y, a * vertex_x + b * vertex_y)
+            if index:
+                moved[field_opacities] = 0
+            expanded.extend(scene, moved)
+        return expanded
+    
+    def render(self, scene, raster):
+        """Rasterize `scene` under the symmetry onto `raster`, a new full-size rasterizer.
+        
+        Unfoldable groups only draw the copies that reach the top-left
+        domain and fill in the rest from it.
+        """
+        width, height = raster.image.size
+        scale = raster.scale
+        expanded = self.expand(scene, (width - 1) / scale, (height - 1) / scale)
+        domain = self.domain(width, height)
+        if domain is None:
+            raster.render(expanded)
+            return raster
+        
+        rows = rows_within(scene_bounds(expanded, scale), (0, 0, *domain))
+        # Whatever the copies draw outside the domain is overwritten by the unfold
+        raster.render(expanded, rows=rows)
+        self.unfold(raster.image)
+        return raster
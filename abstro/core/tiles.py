@@ -0,0 +1,384 @@
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+from PIL import Image
+
+from .raster import Rasterizer
+from .scene import CIRCLE, POLYGON, LINE, BEZIER, POINT, BLEND, DISC, STAMP, PATH, BRUSH, LAYER
+
+def scene_bounds(scene, scale=1.0):
+    """Output-pixel bounding boxes (x0, y0, x1, y1) of every scene row.
+    
+    Boxes are padded for stroke widths and anti-aliasing. BLEND and LAYER
+    rows, and the first row of every run of points, get an infinite box:
+    they change compositor state (points flush pending blended shapes) for
+    every tile.
+    """
+    count = len(scene)
+    kinds, geometry, offsets = scene.kinds, scene.geometry, scene.offsets
+    bounds = np.empty((count, 4), dtype=np.float64)
+    bounds[:, :2] = -np.inf
+    bounds[:, 2:] = np.inf
+    
+    round_rows = np.flatnonzero((kinds == CIRCLE) | (kinds == DISC) | (kinds == STAMP))
+    if len(round_rows):
+        cx, cy, r = (geometry[offsets[round_rows] + k] for k in range(3))
+        bounds[round_rows] = np.column_stack((cx - r, cy - r, cx + r, cy + r))
+    
+    # Polygons, lines, bezier control hulls, paths and points: min/max over
+    # their vertices, which follow the bristles and pressure of brush strokes
+    path_rows = np.flatnonzero(np.isin(kinds, (POLYGON, LINE, BEZIER, PATH, POINT, BRUSH)))
+    if len(path_rows):
+        first = offsets[path_rows] + np.where(kinds[path_rows] == BRUSH, 2, 0)
+        vertices = (offsets[path_rows + 1] - first) // 2
+        starts = np.cumsum(vertices) - vertices
+        local = np.arange(vertices.sum()) - np.repeat(starts, vertices)
+        index = np.repeat(first, vertices) + 2 * local
+        xs, ys = geometry[index], geometry[index + 1]
+        bounds[path_rows] = np.column_stack((np.minimum.reduceat(xs, starts), np.minimum.reduceat(ys, starts),
+                                             np.maximum.reduceat(xs, starts), np.maximum.reduceat(ys, starts)))
+        point_rows = path_rows[kinds[path_rows] == POINT]
+        bounds[point_rows, 2:] += 1
+    
+    shaped = (kinds != BLEND) & (kinds != LAYER)
+    run_starts = np.flatnonzero((kinds == POINT) & (np.append(-1, kinds[:-1]) != POINT))
+    shaped[run_starts] = False
+    bounds[run_starts] = (-np.inf, -np.inf, np.inf, np.inf)
+    pad = (scene.widths[shaped] / 2 + 2)[:, None]
+    bounds[shaped] = (bounds[shaped] + np.hstack((-pad, -pad, pad, pad))) * scale
+    bounds[shaped, :2] = np.floor(bounds[shaped, :2]) - 1
+    bounds[shaped, 2:] = np.ceil(bounds[shaped, 2:]) + 1
+    return bounds
+
+class SpatialIndex:
+    """Scene rows bucketed into a grid of `cell_size` output pixels.
+    
+    `cell_size` is the side of a square cell, or a `(width, height)` pair.
+    
+    Stored like a CSR matrix: `rows[starts[c]:starts[c + 1]]` are the rows
+    whose bounding box touches cell `c`, in drawing order.
+    """
+    
+    def __init__(self, scene, size, cell_size, scale=1.0):
+        self.width, self.height = size
+        self.cell_width, self.cell_height = (cell_size, cell_size) if np.isscalar(cell_size) else cell_size
+        self.columns = -(-self.width // self.cell_width)
+        self.grid_rows = -(-self.height // self.cell_height)
+        
+        bounds = scene_bounds(scene, scale)
+        visible = (bounds[:, 2] > 0) & (bounds[:, 3] > 0) & (bounds[:, 0] < self.width) & (bounds[:, 1] < self.height)
+        cells = np.floor_divide(np.clip(bounds, 0, [self.width - 1, self.height - 1] * 2),
+                                [self.cell_width, self.cell_height] * 2).astype(np.int64)
+        cx0, cy0, cx1, cy1 = cells.T
+        
+        # One entry per (row, covered cell)
+        spans_x = np.where(visible, cx1 - cx0 + 1, 0)
+        spans_y = np.where(visible, cy1 - cy0 + 1, 0)
+        counts = spans_x * spans_y
+        row = np.repeat(np.arange(len(scene)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        dy, dx = np.divmod(local, spans_x[row])
+        cell = (cy0[row] + dy) * self.columns + cx0[row] + dx
+        
+        order = np.lexsort((row, cell))
+        self.rows = row[order]
+        self.starts = np.searchsorted(cell[order], np.arange(self.columns * self.grid_rows + 1))
+    
+    def __len__(self):
+        return self.columns * self.grid_rows
+    
+    def box(self, cell):
+        """Pixel box (x0, y0, x1, y1) of `cell`."""
+        y, x = divmod(cell, self.columns)
+        x0, y0 = x * self.cell_width, y * self.cell_height
+        return (x0, y0, min(x0 + self.cell_width, self.width), min(y0 + self.cell_height, self.height))
+    
+    def query(self, cell):
+        return self.rows[self.starts[cell]:self.starts[cell + 1]]
+
+def rows_within(bounds, box):
+    """Scene rows whose `scene_bounds` touch the output pixels of `box` (x0, y0, x1, y1)."""
+    x0, y0, x1, y1 = box
+    return np.flatnonzero((bounds[:, 0] < x1) & (bounds[:, 1] < y1) & (bounds[:, 2] > x0) & (bounds[:, 3] > y0))
+
+def render_box(scene, rows, box, background, scale=1.0, compositing=False, antialias=False):
+    """Rasterize scene `rows` into an image of just the output pixels in `box`."""
+    x0, y0, x1, y1 = box
+    image = Image.new('RGB', (x1 - x0, y1 - y0), background)
+    raster = Rasterizer(image, scale, compositing=compositing, antialias=antialias, origin=(x0, y0))
+    raster.render(scene, rows=rows)
+    return image
+
+def render_tile(scene, index, cell, background, scale=1.0, compositing=False, antialias=False):
+    """Rasterize the shapes indexed under `cell` into an image of just that tile."""
+    return render_box(scene, index.query(cell), index.box(cell), background, scale, compositing, antialias)
+
+class PNGWriter:
+    """Writes an RGB PNG incrementally, a band of rows at a time."""
+    
+    def __init__(self, stream, width, height, dpi=None, level=6):
+        self.stream = stream
+        self.width = width
+        self.compressor = zlib.compressobj(level)
+        stream.write(b'\x89PNG\r\n\x1a\n')
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        if dpi is not None:
+            # Physical pixel size in pixels per meter
+            ppm = round(dpi / 0.0254)
+            self._chunk(b'pHYs', struct.pack('>IIB', ppm, ppm, 1))
+    
+    def _chunk(self, kind, data):
+        self.stream.write(struct.pack('>I', len(data)) + kind + data)
+        self.stream.write(struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF))
+    
+    def write_rows(self, pixels):
+        # Every scanline starts with filter type 0 (none)
+        rows = np.zeros((len(pixels), self.width * 3 + 1), dtype=np.uint8)
+        rows[:, 1:] = np.asarray(pixels, dtype=np.uint8).reshape(len(pixels), -1)
+        data = self.compressor.compress(rows.tobytes())
+        if data:
+            self._chunk(b'IDAT', data)
+    
+    def close(self):
+        self._chunk(b'IDAT', self.compressor.flush())
+        self._chunk(b'IEND', b'')
+
+def _output_size(canvas, scale):
+    return max(1, round(canvas.width * scale)), max(1, round(canvas.height * scale))
+
+def _banded(canvas, scale):
+    """The scene the band renderers draw for `canvas` at `scale`, the size they draw, and the unfolding symmetry.
+    
+    A symmetric canvas replays its copies about the axes of the output
+    pixels, as `Symmetry.render` does. When the symmetry unfolds, only its
+    domain is drawn and the symmetry is returned to unfold the rest;
+    otherwise every copy is drawn over the whole output.
+    """
+    width, height = _output_size(canvas, scale)
+    symmetry = canvas.symmetry
+    if symmetry is None:
+        return canvas.scene, (width, height), None
+    scene = symmetry.expand(canvas.scene, (width - 1) / scale, (height - 1) / scale)
+    domain = symmetry.domain(width, height)
+    if domain is None:
+        return scene, (width, height), None
+    return scene, domain, symmetry
+
+# Output pixels whose unfold sources are looked up at once when saving a symmetric canvas in bands
+UNFOLD_CHUNK_PIXELS = 1 << 18
+
+def _unfolded_band(scene, bounds, symmetry, top, bottom, size, options):
+    # Rows top:bottom of a symmetric render: each piece of the unfold the band
+    # crosses is drawn from the box of domain pixels it is copied from
+    width, height = size
+    chunk = max(1, UNFOLD_CHUNK_PIXELS // width)
+    boxes = {}
+    for start in range(top, bottom, chunk):
+        ys, xs = np.divmod(np.arange(start * width, min(start + chunk, bottom) * width), width)
+        source_x, source_y, piece = symmetry.sources(xs, ys, width, height)
+        for number in np.unique(piece).tolist():
+            found = piece == number
+            box = (source_x[found].min(), source_y[found].min(), source_x[found].max() + 1, source_y[found].max() + 1)
+            known = boxes.get(number, box)
+            boxes[number] = (min(box[0], known[0]), min(box[1], known[1]), max(box[2], known[2]),
+                             max(box[3], known[3]))
+    tiles = {number: (box, np.asarray(render_box(scene, rows_within(bounds, box), box, **options)))
+             for number, box in boxes.items()}
+    
+    pixels = np.empty((bottom - top, width, 3), dtype=np.uint8)
+    for start in range(top, bottom, chunk):
+        ys, xs = np.divmod(np.arange(start * width, min(start + chunk, bottom) * width), width)
+        source_x, source_y, piece = symmetry.sources(xs, ys, width, height)
+        for number, ((x0, y0, _, _), tile) in tiles.items():
+            found = piece == number
+            pixels[ys[found] - top, xs[found]] = tile[source_y[found] - y0, source_x[found] - x0]
+    return pixels
+
+def save_tiled(filename, canvas, scale=1.0, tile_size=1024, dpi=None):
+    """Render `canvas`'s scene band by band into a PNG file.
+    
+    Bands span the full width and are `tile_size` rows high; each one is
+    rendered, encoded and released before the next, so peak memory is one
+    band rather than the whole image. Only the image's top edge moves from
+    band to band, which keeps the result identical to a full render. Bands
+    of a symmetric canvas are unfolded from the parts of its domain they
+    are copied from.
+    """
+    width, height = _output_size(canvas, scale)
+    scene, size, symmetry = _banded(canvas, scale)
+    options = {'background': canvas.background_color, 'scale': scale,
+               'compositing': canvas.compositing, 'antialias': canvas.antialias}
+    
+    with open(filename, 'wb') as stream:
+        writer = PNGWriter(stream, width, height, dpi=dpi)
+        if symmetry is not None:
+            bounds = scene_bounds(scene, scale)
+            for top in range(0, height, tile_size):
+                writer.write_rows(_unfolded_band(scene, bounds, symmetry, top, min(top + tile_size, height),
+                                                 (width, height), options))
+        else:
+            index = SpatialIndex(scene, size, (width, tile_size), scale)
+            for band in range(len(index)):
+                writer.write_rows(np.asarray(render_tile(scene, index, band, **options)))
+        writer.close()
+
+# Files saved as an uncompressed RGBA framebuffer rather than an image
+FRAMEBUFFER_EXTENSIONS = ('.npy', '.rgba')
+
+def open_framebuffer(filename, width, height, mode='w+'):
+    """Open an RGBA framebuffer file as a (height, width, 4) uint8 memmap.
+    
+    `.npy` files start with a NumPy header, so `np.load(filename,
+    mmap_mode='r')` maps them back; any other name holds bare RGBA rows.
+    """
+    shape = (height, width, 4)
+    if filename.lower().endswith('.npy'):
+        if mode == 'w+':
+            return np.lib.format.open_memmap(filename, mode=mode, dtype=np.uint8, shape=shape)
+        return np.load(filename, mmap_mode=mode)
+    return np.memmap(filename, dtype=np.uint8, mode=mode, shape=shape)
+
+def _write_band(frame, top, pixels):
+    # RGB rows into the left of an RGB frame, or of an opaque RGBA one
+    rows = frame[top:top + len(pixels), :pixels.shape[1]]
+    rows[..., :3] = pixels
+    if frame.shape[2] == 4:
+        rows[..., 3] = 255
+
+def render_into(frame, canvas, scale=1.0, band_height=256):
+    """Rasterize `canvas`'s scene band by band into the uint8 array `frame`.
+    
+    `frame` is (height, width, 3) RGB or (height, width, 4) RGBA, typically
+    an `np.memmap`; only one band is held in memory at a time. A symmetric
+    canvas's domain is rendered and then unfolded within the frame.
+    """
+    scene, size, symmetry = _banded(canvas, scale)
+    index = SpatialIndex(scene, size, (size[0], band_height), scale)
+    for band in range(len(index)):
+        tile = render_tile(scene, index, band, canvas.background_color, scale, canvas.compositing, canvas.antialias)
+        _write_band(frame, index.box(band)[1], np.asarray(tile))
+    if symmetry is not None:
+        symmetry.unfold_array(frame, band_height)
+
+# Per-process state of a parallel render, set by `_attach_frame`
+_band_worker = None
+
+def _attach_frame(name, filename, shape, scene, index, options):
+    global _band_worker
+    if filename is not None:
+        memory, frame = None, open_framebuffer(filename, shape[1], shape[0], mode='r+')
+    else:
+        memory = shared_memory.SharedMemory(name=name)
+        frame = np.ndarray(shape, dtype=np.uint8, buffer=memory.buf)
+    _band_worker = (memory, frame, scene, index, options)
+
+def _render_band(band):
+    _, frame, scene, index, options = _band_worker
+    _write_band(frame, index.box(band)[1], np.asarray(render_tile(scene, index, band, **options)))
+
+@contextmanager
+def render_parallel(canvas, scale=1.0, workers=0, band_height=None, filename=None):
+    """Rasterize `canvas`'s scene on several processes; yields the pixels.
+    
+    The scene is sent to each worker once. Workers render full-width bands
+    and write them straight into a shared-memory framebuffer, which is
+    yielded as a (height, width, 3) uint8 array without being copied. The
+    array is only valid inside the `with` block. Bands are rendered exactly
+    as by `render_into`, so the result matches the serial render; the
+    domain of a symmetric canvas is unfolded once all bands are in.
+    
+    With `filename`, the framebuffer is instead an RGBA file created by
+    `open_framebuffer`, which the workers map and write to directly.
+    """
+    workers = workers or os.cpu_count() or 1
+    width, height = _output_size(canvas, scale)
+    scene, size, symmetry = _banded(canvas, scale)
+    if band_height is None:
+        # A few bands per worker evens out bands of unequal cost
+        band_height = max(16, -(-size[1] // (workers * 4)))
+    index = SpatialIndex(scene, size, (size[0], band_height), scale)
+    options = {'background': canvas.background_color, 'scale': scale,
+               'compositing': canvas.compositing, 'antialias': canvas.antialias}
+    
+    memory = None
+    if filename is not None:
+        frame = open_framebuffer(filename, width, height)
+        frame.flush()
+    else:
+        memory = shared_memory.SharedMemory(create=True, size=height * width * 3)
+        frame = np.ndarray((height, width, 3), dtype=np.uint8, buffer=memory.buf)
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(index)), initializer=_attach_frame,
+                                 initargs=(memory and memory.name, filename, frame.shape,
+                                           scene, index, options)) as executor:
+            for _ in executor.map(_render_band, range(len(index))):
+                pass
+        if symmetry is not None:
+            symmetry.unfold_array(frame)
+        yield frame
+    finally:
+        del frame
+        if memory is not None:
+            memory.unlink()
+            try:
+                memory.close()
+            except BufferError:
+                # The caller still holds the array; it is unmapped once released
+                pass
+
+def _paint_layer(job):
+    scene, size, scale, compositing, antialias = job
+    return Rasterizer(Image.new('RGB', size), scale, compositing=compositing, antialias=antialias).paint_layer(scene)
+
+def paint_layers(scenes, size, scale=1.0, compositing=False, antialias=False, workers=0):
+    """`Rasterizer.paint_layer` of every scene, on `workers` processes (0 for all cores).
+    
+    Each layer is painted once, exactly as a LAYER row of a serial render
+    paints it, and returned for `Rasterizer.composite_layer`.
+    """
+    jobs = [(scene, size, scale, compositing, antialias) for scene in scenes]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        return list(map(_paint_layer, jobs))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_paint_layer, jobs))
+
+def save_parallel(filename, canvas, scale=1.0, workers=0, band_height=None, format='PNG', dpi=None):
+    """Render on several processes with `render_parallel` and save the result.
+    
+    PNG rows are compressed straight from the shared framebuffer; other
+    formats go through PIL.
+    """
+    with render_parallel(canvas, scale, workers, band_height) as frame:
+        if format == 'PNG':
+            with open(filename, 'wb') as stream:
+                writer = PNGWriter(stream, frame.shape[1], frame.shape[0], dpi=dpi)
+                for top in range(0, len(frame), 256):
+                    writer.write_rows(frame[top:top + 256])
+                writer.close()
+        else:
+            options = {'dpi': (dpi, dpi)} if dpi is not None else {}
+            Image.fromarray(frame).save(filename, format=format, **options)
+        # Release the shared buffer before the block unmaps it
+        del frame
+
+def save_framebuffer(filename, canvas, scale=1.0, band_height=None, workers=None):
+    """Save `canvas` as an RGBA framebuffer file (see `open_framebuffer`).
+    
+    Bands are rendered straight into the mapped file, by this process or by
+    `workers` processes, so the image is never held in memory as a whole.
+    """
+    if workers is not None:
+        with render_parallel(canvas, scale, workers, band_height, filename=filename) as frame:
+            frame.flush()
+            del frame
+        return
+    width, height = _output_size(canvas, scale)
+    frame = open_framebuffer(filename, width, height)
+    render_into(frame, canvas, scale, band_height or 256)
+    frame.flush()
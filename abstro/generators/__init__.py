@@ -7,7 +7,8 @@ from ..core.generator import (
     PolygonGenerator,
     LineGenerator,
     BezierGenerator,
-    NoiseGenerator
+    NoiseGenerator,
+    FieldNoiseGenerator
 )
 
 __all__ = [
@@ -19,5 +20,6 @@ __all__ = [
     "PolygonGenerator", 
     "LineGenerator",
     "BezierGenerator",
-    "NoiseGenerator"
+    "NoiseGenerator",
+    "FieldNoiseGenerator"
 ] 
\ No newline at end of file
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""Rendering benchmark for every preset, canvas size and output format.
+
+``run`` times generation (building the scene and drawing it) and encoding
+(``Canvas.save``) separately for each case, and records the peak RSS, the
+number of scene elements and the output size. Every case runs in a fresh
+interpreter so peak RSS is per case. Results are written as JSON.
+
+``compare`` checks a results file against a saved baseline and exits
+non-zero when any case got slower (or bigger) than the threshold allows.
+
+    python benchmarks/render.py run [-o results.json] [--preset NAME ...]
+                                    [--size WxH ...] [--format png ...] [--repeat 3]
+    python benchmarks/render.py compare baseline.json results.json [--threshold 0.1]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+SIZES = ('800x600', '1920x1080', '4096x4096')
+FORMATS = ('png', 'jpg', 'svg')
+SEED = 42
+
+# Metrics checked by `compare`, with the smallest change worth reporting
+# so that sub-millisecond jitter on tiny cases is not flagged
+METRICS = {
+    'generate_seconds': 0.005,
+    'encode_seconds': 0.005,
+    'peak_rss_mb': 2.0,
+}
+
+def _peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+def _case_key(case):
+    return f"{case['preset']}/{case['size']}/{case['format']}"
+
+def run_case(preset, size, fmt, repeat):
+    """Benchmark one case in this process and return its result record."""
+    import abstro
+    # Import the renderer up front so the first run does not pay for it
+    import abstro.core.generator
+    from abstro.core.scene import POINT, BLEND, LAYER
+
+    width, height = map(int, size.split('x'))
+    generate_times, encode_times = [], []
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, f'out.{fmt}')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            # Mirror the CLI: SVG output records the scene without rasterizing it
+            canvas = abstro.generate(width, height, preset=preset, seed=SEED, deferred=fmt == 'svg')
+            canvas.flush()
+            generate_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            canvas.save(output)
+            encode_times.append(time.perf_counter() - start)
+        output_bytes = os.path.getsize(output)
+
+    kinds = canvas.scene.kinds
+    return {
+        'preset': preset,
+        'size': size,
+        'format': fmt,
+        'generate_seconds': statistics.median(generate_times),
+        'encode_seconds': statistics.median(encode_times),
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+        'elements': int(((kinds != POINT) & (kinds != BLEND) & (kinds != LAYER)).sum()),
+        'points': int((kinds == POINT).sum()),
+        'output_bytes': output_bytes,
+    }
+
+def run(args):
+    from abstro.presets.presets import list_presets
+
+    presets = args.preset or list_presets()
+    sizes = args.size or SIZES
+    formats = args.format or FORMATS
+
+    results = []
+    for preset in presets:
+        for size in sizes:
+            for fmt in formats:
+                command = [sys.executable, __file__, '_case', preset, size, fmt, str(args.repeat)]
+                completed = subprocess.run(command, stdout=subprocess.PIPE, text=True, check=True)
+                case = json.loads(completed.stdout)
+                results.append(case)
+                print(f"{_case_key(case):<34} generate {case['generate_seconds'] * 1000:9.1f} ms  "
+                      f"encode {case['encode_seconds'] * 1000:9.1f} ms  "
+                      f"rss {case['peak_rss_mb']:7.1f} MB  elements {case['elements']:>6}", flush=True)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': SEED,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2) + '\n')
+    print(f"Wrote {len(results)} results to {args.output}")
+    return 0
+
+def compare(args):
+    baseline = {_case_key(case): case for case in json.loads(Path(args.baseline).read_text())['results']}
+    current = {_case_key(case): case for case in json.loads(Path(args.results).read_text())['results']}
+
+    regressions = 0
+    for key in sorted(baseline.keys() & current.keys()):
+        old, new = baseline[key], current[key]
+        changes = []
+        for metric, floor in METRICS.items():
+            delta = new[metric] - old[metric]
+            if delta > floor and delta > old[metric] * args.threshold:
+                changes.append(f"{metric} {old[metric]:.3f} -> {new[metric]:.3f} (+{delta / old[metric]:.0%})"
+                               if old[metric] else f"{metric} {old[metric]:.3f} -> {new[metric]:.3f}")
+        if new['elements'] != old['elements']:
+            changes.append(f"elements {old['elements']} -> {new['elements']}")
+        if changes:
+            regressions += 1
+            print(f"REGRESSION {key}: " + '; '.join(changes))
+
+    for key in sorted(baseline.keys() - current.keys()):
+        print(f"missing    {key}")
+
+    compared = len(baseline.keys() & current.keys())
+    print(f"{regressions} of {compared} cases regressed (threshold {args.threshold:.0%})")
+    return 1 if regressions else 0
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '_case':
+        # Internal: benchmark a single case in a fresh interpreter
+        preset, size, fmt, repeat = sys.argv[2:6]
+        print(json.dumps(run_case(preset, size, fmt, int(repeat))))
+        return 0
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run the benchmark and write results as JSON')
+    run_parser.add_argument('-o', '--output', default='benchmark-results.json', help='Results file')
+    run_parser.add_argument('--preset', action='append', help='Preset to run (repeatable, default: all)')
+    run_parser.add_argument('--size', action='append', help=f"WIDTHxHEIGHT (repeatable, default: {', '.join(SIZES)})")
+    run_parser.add_argument('--format', action='append', choices=FORMATS, help='Output format (repeatable, default: all)')
+    run_parser.add_argument('--repeat', type=int, default=3, help='Runs per case; the median time is reported')
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser('compare', help='Flag regressions against a saved baseline')
+    compare_parser.add_argument('baseline', help='Baseline results file')
+    compare_parser.add_argument('results', help='Results file to check')
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help='Allowed relative slowdown or memory growth (default: 0.10)')
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    return args.handler(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
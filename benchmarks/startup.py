@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Startup-time benchmark for the abstro CLI.
+
+Runs lightweight CLI commands such as ``--list-presets`` in fresh
+interpreters and reports the median wall time on top of a bare interpreter
+start. Exits non-zero when a command goes over the startup budget or imports
+a heavy dependency (numpy, PIL) that it does not need.
+
+    python benchmarks/startup.py [--runs 15] [--budget-ms 150]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ('numpy', 'PIL')
+COMMANDS = (['--list-presets'], ['--list-palettes'])
+
+# Runs the CLI in-process and prints which heavy modules ended up imported
+IMPORT_PROBE = '''
+import runpy, sys
+sys.argv = ['abstro'] + sys.argv[1:]
+try:
+    runpy.run_module('abstro.cli', run_name='__main__')
+except SystemExit:
+    pass
+print(' '.join(m for m in {modules!r} if m in sys.modules), file=sys.stderr)
+'''
+
+def _env():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(ROOT), env.get('PYTHONPATH')]))
+    return env
+
+def median_runtime(argv, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(argv, env=_env(), stdout=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def heavy_imports(args):
+    probe = IMPORT_PROBE.format(modules=HEAVY_MODULES)
+    result = subprocess.run([sys.executable, '-c', probe, *args], env=_env(),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    return result.stderr.split()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=15, help='Interpreter launches per command')
+    parser.add_argument('--budget-ms', type=float, default=150.0,
+                        help='Allowed startup time over a bare interpreter, in milliseconds')
+    args = parser.parse_args()
+
+    baseline = median_runtime([sys.executable, '-c', 'pass'], args.runs)
+    print(f"bare interpreter: {baseline * 1000:7.1f} ms")
+
+    failed = False
+    for command in COMMANDS:
+        runtime = median_runtime([sys.executable, '-m', 'abstro.cli', *command], args.runs)
+        overhead = (runtime - baseline) * 1000
+        heavy = heavy_imports(command)
+        status = 'ok'
+        if overhead > args.budget_ms:
+            status = f'over budget ({args.budget_ms:.0f} ms)'
+        if heavy:
+            status = f"imports {', '.join(heavy)}"
+        failed = failed or status != 'ok'
+        print(f"abstro {' '.join(command):<16} {runtime * 1000:7.1f} ms  (+{overhead:.1f} ms)  {status}")
+
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
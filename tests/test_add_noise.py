@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from abstro.core.canvas import Canvas
+from abstro.core.scene import POINT
+
+def _noisy(seed=1, **options):
+    canvas = Canvas(160, 120, seed=seed)
+    canvas.set_palette('neon')
+    canvas.add_noise(**options)
+    return canvas
+
+@pytest.mark.parametrize('legacy', [False, True])
+def test_noise_scatters_density_points_in_the_palette(legacy):
+    canvas = _noisy(density=0.05, legacy=legacy)
+    scene = canvas.scene
+    assert np.count_nonzero(scene.kinds == POINT) == int(160 * 120 * 0.05)
+    xy = scene.geometry.reshape(-1, 2)
+    assert xy[:, 0].min() >= 0 and xy[:, 0].max() < 160 and xy[:, 1].min() >= 0 and xy[:, 1].max() < 120
+    palette = {tuple(color[:3]) for color in canvas.palette.colors}
+    assert {tuple(color) for color in scene.fills[:, :3].tolist()} <= palette
+
+def test_color_range_varies_palette_colors_within_it():
+    canvas = _noisy(density=0.05, color_range=20)
+    palette = np.array([color[:3] for color in canvas.palette.colors], dtype=int)
+    fills = canvas.scene.fills[:, :3].astype(int)
+    distance = np.abs(fills[:, None] - palette[None]).max(axis=2).min(axis=1)
+    assert distance.max() <= 20 and distance.max() > 0
+
+def test_later_points_win_and_deferred_renders_match():
+    canvas = _noisy(density=0.3)
+    image = np.asarray(canvas.render())
+    xy = canvas.scene.geometry.reshape(-1, 2).astype(int)
+    last = {}
+    for (x, y), color in zip(xy.tolist(), canvas.scene.fills[:, :3].tolist()):
+        last[x, y] = color
+    assert all(image[y, x].tolist() == color for (x, y), color in last.items())
+    
+    deferred = Canvas(160, 120, seed=1, deferred=True)
+    deferred.set_palette('neon')
+    deferred.add_noise(density=0.3)
+    assert np.array_equal(np.asarray(deferred.render()), image)
+
+def test_noise_is_seeded_by_the_canvas():
+    assert np.array_equal(_noisy(4, density=0.1).scene.geometry, _noisy(4, density=0.1).scene.geometry)
+    assert not np.array_equal(_noisy(4, density=0.1).scene.geometry, _noisy(5, density=0.1).scene.geometry)
@@ -0,0 +1,24 @@
+import os
+
+from click.testing import CliRunner
+
+from abstro.cli import _pooled, batch
+
+def _square_or_die(job):
+    if job in (3, 7):
+        os._exit(1)
+    return job * job
+
+def test_batch_writes_the_same_images_on_any_number_of_workers(tmp_path):
+    outputs = []
+    for workers in (1, 3):
+        directory = tmp_path / str(workers)
+        result = CliRunner().invoke(batch, ['-n', '4', '-d', str(directory), '-w', '256', '-h', '256', '-s', '5',
+                                            '--random-presets', '-j', str(workers)])
+        assert result.exit_code == 0, result.output
+        outputs.append({path.name: path.read_bytes() for path in directory.iterdir()})
+    assert len(outputs[0]) == 4 and outputs[0] == outputs[1]
+
+def test_dead_workers_only_fail_their_own_jobs():
+    results = list(_pooled(_square_or_die, list(range(12)), 3, lambda job: ('failed', job)))
+    assert results == [('failed', job) if job in (3, 7) else job * job for job in range(12)]
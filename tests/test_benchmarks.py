@@ -0,0 +1,36 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def _benchmark(*argv):
+    return subprocess.run([sys.executable, str(ROOT / 'benchmarks' / 'render.py'), *argv], cwd=ROOT,
+                          capture_output=True, text=True, timeout=300)
+
+def test_run_writes_a_result_per_case(tmp_path):
+    results = tmp_path / 'results.json'
+    completed = _benchmark('run', '-o', str(results), '--preset', 'minimal', '--preset', 'oil_painting',
+                           '--size', '256x256', '--format', 'png', '--format', 'svg', '--repeat', '1')
+    assert completed.returncode == 0, completed.stderr
+    cases = json.loads(results.read_text())['results']
+    assert sorted((case['preset'], case['format']) for case in cases) == [
+        ('minimal', 'png'), ('minimal', 'svg'), ('oil_painting', 'png'), ('oil_painting', 'svg')]
+    for case in cases:
+        assert case['size'] == '256x256' and case['output_bytes'] > 0 and case['elements'] > 0
+
+def test_compare_flags_regressions(tmp_path):
+    case = {'preset': 'minimal', 'size': '256x256', 'format': 'png', 'generate_seconds': 1.0,
+            'encode_seconds': 0.5, 'peak_rss_mb': 100.0, 'elements': 10, 'points': 0, 'output_bytes': 1000}
+    baseline, current = tmp_path / 'baseline.json', tmp_path / 'current.json'
+    baseline.write_text(json.dumps({'results': [case]}))
+    
+    current.write_text(json.dumps({'results': [dict(case, generate_seconds=1.05)]}))
+    completed = _benchmark('compare', str(baseline), str(current))
+    assert completed.returncode == 0 and '0 of 1 cases regressed' in completed.stdout
+    
+    current.write_text(json.dumps({'results': [dict(case, generate_seconds=2.0, elements=11)]}))
+    completed = _benchmark('compare', str(baseline), str(current))
+    assert completed.returncode == 1
+    assert 'generate_seconds 1.000 -> 2.000' in completed.stdout and 'elements 10 -> 11' in completed.stdout
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from abstro.core.canvas import Canvas
+from abstro.core.raster import flatten_bezier
+
+def _curve(control, t):
+    p = np.asarray(control, dtype=np.float64)
+    t = np.asarray(t)[:, None]
+    return (1 - t)**3 * p[0] + 3 * (1 - t)**2 * t * p[1] + 3 * (1 - t) * t**2 * p[2] + t**3 * p[3]
+
+@pytest.mark.parametrize('width', [1, 4, 20])
+def test_flattened_curve_stays_within_tolerance(width):
+    control = [(10, 10), (200, -80), (-40, 260), (300, 150)]
+    points = flatten_bezier(control, width)
+    assert np.allclose(points[[0, -1]], [control[0], control[-1]])
+    # Every point of the true curve lies near the polyline
+    true = _curve(control, np.linspace(0, 1, 2001))
+    starts, ends = points[:-1], points[1:]
+    direction = ends - starts
+    along = np.clip(((true[:, None] - starts) * direction).sum(-1) / (direction ** 2).sum(-1), 0, 1)
+    distance = np.hypot(*(starts + along[..., None] * direction - true[:, None]).transpose(2, 0, 1)).min(axis=1)
+    assert distance.max() <= 0.25 + 0.05 * width + 1e-9
+
+def test_segment_count_adapts_to_the_curve():
+    straight = flatten_bezier([(0, 0), (10, 0), (20, 0), (30, 0)], 2)
+    tight = flatten_bezier([(0, 0), (300, 300), (-300, 300), (0, 0)], 2)
+    wide = flatten_bezier([(0, 0), (300, 300), (-300, 300), (0, 0)], 30)
+    assert len(straight) == 2
+    assert len(wide) < len(tight) <= 257
+    # No more segments than half the control polygon's length, 12.3 pixels here
+    assert len(flatten_bezier([(0, 0), (1, 3), (2, -3), (3, 0)], 1)) - 1 <= 6
+
+def test_canvas_draws_multi_segment_beziers():
+    canvas = Canvas(200, 120, seed=1)
+    canvas.add_bezier([(10, 60), (50, 0), (90, 120), (130, 60), (160, 20), (180, 100), (190, 60)],
+                      fill=(0, 0, 0, 255), width=3)
+    image = np.asarray(canvas.render())
+    assert image[..., 0].min() == 0
+    # Both pieces are drawn, joined at their shared point
+    assert (image[:, :130, 0] == 0).any() and (image[:, 140:, 0] == 0).any()
+    assert (image[58:63, 128:133, 0] == 0).any()
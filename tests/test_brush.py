@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from abstro.core.brush import BRISTLE_VARIANTS, bristle_textures, stroke_coverage
+from abstro.core.canvas import Canvas
+
+STROKE = [(20, 50), (70, 50), (130, 50), (180, 50)]
+
+def _strokes(count, seed=2):
+    rng = np.random.default_rng(seed)
+    starts = rng.uniform(0, [300, 200], (count, 1, 2))
+    angles = rng.uniform(0, 2 * np.pi, (count, 1))
+    steps = rng.uniform(10, 40, (count, 1))[..., None] * np.stack((np.cos(angles), np.sin(angles)), axis=-1)
+    points = starts + np.arange(4)[None, :, None] * steps
+    colors = rng.integers(0, 256, (count, 4)).astype(np.uint8)
+    return points, colors
+
+def test_stroke_keeps_pressure_and_bristle_alpha():
+    canvas = Canvas(200, 100, seed=1)
+    canvas.add_brush_stroke(STROKE, fill=(0, 0, 0, 255), width=20, pressure=0.2, bristles=0)
+    red = np.asarray(canvas.render())[..., 0].astype(int)
+    # The paint is blended as alpha: partly covered pixels are neither paper nor paint
+    assert np.count_nonzero((red > 0) & (red < 255)) > np.count_nonzero(red == 0)
+    # Pressure is lightest at the ends of the stroke
+    assert red[45:56, 25].mean() > red[45:56, 100].mean()
+
+def test_stroke_alpha_only_counts_when_compositing():
+    images = []
+    for alpha, compositing in ((255, False), (64, False), (64, True)):
+        canvas = Canvas(200, 100, seed=1, compositing=compositing)
+        canvas.add_brush_stroke(STROKE, fill=(0, 0, 0, alpha), width=20, pressure=0.5, bristles=1)
+        images.append(np.asarray(canvas.render()).astype(int))
+    assert np.array_equal(images[0], images[1])
+    assert images[2].min() > images[0].min()
+
+@pytest.mark.parametrize('options', [{}, {'compositing': True}, {'compositing': True, 'blend_mode': 'multiply'}])
+def test_batched_strokes_match_painting_them_one_by_one(options):
+    points, colors = _strokes(120)
+    batched = Canvas(300, 200, seed=1, **options)
+    batched.add_brush_strokes(points.reshape(-1, 2), [4] * len(points), colors, 10, 0.3, bristles=3)
+    single = Canvas(300, 200, seed=1, **options)
+    for stroke, color in zip(points, colors):
+        single.add_brush_stroke(stroke.tolist(), tuple(color.tolist()), 10, 0.3, bristles=3)
+    assert np.array_equal(np.asarray(batched.render()), np.asarray(single.render()))
+
+def test_bands_match_full_render():
+    points, colors = _strokes(80, seed=5)
+    canvas = Canvas(300, 200, seed=1, deferred=True)
+    canvas.add_brush_strokes(points.reshape(-1, 2), [4] * len(points), colors, 12, 0.4)
+    full = np.asarray(canvas.render())
+    assert np.array_equal(np.asarray(canvas.render(workers=2)), full)
+
+def test_indexed_strokes_cover_whole_pixels():
+    canvas = Canvas(200, 100, seed=1, indexed=True)
+    canvas.add_brush_stroke(STROKE, fill=(10, 20, 30, 255), width=20, pressure=0.2)
+    indices, table = canvas.to_indexed()
+    assert set(np.unique(indices).tolist()) == {0, 1}
+    assert table[1].tolist() == [10, 20, 30]
+
+def test_coverage_lies_in_the_unit_interval():
+    textures = bristle_textures()
+    assert textures.shape[0] == BRISTLE_VARIANTS
+    assert 0 <= textures.min() and textures.max() <= 1
+    segments = np.array([STROKE], dtype=np.float64)
+    chunks = list(stroke_coverage(segments, np.array([0]), np.array([16.0]), np.array([0.3]), np.array([2])))
+    strokes, lefts, tops, columns, offsets, found, coverage = chunks[0]
+    assert strokes.tolist() == [0]
+    assert np.all(np.diff(found) > 0) and found[-1] < offsets[-1]
+    assert 0 < coverage.min() and coverage.max() <= 1
@@ -0,0 +1,62 @@
+import os
+
+from abstro.core import cache
+from abstro.core.cache import RenderCache, generate_key, render_key
+
+def _store(store, key, size, tmp_path, when=None):
+    source = tmp_path / f'{key}.bin'
+    source.write_bytes(bytes(size))
+    store.put_file(key, 'png', source)
+    if when is not None:
+        os.utime(store._path(key, 'png'), (when, when))
+
+def test_keys_are_stable_and_cover_their_inputs(monkeypatch):
+    key = render_key({'complexity': 10}, 4, 64, 48, 'png', scale=2)
+    assert key == render_key({'complexity': 10}, 4, 64, 48, 'png', scale=2)
+    assert len({key, render_key({'complexity': 11}, 4, 64, 48, 'png', scale=2),
+                render_key({'complexity': 10}, 5, 64, 48, 'png', scale=2),
+                render_key({'complexity': 10}, 4, 64, 48, 'jpg', scale=2),
+                render_key({'complexity': 10}, 4, 64, 48, 'png', scale=3)}) == 5
+    # Layer workers don't change the image, but the preset and its overrides do
+    assert generate_key(64, 48, 'chaos', 4, 'png', layer_workers=4) == generate_key(64, 48, 'chaos', 4, 'png')
+    assert generate_key(64, 48, 'chaos', 4, 'png', complexity=3) != generate_key(64, 48, 'chaos', 4, 'png')
+    monkeypatch.setattr(cache, 'RENDER_FORMAT', cache.RENDER_FORMAT + 1)
+    assert render_key({'complexity': 10}, 4, 64, 48, 'png', scale=2) != key
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    store = RenderCache(tmp_path / 'cache', max_bytes=3000, memory_bytes=0)
+    for age, key in enumerate(['aa', 'bb', 'cc']):
+        _store(store, key, 1000, tmp_path, when=1000 + age)
+    # Reading the oldest entry makes it the most recent
+    assert store.get('aa', 'png') == bytes(1000)
+    _store(store, 'dd', 1000, tmp_path)
+    assert store.get('bb', 'png') is None
+    assert all(store.get(key, 'png') is not None for key in ('aa', 'cc', 'dd'))
+    assert (store.hits, store.misses) == (4, 1)
+
+def test_memory_tier_serves_hits_and_refreshes_disk(tmp_path):
+    store = RenderCache(tmp_path / 'cache', memory_bytes=4000)
+    _store(store, 'aa', 1000, tmp_path, when=1000)
+    assert store.get('aa', 'png') == bytes(1000)
+    assert os.stat(store._path('aa', 'png')).st_mtime > 1000
+    # Hits come from memory once the file is gone
+    store._path('aa', 'png').unlink()
+    assert store.get('aa', 'png') == bytes(1000)
+    # Entries over a quarter of the tier stay on disk only, and the oldest are dropped past its size
+    _store(store, 'bb', 1001, tmp_path)
+    assert 'bb.png' not in store._memory
+    for key in ('cc', 'dd', 'ee', 'ff'):
+        _store(store, key, 1000, tmp_path)
+    assert list(store._memory) == ['cc.png', 'dd.png', 'ee.png', 'ff.png'] and store._memory_size == 4000
+    assert store.get('aa', 'png') is None
+
+def test_render_to_renders_once(tmp_path):
+    store = RenderCache(tmp_path / 'cache')
+    calls = []
+    def render(path):
+        calls.append(path)
+        with open(path, 'wb') as stream:
+            stream.write(b'image')
+    assert not store.render_to('aa', 'png', tmp_path / 'one.png', render)
+    assert store.render_to('aa', 'png', tmp_path / 'two.png', render)
+    assert len(calls) == 1 and (tmp_path / 'two.png').read_bytes() == b'image'
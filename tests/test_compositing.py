@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from abstro.core.canvas import Canvas
+from abstro.core.compositor import BLEND_MODES
+
+BASE = (200, 120, 40)
+PAINT = (30, 90, 220)
+
+def _square(alpha, compositing=True, blend_mode='normal'):
+    canvas = Canvas(40, 40, seed=1, background_color=BASE, compositing=compositing, blend_mode=blend_mode)
+    canvas.add_polygon([(10, 10), (30, 10), (30, 30), (10, 30)], fill=(*PAINT, alpha))
+    return np.asarray(canvas.render()).astype(int)
+
+@pytest.mark.parametrize('alpha', [0, 64, 128, 255])
+def test_normal_mode_is_source_over(alpha):
+    image = _square(alpha)
+    expected = np.round(np.array(BASE) + (np.array(PAINT) - BASE) * alpha / 255)
+    assert np.abs(image[20, 20] - expected).max() <= 1
+    assert image[2, 2].tolist() == list(BASE)
+
+def test_alpha_is_ignored_without_compositing():
+    assert _square(64, compositing=False)[20, 20].tolist() == list(PAINT)
+
+@pytest.mark.parametrize('mode', sorted(BLEND_MODES))
+def test_blend_modes_follow_their_formula(mode):
+    base, source = np.array(BASE) / 255, np.array(PAINT) / 255
+    for alpha in (128, 255):
+        blended = BLEND_MODES[mode](base, source)
+        expected = (base * (1 - alpha / 255) + blended * alpha / 255) * 255
+        assert np.abs(_square(alpha, blend_mode=mode)[20, 20] - expected).max() <= 1
+
+def test_overlapping_translucent_shapes_stack():
+    canvas = Canvas(40, 40, seed=1, background_color=(255, 255, 255), compositing=True)
+    for _ in range(2):
+        canvas.add_circle(20, 20, 10, fill=(0, 0, 0, 128))
+    # Two half-covering layers leave a quarter of the white
+    assert np.abs(np.asarray(canvas.render())[20, 20].astype(int) - 64).max() <= 1
+
+def test_unknown_blend_mode_is_rejected():
+    with pytest.raises(ValueError, match='Blend mode'):
+        Canvas(10, 10, compositing=True, blend_mode='burn')
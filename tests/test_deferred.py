@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from abstro import generate
+from abstro.core.canvas import Canvas
+from abstro.presets.presets import list_presets
+
+@pytest.mark.parametrize('options', [{}, {'compositing': True}, {'antialias': True}])
+@pytest.mark.parametrize('preset', list_presets())
+def test_deferred_canvas_matches_immediate_drawing(preset, options):
+    immediate = generate(256, 256, preset, seed=9, **options)
+    deferred = generate(256, 256, preset, seed=9, deferred=True, **options)
+    assert deferred._raster is None
+    assert np.array_equal(np.asarray(deferred.render()), np.asarray(immediate.render()))
+
+def test_shapes_added_after_a_read_are_drawn_too():
+    canvas = Canvas(80, 60, seed=1, deferred=True)
+    canvas.add_circle(20, 30, 10, fill=(255, 0, 0, 255))
+    assert np.asarray(canvas.image)[30, 20].tolist() == [255, 0, 0]
+    canvas.add_circle(60, 30, 10, fill=(0, 0, 255, 255))
+    assert np.asarray(canvas.image)[30, 60].tolist() == [0, 0, 255]
+
+@pytest.mark.parametrize('scale', [0.5, 2.0, 3.0])
+def test_renders_at_other_scales_keep_the_layout(scale):
+    canvas = Canvas(80, 60, seed=1, deferred=True)
+    canvas.add_polygon([(0, 0), (40, 0), (40, 60), (0, 60)], fill=(0, 0, 0, 255))
+    image = np.asarray(canvas.render(scale))
+    assert image.shape == (round(60 * scale), round(80 * scale), 3)
+    # The left half is painted and the right half is not
+    assert image[:, :round(38 * scale), 0].max() == 0 and image[:, round(42 * scale):, 0].min() == 255
+
+def test_save_scales_to_a_width(tmp_path):
+    canvas = generate(256, 256, 'minimal', seed=3, deferred=True)
+    canvas.save(str(tmp_path / 'wide.png'), width=640)
+    assert Image.open(tmp_path / 'wide.png').size == (640, 640)
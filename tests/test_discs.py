@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from abstro.core.raster import DISC_BATCH_SIZE, Rasterizer, disc_coverage
+
+BACKGROUND = (200, 180, 160)
+
+SETTINGS = [
+    {'antialias': True},
+    {'compositing': True},
+    {'compositing': True, 'antialias': True},
+    {'compositing': True, 'blend_mode': 'multiply'},
+]
+
+def _discs(count, size, seed=3):
+    # Overlapping discs of all sizes, some past the edges, with and without outlines
+    rng = np.random.default_rng(seed)
+    xs = rng.uniform(-20, size + 20, count)
+    ys = rng.uniform(-20, size + 20, count)
+    radii = rng.uniform(1, DISC_BATCH_SIZE, count)
+    fills = rng.integers(0, 256, (count, 4)).astype(np.uint8)
+    fills[:, 3] = rng.integers(80, 256, count)
+    outlines = rng.integers(0, 256, (count, 4)).astype(np.uint8)
+    outlines[rng.random(count) < 0.3, 3] = 0
+    widths = rng.integers(1, 4, count)
+    return xs, ys, radii, fills, outlines, widths
+
+def _render(discs, size, one_by_one=False, origin=(0, 0), **options):
+    raster = Rasterizer(Image.new('RGB', size, BACKGROUND), origin=origin, **options)
+    if one_by_one:
+        for i in range(len(discs[0])):
+            raster.discs(*(values[i:i + 1] for values in discs))
+    else:
+        raster.discs(*discs)
+    raster.flush()
+    return np.asarray(raster.image)
+
+@pytest.mark.parametrize('options', SETTINGS)
+def test_batched_discs_match_drawing_them_one_by_one(options):
+    discs = _discs(300, 200)
+    assert np.array_equal(_render(discs, (200, 200), **options),
+                          _render(discs, (200, 200), one_by_one=True, **options))
+
+@pytest.mark.parametrize('options', [{}] + SETTINGS)
+def test_tile_matches_crop_of_full_render(options):
+    discs = _discs(200, 160, seed=5)
+    full = _render(discs, (160, 160), **options)
+    tile = _render(discs, (90, 70), origin=(37, 61), **options)
+    assert np.array_equal(tile, full[61:131, 37:127])
+
+def test_disc_coverage_is_bounded_and_has_the_disc_area():
+    for antialias in (False, True):
+        x0, y0, windows = disc_coverage([10.0], [10.0], [6.0], antialias=antialias)
+        window = windows[0]
+        assert window.min() >= 0 and window.max() == 1
+        assert np.array_equal(window, window.T)
+        # The center pixel sits where the window says it does; the edge lies at radius + 0.5
+        assert window[10 - y0[0], 10 - x0[0]] == 1
+        assert window.sum() == pytest.approx(np.pi * 6.5 ** 2, rel=0.05)
+
+def test_ring_covers_only_the_outline():
+    _, _, (disc,) = disc_coverage([0.0], [0.0], [8.0])
+    _, _, (ring,) = disc_coverage([0.0], [0.0], [8.0], ring=[2.0])
+    center = disc.shape[0] // 2
+    assert ring[center, center] == 0
+    assert np.all(ring <= disc)
+    assert 0 < ring.sum() < disc.sum()
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from abstro.core.flowfield import FlowField
+
+def _field(seed=1, width=400, height=300):
+    return FlowField(width, height, np.random.default_rng(seed), scale=120)
+
+def test_same_seed_gives_the_same_field():
+    assert np.array_equal(_field(4).vectors, _field(4).vectors)
+    assert not np.array_equal(_field(4).vectors, _field(5).vectors)
+
+def test_sample_interpolates_the_grid():
+    field = _field()
+    # At grid nodes the samples are the node's unit vectors
+    rows, columns = np.divmod(np.arange(50) * 7, field.vectors.shape[1] - 1)
+    vectors = field.sample(columns * field.resolution, rows * field.resolution)
+    assert np.allclose(vectors, field.vectors[rows, columns], atol=1e-6)
+    assert np.allclose(np.hypot(*field.vectors.reshape(-1, 2).T), 1)
+    # Between nodes they are blends of unit vectors, so never longer
+    rng = np.random.default_rng(0)
+    between = field.sample(rng.uniform(0, 400, 1000), rng.uniform(0, 300, 1000))
+    assert np.all(np.hypot(*between.T) <= 1 + 1e-5)
+
+def test_traced_paths_take_steps_of_at_most_step_length():
+    field = _field()
+    rng = np.random.default_rng(2)
+    xs, ys = rng.uniform(0, 400, 200), rng.uniform(0, 300, 200)
+    points, lengths = field.trace(xs, ys, 60, step_length=3.0)
+    assert points.shape == (200, 61, 2)
+    assert np.allclose(points[:, 0], np.column_stack((xs, ys)))
+    assert np.all((lengths >= 2) & (lengths <= 61))
+    steps = np.hypot(*np.diff(points, axis=1).transpose(2, 0, 1))
+    assert np.all(steps <= 3.0 + 1e-6)
+
+def test_particles_stop_after_leaving_the_canvas():
+    field = _field()
+    rng = np.random.default_rng(3)
+    points, lengths = field.trace(rng.uniform(0, 400, 300), rng.uniform(0, 300, 300), 400, step_length=4.0)
+    inside = (points[..., 0] >= 0) & (points[..., 0] <= 400) & (points[..., 1] >= 0) & (points[..., 1] <= 300)
+    for path, length, within in zip(points, lengths, inside):
+        # Every point but the last one kept lies on the canvas, and the rest repeat the last one
+        assert within[:length - 1].all()
+        if length < len(path):
+            assert not within[length - 1]
+        assert np.array_equal(path[length:], np.repeat(path[length - 1:length], len(path) - length, axis=0))
+
+def test_trace_of_a_subset_matches_tracing_all():
+    field = _field()
+    rng = np.random.default_rng(4)
+    xs, ys = rng.uniform(0, 400, 100), rng.uniform(0, 300, 100)
+    points, lengths = field.trace(xs, ys, 80)
+    some, some_lengths = field.trace(xs[::3], ys[::3], 80)
+    assert np.array_equal(some_lengths, lengths[::3])
+    assert some == pytest.approx(points[::3])
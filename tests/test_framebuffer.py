@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from abstro import generate
+from abstro.core.canvas import Canvas
+from abstro.core.tiles import FRAMEBUFFER_EXTENSIONS, open_framebuffer
+
+OPTIONS = [{}, {'compositing': True}, {'antialias': True}]
+
+def _shapes(canvas):
+    rng = np.random.default_rng(2)
+    for _ in range(40):
+        x, y = rng.uniform(0, [canvas.width, canvas.height])
+        canvas.add_circle(x, y, rng.uniform(3, 30), fill=tuple(rng.integers(0, 256, 4).tolist()))
+    canvas.add_polygon([(0, 0), (150, 20), (40, 90)], fill=(240, 200, 20, 180))
+    return canvas
+
+@pytest.mark.parametrize('options', OPTIONS)
+def test_framebuffer_canvas_matches_render(options, tmp_path):
+    reference = np.asarray(_shapes(Canvas(230, 170, seed=1, deferred=True, **options)).render())
+    for framebuffer in (True, tmp_path / 'frame.npy', tmp_path / 'frame.rgba'):
+        canvas = _shapes(Canvas(230, 170, seed=1, framebuffer=framebuffer, **options))
+        frame = canvas.to_array()
+        assert frame.shape == (170, 230, 4)
+        assert np.array_equal(frame[..., :3], reference) and np.all(frame[..., 3] == 255)
+        assert np.array_equal(np.asarray(canvas.image.convert('RGB')), reference)
+    with pytest.raises(ValueError):
+        canvas.draw
+
+def test_framebuffer_follows_new_shapes():
+    canvas = Canvas(60, 40, seed=1, framebuffer=True)
+    assert np.all(canvas.to_array()[..., :3] == 255)
+    canvas.add_circle(30, 20, 10, fill=(0, 0, 0, 255))
+    assert canvas.to_array()[20, 30, :3].tolist() == [0, 0, 0]
+
+@pytest.mark.parametrize('options', [{}, {'tile_size': 32}, {'workers': 2}])
+@pytest.mark.parametrize('extension', FRAMEBUFFER_EXTENSIONS)
+def test_saved_framebuffers_map_back(extension, options, tmp_path):
+    canvas = generate(256, 256, 'organic', seed=5, deferred=True)
+    expected = np.asarray(canvas.render(1.5))
+    path = str(tmp_path / ('out' + extension))
+    canvas.save(path, scale=1.5, **options)
+    height, width = expected.shape[:2]
+    if extension == '.npy':
+        assert np.array_equal(np.load(path)[..., :3], expected)
+    frame = open_framebuffer(path, width, height, mode='r')
+    assert frame.shape == (height, width, 4)
+    assert np.array_equal(frame[..., :3], expected) and np.all(frame[..., 3] == 255)
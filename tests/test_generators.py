@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from abstro.core.canvas import Canvas
+from abstro.core.generator import CircleGenerator, LineGenerator, PolygonGenerator
+from abstro.core.scene import DISC, LINE, POLYGON
+
+def _generated(generator, seed=3, count=200, **options):
+    canvas = Canvas(400, 300, seed=seed, deferred=True, **options)
+    canvas.set_palette('neon')
+    generator.generate(canvas, count)
+    return canvas
+
+def _rows(scene):
+    return [np.array(geometry) for _, geometry, _, _, _ in scene]
+
+def test_circles_are_sampled_in_range():
+    scene = _generated(CircleGenerator()).scene
+    assert scene.kinds.tolist() == [DISC] * 200
+    xs, ys, radii = np.array(_rows(scene)).T
+    assert xs.min() >= 0 and xs.max() <= 400 and ys.min() >= 0 and ys.max() <= 300
+    assert radii.min() >= 5 and radii.max() <= 30
+    assert scene.fills[:, 3].min() >= 100
+    assert set(np.unique(scene.outlines[:, 3]).tolist()) == {0, 255}
+
+def test_polygons_have_three_to_eight_sides():
+    scene = _generated(PolygonGenerator()).scene
+    assert scene.kinds.tolist() == [POLYGON] * 200
+    sides = np.diff(scene.offsets) // 2
+    assert set(sides.tolist()) == set(range(3, PolygonGenerator.MAX_SIDES + 1))
+    for points in _rows(scene):
+        points = points.reshape(-1, 2)
+        # Vertices lie on a circle of radius 10 to 37 around a point of the canvas
+        span = np.ptp(points, axis=0).max()
+        assert 10 <= span <= 2 * 37 + 1e-3
+
+def test_lines_mix_long_and_short_strokes():
+    scene = _generated(LineGenerator()).scene
+    assert scene.kinds.tolist() == [LINE] * 200
+    x1, y1, x2, y2 = np.array(_rows(scene)).T
+    short = (np.abs(x2 - x1) <= 100) & (np.abs(y2 - y1) <= 100)
+    assert 0 < short.mean() < 1
+    assert scene.widths.min() >= 1 and scene.widths.max() <= 8
+
+@pytest.mark.parametrize('generator', [CircleGenerator, PolygonGenerator, LineGenerator])
+def test_batches_are_seeded_by_the_canvas(generator):
+    first, second = _generated(generator(), seed=5), _generated(generator(), seed=5)
+    assert np.array_equal(first.scene.geometry, second.scene.geometry)
+    assert np.array_equal(np.asarray(first.render()), np.asarray(second.render()))
+    assert not np.array_equal(_generated(generator(), seed=6).scene.geometry, first.scene.geometry)
+
+@pytest.mark.parametrize('generator', [CircleGenerator, PolygonGenerator, LineGenerator])
+def test_legacy_sampling_draws_from_the_canvas_rng(generator):
+    canvas = _generated(generator(legacy_shapes=True), count=50)
+    assert len(canvas.scene) == 50
+    assert np.array_equal(canvas.scene.geometry,
+                          _generated(generator(legacy_shapes=True), count=50).scene.geometry)
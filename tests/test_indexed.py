@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from abstro.core.canvas import Canvas
+from abstro.core.indexed import recolor
+
+PASTEL = [(255, 179, 186), (255, 223, 186), (186, 255, 201), (186, 225, 255), (205, 180, 219)]
+
+def _shapes(canvas, shade=0):
+    # Shapes in the colors of the canvas palette, darkened by `shade`
+    for i in range(12):
+        color = tuple(max(0, channel - shade) for channel in canvas.palette.get_color(i)[:3])
+        canvas.add_circle(20 + 25 * i, 30 + 9 * (i % 5), 18, fill=color + (255,), outline=(0, 0, 0, 255))
+    canvas.add_polygon([(5, 5), (150, 15), (60, 90)], fill=tuple(canvas.palette.get_color(2)[:3]) + (255,))
+    return canvas
+
+def _canvas(palette, **options):
+    canvas = Canvas(320, 100, seed=1, **options)
+    canvas.set_palette(palette)
+    return canvas
+
+def test_indices_look_up_to_the_rgb_render():
+    canvas = _shapes(_canvas('pastel', indexed=True))
+    indices, table = canvas.to_indexed()
+    assert indices.shape == (100, 320) and indices.dtype == np.uint8
+    assert table[0].tolist() == list(canvas.background_color[:3])
+    assert len(table) == len(PASTEL) + 2
+    expected = np.asarray(_shapes(_canvas('pastel', deferred=True)).render())
+    assert np.array_equal(table[indices], expected)
+    assert np.array_equal(np.asarray(canvas.render()), expected)
+
+@pytest.mark.parametrize('shade', [0, 10])
+def test_set_palette_recolors_like_drawing_with_the_new_palette(shade):
+    canvas = _shapes(_canvas('pastel', indexed=True), shade)
+    indices = canvas.to_indexed()[0].copy()
+    canvas.set_palette('vibrant')
+    # Only the table changes
+    assert np.array_equal(canvas.to_indexed()[0], indices)
+    expected = _shapes(_canvas('vibrant', deferred=True), shade).render()
+    assert np.array_equal(np.asarray(canvas.render()), np.asarray(expected))
+    assert np.array_equal(np.asarray(canvas.render(1.5)), np.asarray(_shapes(_canvas('vibrant', deferred=True),
+                                                                                    shade).render(1.5)))
+
+def test_palette_image_saves_as_palette_png(tmp_path):
+    canvas = _shapes(_canvas('pastel', indexed=True))
+    canvas.set_palette('earth')
+    image = canvas.palette_image()
+    assert image.mode == 'P'
+    path = tmp_path / 'indexed.png'
+    canvas.save(str(path))
+    with Image.open(path) as saved:
+        assert saved.mode == 'P'
+        assert np.array_equal(np.asarray(saved.convert('RGB')), np.asarray(canvas.render()))
+
+def test_recolor_keeps_offsets_and_leaves_far_colors():
+    target = [(10, 20, 30), (200, 100, 0)]
+    colors = [PASTEL[0], PASTEL[1], (PASTEL[0][0] - 20, PASTEL[0][1] + 5, PASTEL[0][2]), PASTEL[3], (0, 0, 0)]
+    result = recolor(colors, PASTEL, target)
+    # Palette colors map to the target color with the same index, wrapping
+    assert result[:2].tolist() == [[10, 20, 30], [200, 100, 0]]
+    assert result[2].tolist() == [0, 25, 30]
+    assert result[3].tolist() == [200, 100, 0]
+    assert result[4].tolist() == [0, 0, 0]
+
+@pytest.mark.parametrize('options', [{'compositing': True}, {'antialias': True}, {'framebuffer': True}])
+def test_indexed_rejects_blending_options(options):
+    with pytest.raises(ValueError):
+        Canvas(40, 30, indexed=True, **options)
+
+@pytest.mark.parametrize('options', [{'tile_size': 16}, {'workers': 2}])
+def test_indexed_saves_whole(options, tmp_path):
+    canvas = _shapes(_canvas('pastel', indexed=True))
+    with pytest.raises(ValueError):
+        canvas.save(str(tmp_path / 'out.png'), **options)
+    with pytest.raises(ValueError):
+        canvas.save(str(tmp_path / 'out.npy'))
+    with pytest.raises(ValueError):
+        canvas.render(workers=2)
+    with pytest.raises(ValueError):
+        canvas.set_blend_mode('multiply')
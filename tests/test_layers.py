@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from abstro.core.canvas import Canvas
+from abstro.core.generator import OilPaintingGenerator
+from abstro.core.raster import Rasterizer
+
+SETTINGS = [{}, {'compositing': True}, {'antialias': True}, {'compositing': True, 'antialias': True}]
+
+def _oil_painting(layer_workers=None, deferred=False, brush_strokes='bezier', **options):
+    canvas = Canvas(240, 160, seed=8, deferred=deferred, **options)
+    canvas.set_palette('pastel')
+    OilPaintingGenerator(complexity=120, brush_size='thick', brush_strokes=brush_strokes,
+                         layer_workers=layer_workers).apply(canvas)
+    return np.asarray(canvas.render())
+
+@pytest.mark.parametrize('brush_strokes', ['bezier', 'bristle'])
+@pytest.mark.parametrize('options', SETTINGS)
+def test_layer_workers_and_deferred_match_serial(options, brush_strokes):
+    serial = _oil_painting(brush_strokes=brush_strokes, **options)
+    assert np.array_equal(_oil_painting(layer_workers=2, brush_strokes=brush_strokes, **options), serial)
+    assert np.array_equal(_oil_painting(deferred=True, brush_strokes=brush_strokes, **options), serial)
+
+@pytest.mark.parametrize('options', SETTINGS)
+def test_new_layer_keeps_canvas_options(options):
+    canvas = Canvas(40, 30, seed=1, **options)
+    layer = canvas.new_layer(2)
+    assert (layer.compositing, layer.antialias, layer.indexed) == (canvas.compositing, canvas.antialias, False)
+
+def test_opaque_layer_composites_like_drawing_in_place():
+    canvas = Canvas(120, 90, seed=3, deferred=True)
+    canvas.add_circles([30, 60, 90], [40, 45, 50], [25, 20, 30], [(200, 30, 30, 255), (30, 200, 30, 255),
+                                                                   (30, 30, 200, 255)])
+    canvas.add_polygon([(0, 0), (100, 20), (40, 80)], fill=(240, 200, 20, 255))
+    direct = Rasterizer(Image.new('RGB', (120, 90), (255, 255, 255)))
+    direct.render(canvas.scene)
+    layered = Rasterizer(Image.new('RGB', (120, 90), (255, 255, 255)))
+    layered.composite_layer(layered.paint_layer(canvas.scene))
+    assert np.array_equal(np.asarray(layered.image), np.asarray(direct.image))
+
+def test_translucent_layer_composites_source_over():
+    canvas = Canvas(80, 60, seed=3, deferred=True, compositing=True)
+    canvas.add_circle(30, 30, 20, fill=(255, 0, 0, 128))
+    canvas.add_circle(50, 30, 20, fill=(0, 0, 255, 64))
+    direct = Rasterizer(Image.new('RGB', (80, 60), (20, 200, 20)), compositing=True)
+    direct.render(canvas.scene)
+    layered = Rasterizer(Image.new('RGB', (80, 60), (20, 200, 20)), compositing=True)
+    layer = layered.paint_layer(canvas.scene)
+    # Uncovered pixels stay transparent
+    assert np.asarray(layer)[0, 0].tolist() == [0, 0, 0, 0]
+    layered.composite_layer(layer)
+    difference = np.abs(np.asarray(layered.image).astype(int) - np.asarray(direct.image))
+    assert difference.max() <= 1
@@ -0,0 +1,31 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def _imported(code):
+    # Heavy modules loaded by `code` in a fresh interpreter
+    probe = code + "\nimport sys\nprint(' '.join(m for m in ('numpy', 'PIL') if m in sys.modules), file=sys.stderr)"
+    result = subprocess.run([sys.executable, '-c', probe], cwd=ROOT, capture_output=True, text=True, check=True)
+    return result.stderr.split()
+
+@pytest.mark.parametrize('code', [
+    'import abstro',
+    'import abstro; abstro.get_preset("organic"); abstro.ColorPalette("neon")',
+    'import sys; sys.argv = ["abstro", "--list-presets"]\nimport runpy\ntry:\n'
+    '    runpy.run_module("abstro.cli", run_name="__main__")\nexcept SystemExit:\n    pass',
+])
+def test_light_uses_skip_numpy_and_pil(code):
+    assert _imported(code) == []
+
+def test_lazy_attributes_load_on_first_use():
+    assert _imported('import abstro; abstro.Canvas') == ['numpy', 'PIL']
+    import abstro
+    from abstro.core.canvas import Canvas
+    assert abstro.Canvas is Canvas
+    assert 'Canvas' in dir(abstro) and 'RenderCache' in dir(abstro)
+    with pytest.raises(AttributeError):
+        abstro.Missing
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from abstro.core.canvas import Canvas
+from abstro.core.noise import field_geometry, field_pixels, fractal_noise, perlin
+
+def test_perlin_vanishes_on_the_lattice():
+    lattice = np.arange(-3, 12, dtype=np.float64)
+    assert np.allclose(perlin(lattice, lattice, 5), 0, atol=1e-6)
+
+def test_perlin_window_matches_a_larger_evaluation():
+    xs = np.linspace(-4.3, 9.7, 141)
+    ys = np.linspace(2.1, 11.9, 99)
+    full = perlin(xs, ys, 11)
+    assert np.array_equal(perlin(xs[40:90], ys[25:60], 11), full[25:60, 40:90])
+
+def test_perlin_is_smooth_and_bounded():
+    xs = np.linspace(0, 20, 801)
+    noise = perlin(xs, xs, 3)
+    assert np.abs(noise).max() < 0.8
+    # A 1/40 cell apart, neighbors differ by little
+    assert np.abs(np.diff(noise, axis=1)).max() < 0.1
+    assert noise.std() > 0.1
+
+def test_fractal_noise_octaves_and_range():
+    xs = np.linspace(0, 8, 200)
+    assert np.array_equal(fractal_noise(xs, xs, 9, octaves=1), perlin(xs, xs, 9))
+    noise = fractal_noise(xs, xs, 9, octaves=5)
+    assert np.abs(noise).max() < 0.8
+    assert not np.array_equal(noise, perlin(xs, xs, 9))
+
+@pytest.mark.parametrize('scale', [1.0, 1.5])
+def test_field_tile_matches_crop_of_full_field(scale):
+    geometry = field_geometry(42, 60, 3, 2.0, 0.5, 0.8, [(10, 20, 30), (200, 100, 50), (250, 250, 250)])
+    full, opacity = field_pixels(geometry, (180, 120), scale)
+    tile, _ = field_pixels(geometry, (70, 45), scale, origin=(33, 51))
+    assert opacity == pytest.approx(0.8)
+    assert np.array_equal(tile, full[51:96, 33:103])
+
+def test_field_renders_the_same_in_tiles_and_bands():
+    canvas = Canvas(160, 120, seed=6, deferred=True)
+    canvas.add_field(scale=40, octaves=3, opacity=0.7)
+    full = np.asarray(canvas.render())
+    assert np.array_equal(np.asarray(canvas.render(workers=2)), full)
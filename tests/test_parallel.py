@@ -0,0 +1,13 @@
+import numpy as np
+import pytest
+
+from abstro import generate
+from abstro.presets.presets import list_presets
+
+@pytest.mark.parametrize('symmetry', [None, 'quadrant', 'rotational:2'])
+@pytest.mark.parametrize('scale', [1.0, 1.5])
+@pytest.mark.parametrize('preset', list_presets())
+def test_workers_match_serial_render(preset, scale, symmetry):
+    canvas = generate(160, 120, preset, seed=4, deferred=True, symmetry=symmetry)
+    serial = np.asarray(canvas.render(scale))
+    assert np.array_equal(np.asarray(canvas.render(scale, workers=2)), serial)
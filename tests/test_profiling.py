@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from abstro import generate, profile
+from abstro.core.canvas import Canvas
+
+def test_profile_counts_calls_and_splits_self_time(tmp_path):
+    with profile() as stats:
+        generate(256, 256, 'chaos', seed=1, output=str(tmp_path / 'chaos.png'))
+    calls = stats.as_dict()
+    assert calls['PatternGenerator.apply']['calls'] == 1
+    assert calls['Canvas.save']['calls'] == 1
+    assert calls['Canvas.add_noise']['calls'] >= 1
+    for entry in calls.values():
+        assert 0 <= entry['self_seconds'] <= entry['total_seconds'] + 1e-9
+    # Everything else runs inside the generator, so its total covers their self times
+    inside = sum(entry['self_seconds'] for name, entry in calls.items() if name != 'Canvas.save')
+    assert calls['PatternGenerator.apply']['total_seconds'] == pytest.approx(inside, rel=1e-6)
+    assert stats.format_table().splitlines()[0].split() == ['function', 'calls', 'total', 'ms', 'self', 'ms',
+                                                              'self', '%']
+
+def test_instrumentation_is_removed_on_exit():
+    add_circle = Canvas.add_circle
+    with profile() as stats:
+        assert Canvas.add_circle is not add_circle
+        Canvas(50, 50, seed=1).add_circle(10, 10, 5, fill=(0, 0, 0, 255))
+    assert Canvas.add_circle is add_circle
+    Canvas(50, 50, seed=1).add_circle(10, 10, 5, fill=(0, 0, 0, 255))
+    assert stats.as_dict()['Canvas.add_circle']['calls'] == 1
+
+def test_profiling_does_not_nest_or_change_output():
+    plain = np.asarray(generate(256, 256, 'organic', seed=4).image)
+    with profile():
+        with pytest.raises(RuntimeError):
+            with profile():
+                pass
+        profiled = np.asarray(generate(256, 256, 'organic', seed=4).image)
+    assert np.array_equal(profiled, plain)
@@ -0,0 +1,41 @@
+import random
+import threading
+
+import numpy as np
+
+from abstro import generate
+
+def _pixels(preset, seed):
+    return np.asarray(generate(256, 256, preset, seed=seed).image)
+
+def test_same_seed_gives_the_same_image():
+    assert np.array_equal(_pixels('organic', 11), _pixels('organic', 11))
+    assert not np.array_equal(_pixels('organic', 11), _pixels('organic', 12))
+
+def test_canvases_leave_the_global_random_state_alone():
+    random.seed(3)
+    np.random.seed(3)
+    expected = (random.random(), np.random.random())
+    random.seed(3)
+    np.random.seed(3)
+    generate(256, 256, 'chaos', seed=5)
+    assert (random.random(), np.random.random()) == expected
+
+def test_renders_in_threads_match_serial_renders():
+    presets = ['organic', 'chaos', 'oil_painting', 'geometric']
+    serial = [_pixels(preset, 7) for preset in presets]
+    threaded = [None] * len(presets)
+    def render(i):
+        threaded[i] = _pixels(presets[i], 7)
+    threads = [threading.Thread(target=render, args=(i,)) for i in range(len(presets))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(np.array_equal(a, b) for a, b in zip(serial, threaded))
+
+def test_copy_continues_the_random_streams():
+    canvas = generate(256, 256, 'minimal', seed=2)
+    copy = canvas.copy()
+    assert copy.rng.random() == canvas.rng.random()
+    assert copy.np_rng.random() == canvas.np_rng.random()
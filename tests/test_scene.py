@@ -0,0 +1,56 @@
+import numpy as np
+
+from abstro.core.scene import CIRCLE, POLYGON, LINE, POINT, BLEND, LAYER, Scene, layer_rows
+
+def test_rows_round_trip():
+    scene = Scene()
+    scene.add(CIRCLE, (10, 20, 5), (1, 2, 3), (4, 5, 6, 128), 2)
+    scene.add(POLYGON, (0, 0, 10, 0, 5, 8), (7, 8, 9, 10))
+    scene.add(LINE, (1.5, 2.25, 3, 4), (0, 0, 0), width=1.5)
+    assert list(scene) == [(CIRCLE, [10, 20, 5], (1, 2, 3, 255), (4, 5, 6, 128), 2),
+                           (POLYGON, [0, 0, 10, 0, 5, 8], (7, 8, 9, 10), None, 0),
+                           (LINE, [1.5, 2.25, 3, 4], (0, 0, 0, 255), None, 1.5)]
+    assert scene.kinds.tolist() == [CIRCLE, POLYGON, LINE]
+    assert scene.offsets.tolist() == [0, 3, 9, 13]
+
+def test_batches_match_single_rows():
+    rng = np.random.default_rng(1)
+    sizes = rng.integers(2, 6, 20) * 2
+    geometry = rng.uniform(0, 100, sizes.sum()).astype(np.float32)
+    fills = rng.integers(0, 256, (20, 3))
+    batched, single = Scene(), Scene()
+    batched.add_batch(POLYGON, geometry, sizes, fills, widths=2)
+    starts = np.concatenate(([0], np.cumsum(sizes)))
+    for i in range(20):
+        single.add(POLYGON, geometry[starts[i]:starts[i + 1]].tolist(), tuple(fills[i].tolist()), width=2)
+    assert list(batched) == list(single)
+    
+    points = Scene()
+    points.add_points(np.array([3, 4]), np.array([5, 6]), np.array([[1, 2, 3], [4, 5, 6]]))
+    assert list(points) == [(POINT, [3, 5], (1, 2, 3, 255), None, 0), (POINT, [4, 6], (4, 5, 6, 255), None, 0)]
+
+def test_copy_and_extend_are_independent():
+    scene = Scene()
+    scene.add(CIRCLE, (1, 2, 3), (9, 9, 9))
+    copy = scene.copy()
+    copy.add(CIRCLE, (4, 5, 6), (8, 8, 8))
+    assert len(scene) == 1 and len(copy) == 2
+    
+    combined = Scene()
+    combined.add_blend_mode('multiply')
+    combined.extend(copy)
+    combined.extend(scene, geometry=[7, 8, 9])
+    assert combined.kinds.tolist() == [BLEND, CIRCLE, CIRCLE, CIRCLE]
+    assert [row[1] for row in combined][1:] == [[1, 2, 3], [4, 5, 6], [7, 8, 9]]
+
+def test_layer_rows_survive_float32():
+    scene = Scene()
+    scene.add_layer((1 << 30) + 12345)
+    assert scene.kinds.tolist() == [LAYER]
+    assert layer_rows(scene.shape(0)[1]) == (1 << 30) + 12345
+
+def test_storage_is_compact():
+    scene = Scene()
+    scene.add_points(np.arange(1000), np.arange(1000), np.zeros((1000, 3)))
+    # Type, fill, outline, width, offset and two coordinates per point
+    assert scene.nbytes == 1000 * (1 + 4 + 4 + 4 + 8 + 8) + 8
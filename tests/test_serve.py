@@ -0,0 +1,43 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from abstro import generate
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def _serve(lines, *options):
+    result = subprocess.run([sys.executable, '-m', 'abstro.cli', 'serve', '--stdio', '-j', '2', *options],
+                            input=''.join(line + '\n' for line in lines), cwd=ROOT, capture_output=True,
+                            text=True, timeout=300, check=True)
+    return {record['id']: record for record in map(json.loads, result.stdout.splitlines())}
+
+def test_jobs_get_one_result_each(tmp_path):
+    first, second = tmp_path / 'a' / 'first.png', tmp_path / 'second.png'
+    records = _serve([json.dumps({'id': 'a', 'preset': 'chaos', 'seed': 3, 'width': 256, 'height': 256,
+                                  'output': str(first)}),
+                      json.dumps({'preset': 'minimal', 'seed': 4, 'width': 256, 'height': 256,
+                                  'overrides': {'complexity': 5}, 'output': str(second)}),
+                      '',
+                      'not json',
+                      json.dumps({'id': 'b', 'preset': 'chaos'}),
+                      json.dumps({'id': 'c', 'preset': 'nope', 'output': str(tmp_path / 'c.png')})])
+    assert set(records) == {'a', 2, 4, 5, 'c'}
+    assert records['a']['ok'] and records[2]['ok']
+    assert not any(records[key]['ok'] for key in (4, 5, 'c'))
+    assert 'Invalid job' in records[4]['error'] and 'nope' in records['c']['error']
+    expected = generate(256, 256, 'chaos', seed=3)
+    assert np.array_equal(np.asarray(Image.open(first)), np.asarray(expected.image))
+    assert Image.open(second).size == (256, 256)
+
+def test_cached_jobs_are_served_from_the_cache(tmp_path):
+    job = {'preset': 'minimal', 'seed': 8, 'width': 256, 'height': 256}
+    lines = [json.dumps({**job, 'id': i, 'output': str(tmp_path / f'{i}.png')}) for i in range(2)]
+    options = ('--cache-dir', str(tmp_path / 'cache'))
+    assert not _serve(lines[:1], *options)[0]['cached']
+    assert _serve(lines[1:], *options)[1]['cached']
+    assert (tmp_path / '0.png').read_bytes() == (tmp_path / '1.png').read_bytes()
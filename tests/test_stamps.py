@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from abstro.core.raster import Rasterizer, _blend_window, disc_coverage, stamp_coverage
+
+BACKGROUND = (240, 235, 220)
+
+def _grid(columns, rows, spacing):
+    ys, xs = np.divmod(np.arange(columns * rows), columns)
+    return xs * spacing + spacing / 2.0, ys * spacing + spacing / 2.0
+
+def _render(xs, ys, radii, sides, angles, fills, one_by_one=False, **options):
+    raster = Rasterizer(Image.new('RGB', (120, 120), BACKGROUND), **options)
+    if one_by_one:
+        for i in range(len(xs)):
+            raster.stamps(xs[i:i + 1], ys[i:i + 1], radii[i:i + 1], sides[i:i + 1], angles[i:i + 1], fills[i:i + 1])
+    else:
+        raster.stamps(xs, ys, radii, sides, angles, fills)
+    raster.flush()
+    return raster, np.asarray(raster.image)
+
+@pytest.mark.parametrize('antialias', [False, True])
+def test_grid_shares_one_cached_stamp(antialias):
+    xs, ys = _grid(10, 10, 12)
+    count = len(xs)
+    fills = np.tile(np.array([[180, 40, 60, 255]], dtype=np.uint8), (count, 1))
+    raster, image = _render(xs, ys, np.full(count, 4.5), np.full(count, 6), np.zeros(count), fills,
+                            antialias=antialias)
+    assert len(raster._stamps) == 1
+    
+    # Every placement is the cached coverage blended at its pixel
+    left, top, window = stamp_coverage(4.5, 6, 0.0, 0.0, 0.0, antialias)
+    expected = np.full((120, 120, 3), BACKGROUND, dtype=np.uint8)
+    for x, y in zip(xs.astype(np.int64), ys.astype(np.int64)):
+        _blend_window(expected, x + left, y + top, window, np.float32([180, 40, 60]), 1.0)
+    assert np.array_equal(image, expected)
+
+@pytest.mark.parametrize('options', [{}, {'antialias': True}, {'compositing': True},
+                                     {'compositing': True, 'blend_mode': 'screen'}])
+def test_overlapping_stamps_blend_in_order(options):
+    rng = np.random.default_rng(7)
+    count = 150
+    xs, ys = rng.uniform(0, 120, count), rng.uniform(0, 120, count)
+    radii = rng.uniform(2, 12, count)
+    sides = rng.choice([0, 3, 4, 6], count)
+    angles = rng.uniform(0, np.pi, count)
+    fills = rng.integers(0, 256, (count, 4)).astype(np.uint8)
+    batched = _render(xs, ys, radii, sides, angles, fills, **options)[1]
+    single = _render(xs, ys, radii, sides, angles, fills, one_by_one=True, **options)[1]
+    assert np.array_equal(batched, single)
+
+def test_circle_stamp_matches_disc_coverage():
+    for antialias in (False, True):
+        left, top, window = stamp_coverage(5.0, 0, 0.0, 0.25, 0.5, antialias)
+        x0, y0, (disc,) = disc_coverage([0.25], [0.5], [5.0], antialias=antialias)
+        assert (left, top) == (x0[0], y0[0])
+        assert np.array_equal(window, disc)
+
+def test_polygon_stamp_covers_its_area():
+    # A square of half-diagonal 10 has an area of 200 pixels
+    window = stamp_coverage(10.0, 4, np.pi / 4, 0.0, 0.0, antialias=True)[2]
+    assert window.max() == 1
+    assert window.sum() == pytest.approx(200, rel=0.05)
@@ -0,0 +1,59 @@
+import gzip
+import io
+import xml.etree.ElementTree as ElementTree
+
+import pytest
+
+from abstro import generate
+from abstro.core.canvas import Canvas
+from abstro.core.svg import write_svg
+
+SVG = '{http://www.w3.org/2000/svg}'
+
+def _svg(canvas, **options):
+    stream = io.StringIO()
+    options.setdefault('background', canvas.background_color)
+    write_svg(stream, canvas.scene, canvas.width, canvas.height, **options)
+    return stream.getvalue()
+
+def _elements(text, tag):
+    return ElementTree.fromstring(text).iter(SVG + tag)
+
+def test_shapes_are_written_with_their_styles():
+    canvas = Canvas(100, 80, seed=1, deferred=True, background_color=(1, 2, 3))
+    canvas.add_circle(10.123, 20, 5, fill=(255, 0, 0, 255), outline=(0, 0, 255, 255), width=2)
+    canvas.add_polygon([(0, 0), (10, 0), (5, 8)], fill=(0, 255, 0, 128))
+    canvas.add_bezier([(0, 0), (10, 20), (30, 20), (40, 0)], fill=(9, 9, 9, 255), width=3)
+    text = _svg(canvas, opacity=True)
+    root = ElementTree.fromstring(text)
+    assert (root.get('width'), root.get('height')) == ('100', '80')
+    assert next(_elements(text, 'rect')).get('fill') == '#010203'
+    circle = next(_elements(text, 'circle'))
+    assert (circle.get('cx'), circle.get('fill'), circle.get('stroke')) == ('10.12', '#ff0000', '#0000ff')
+    assert next(_elements(text, 'polygon')).get('fill-opacity') == '0.502'
+    path = next(_elements(text, 'path'))
+    assert path.get('d') == 'M0 0C10 20 30 20 40 0' and path.get('fill') == 'none'
+
+@pytest.mark.parametrize('precision', [0, 1, 3])
+def test_precision_rounds_coordinates(precision):
+    canvas = Canvas(100, 80, seed=1, deferred=True)
+    canvas.add_line(1.23456, 2.5, 3, 4, fill=(0, 0, 0, 255))
+    line = next(_elements(_svg(canvas, precision=precision), 'line'))
+    assert line.get('x1') == {0: '1', 1: '1.2', 3: '1.235'}[precision]
+    assert line.get('x2') == '3'
+
+def test_shapes_of_one_style_share_a_group():
+    canvas = Canvas(100, 80, seed=1, deferred=True)
+    for x in range(5):
+        canvas.add_circle(10 + x * 10, 40, 4, fill=(10, 20, 30, 255))
+    text = _svg(canvas)
+    groups = [group for group in _elements(text, 'g') if group.get('fill') == '#0a141e']
+    assert len(groups) == 1 and len(list(groups[0])) == 5
+    assert text.count('fill="#0a141e"') == 1
+
+def test_saved_files_parse_and_svgz_is_gzipped(tmp_path):
+    canvas = generate(256, 256, 'oil_painting', seed=2, output=str(tmp_path / 'out.svg'))
+    plain = (tmp_path / 'out.svg').read_text()
+    canvas.save(str(tmp_path / 'out.svgz'))
+    assert gzip.decompress((tmp_path / 'out.svgz').read_bytes()).decode() == plain
+    assert len(list(_elements(plain, 'path'))) > 0
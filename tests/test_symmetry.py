@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from abstro.core.canvas import Canvas
+from abstro.core.symmetry import Symmetry
+
+KINDS = ['bilateral', 'quadrant', 'rotational:2', 'rotational:3', 'rotational:4']
+
+def _motif(width, height, kind, **options):
+    canvas = Canvas(width, height, seed=3, deferred=True, **options)
+    canvas.set_symmetry(kind)
+    rng = np.random.default_rng(1)
+    for _ in range(30):
+        x, y = rng.uniform(0, [width, height])
+        canvas.add_circle(x, y, rng.uniform(3, 20), fill=tuple(rng.integers(0, 256, 4).tolist()))
+    canvas.add_polygon([(0, 0), (width * 0.6, 5), (10, height * 0.7)], fill=(10, 200, 40, 255))
+    return canvas
+
+@pytest.mark.parametrize('size', [(7, 5), (8, 6), (9, 9), (8, 8), (1, 1), (2, 3)])
+@pytest.mark.parametrize('kind', KINDS)
+def test_sources_match_unfold(kind, size):
+    symmetry = Symmetry.parse(kind)
+    width, height = size
+    if symmetry.domain(width, height) is None:
+        return
+    pixels = np.arange(width * height, dtype=np.int32).reshape(height, width)
+    image = Image.fromarray(pixels, 'I')
+    symmetry.unfold(image)
+    unfolded = np.asarray(image)
+    ys, xs = np.divmod(np.arange(width * height), width)
+    source_x, source_y, piece = symmetry.sources(xs, ys, width, height)
+    assert np.array_equal(unfolded.ravel(), pixels[source_y, source_x])
+    # Unmoved pixels are their own sources, and no source is moved itself
+    assert np.array_equal(source_x[piece == 0], xs[piece == 0])
+    assert np.all(piece[source_y * width + source_x] == 0)
+
+@pytest.mark.parametrize('scale', [1.0, 1.5])
+@pytest.mark.parametrize('kind', KINDS)
+def test_band_renderers_match_render(kind, scale, tmp_path):
+    canvas = _motif(97, 71, kind)
+    full = np.asarray(canvas.render(scale))
+    assert np.array_equal(np.asarray(canvas.render(scale, workers=2)), full)
+    for options in ({'tile_size': 16}, {'workers': 2}):
+        path = tmp_path / 'out.png'
+        canvas.save(str(path), scale=scale, **options)
+        assert np.array_equal(np.asarray(Image.open(path).convert('RGB')), full)
+    if scale == 1.0:
+        framebuffer = _motif(97, 71, kind, framebuffer=True)
+        assert np.array_equal(framebuffer.to_array()[..., :3], full)
+
+@pytest.mark.parametrize('kind', ['bilateral', 'quadrant', 'rotational:2'])
+def test_output_is_symmetric(kind):
+    image = np.asarray(_motif(80, 60, kind).render(1.5, workers=2))
+    assert np.array_equal(image, image[::-1, ::-1] if kind == 'rotational:2' else image[:, ::-1])
+    if kind == 'quadrant':
+        assert np.array_equal(image, image[::-1])
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from abstro import generate
+from abstro.core.raster import Rasterizer
+from abstro.core.tiles import SpatialIndex, render_tile, rows_within, scene_bounds
+
+OPTIONS = [{}, {'compositing': True}, {'antialias': True}]
+
+def _canvas(preset='chaos', **options):
+    return generate(256, 256, preset, seed=6, deferred=True, **options)
+
+def test_index_cells_hold_the_rows_touching_them_in_order():
+    scene = _canvas().scene
+    index = SpatialIndex(scene, (256, 256), (40, 70))
+    bounds = scene_bounds(scene, 1.0)
+    assert len(index) == 7 * 4
+    for cell in range(len(index)):
+        rows = index.query(cell)
+        # Cells may hold a few extra rows that end on their edge, but never miss one
+        assert np.all(np.diff(rows) > 0)
+        assert np.isin(rows_within(bounds, index.box(cell)), rows).all()
+    assert index.box(len(index) - 1) == (240, 210, 256, 256)
+
+def test_bounds_hold_every_drawn_pixel():
+    scene = _canvas('geometric').scene
+    bounds = scene_bounds(scene, 1.0)
+    for row in range(0, len(scene), 7):
+        raster = Rasterizer(Image.new('RGB', (256, 256), (255, 255, 255)))
+        raster.render(scene, rows=np.array([row]))
+        ys, xs = np.nonzero(np.asarray(raster.image).min(axis=2) < 255)
+        if len(ys):
+            x0, y0, x1, y1 = bounds[row]
+            assert x0 <= xs.min() and xs.max() < x1 and y0 <= ys.min() and ys.max() < y1
+
+@pytest.mark.parametrize('scale', [1.0, 1.5])
+@pytest.mark.parametrize('options', OPTIONS)
+@pytest.mark.parametrize('preset', ['chaos', 'organic', 'oil_painting', 'geometric'])
+def test_tiles_are_crops_of_the_full_render(preset, options, scale):
+    canvas = _canvas(preset, **options)
+    full = np.asarray(canvas.render(scale))
+    size = (full.shape[1], full.shape[0])
+    index = SpatialIndex(canvas.scene, size, (100, 90), scale)
+    for cell in range(len(index)):
+        x0, y0, x1, y1 = index.box(cell)
+        tile = render_tile(canvas.scene, index, cell, canvas.background_color, scale, canvas.compositing,
+                           canvas.antialias)
+        assert np.array_equal(np.asarray(tile), full[y0:y1, x0:x1])
+
+@pytest.mark.parametrize('tile_size', [1, 64, 1000])
+def test_saved_bands_match_the_render(tile_size, tmp_path):
+    canvas = _canvas(compositing=True)
+    path = tmp_path / 'tiled.png'
+    canvas.save(str(path), scale=1.5, tile_size=tile_size, dpi=300)
+    with Image.open(path) as image:
+        assert image.info['dpi'] == pytest.approx((300, 300), abs=0.01)
+        assert np.array_equal(np.asarray(image.convert('RGB')), np.asarray(canvas.render(1.5)))